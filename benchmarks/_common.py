@@ -0,0 +1,40 @@
+"""
+Helpers shared by the benchmark scripts. These are development tools only and
+are not included in the .nvda-addon package.
+"""
+import os
+import sys
+import time
+import types
+import importlib
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PACKAGE_DIR = os.path.join(REPO_DIR, "globalPlugins", "youtubeDownloader")
+PACKAGE_NAME = "youtubeDownloader"
+
+def load_module(name):
+	"""
+	Imports a submodule of the add-on without running the package __init__,
+	which needs a running NVDA.
+	"""
+	if PACKAGE_NAME not in sys.modules:
+		pkg = types.ModuleType(PACKAGE_NAME)
+		pkg.__path__ = [PACKAGE_DIR]
+		sys.modules[PACKAGE_NAME] = pkg
+	return importlib.import_module(f"{PACKAGE_NAME}.{name}")
+
+def timed(func, runs):
+	"""Calls func `runs` times and returns the list of wall-clock durations in seconds."""
+	durations = []
+	for _ in range(runs):
+		start = time.perf_counter()
+		func()
+		durations.append(time.perf_counter() - start)
+	return durations
+
+def report(label, durations):
+	durations = sorted(durations)
+	mean = sum(durations) / len(durations)
+	median = durations[len(durations) // 2]
+	print(f"{label:<32} mean {mean * 1000:9.2f} ms   median {median * 1000:9.2f} ms   ({len(durations)} runs)")
+	return mean
@@ -0,0 +1,120 @@
+"""
+Progress records as yt-dlp really prints them, for the checks and benchmarks.
+
+Record lines used to be written by hand here, and a hand-written line is only
+as right as its author's idea of yt-dlp's output (a missing field is printed
+as a bare NA, not as the string "NA"). These helpers get them from yt-dlp
+itself, with the add-on's own templates (progress.template_args):
+
+- capture() runs the yt-dlp command line on direct media links served from a
+  local HTTP server, the same way downloader starts yt-dlp.exe
+- render() evaluates the templates with YoutubeDL.evaluate_outtmpl, for
+  progress dicts made up by a benchmark
+
+Both need the yt_dlp package (pip install yt-dlp). Without it, captured() reads
+the output a capture() run saved in records_captured.txt.
+"""
+import os
+import sys
+import shutil
+import tempfile
+import threading
+import subprocess
+import functools
+from http.server import HTTPServer, SimpleHTTPRequestHandler
+
+CAPTURED_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "records_captured.txt")
+# Two items in one process, as a SubprocessWorker runs them
+CAPTURE_IDS = ("dQw4w9WgXcQ", "9bZkp7q19f0")
+CAPTURE_SIZE = 2 * 1024 * 1024
+
+def have_yt_dlp():
+	try:
+		import yt_dlp
+	except ImportError:
+		return False
+	return True
+
+class _QuietHandler(SimpleHTTPRequestHandler):
+	def log_message(self, format, *args):
+		pass
+
+class _QuietServer(HTTPServer):
+	def handle_error(self, request, client_address):
+		# yt-dlp's generic extractor reads the start of a file and hangs up
+		pass
+
+def capture(progress, video_ids=CAPTURE_IDS, size=CAPTURE_SIZE, rate="1M"):
+	"""
+	Downloads one file per video ID (named <id>.webm, so the generic extractor gives
+	it that ID) with one yt-dlp process and returns its output lines.
+	"""
+	root = tempfile.mkdtemp(prefix="yt_records_")
+	try:
+		served = os.path.join(root, "served")
+		os.makedirs(served)
+		for video_id in video_ids:
+			with open(os.path.join(served, video_id + ".webm"), 'wb') as f:
+				f.write(os.urandom(size))
+		server = _QuietServer(("127.0.0.1", 0), functools.partial(_QuietHandler, directory=served))
+		threading.Thread(target=server.serve_forever, daemon=True).start()
+		try:
+			urls = [f"http://127.0.0.1:{server.server_port}/{video_id}.webm" for video_id in video_ids]
+			cmd = [
+				sys.executable, "-m", "yt_dlp",
+				"--output", "%(title)s [%(id)s].%(ext)s",
+				"--paths", "home:" + os.path.join(root, "out"),
+				"--paths", "temp:" + os.path.join(root, "temp"),
+				"--newline",
+				"--no-mtime",
+				"--ignore-errors",
+				# Slow enough for several progress records per file
+				"--limit-rate", rate,
+			] + progress.template_args() + urls
+			result = subprocess.run(cmd, capture_output=True, text=True, encoding='utf-8', check=False)
+		finally:
+			server.shutdown()
+			server.server_close()
+		if result.returncode != 0:
+			raise RuntimeError(f"yt-dlp failed: {result.stderr.strip()[-500:]}")
+		return result.stdout.splitlines()
+	finally:
+		shutil.rmtree(root, ignore_errors=True)
+
+def captured():
+	"""Output lines of the capture() run saved in records_captured.txt."""
+	with open(CAPTURED_PATH, 'r', encoding='utf-8') as f:
+		return f.read().splitlines()
+
+def real_lines(progress):
+	"""Fresh capture() output if yt_dlp is installed, else the saved copy."""
+	if have_yt_dlp():
+		return capture(progress)
+	return captured()
+
+def render(progress, kind, info, progress_dict=None):
+	"""One record line for kind from the add-on's template, rendered by yt-dlp."""
+	args = progress.template_args()
+	templates = {}
+	for option, value in zip(args, args[1:]):
+		if option in ("--progress-template", "--print"):
+			stage, template = value.split(":", 1)
+			templates[stage] = template
+	stage = {progress.KIND_DOWNLOAD: "download", progress.KIND_POSTPROCESS: "postprocess", progress.KIND_FILE: "after_move"}[kind]
+	ydl = _ydl()
+	if kind == progress.KIND_FILE:
+		return ydl.evaluate_outtmpl(templates[stage], info)
+	return ydl.evaluate_outtmpl(templates[stage], {'info': info, 'progress': progress_dict or {}})
+
+@functools.lru_cache(maxsize=1)
+def _ydl():
+	import yt_dlp
+	return yt_dlp.YoutubeDL({'quiet': True})
+
+if __name__ == "__main__":
+	# Refreshes records_captured.txt
+	from _common import load_module
+	lines = capture(load_module("progress"))
+	with open(CAPTURED_PATH, 'w', encoding='utf-8', newline="\n") as f:
+		f.write("\n".join(lines) + "\n")
+	print(f"{len(lines)} lines saved to {CAPTURED_PATH}")
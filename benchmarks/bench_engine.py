@@ -0,0 +1,61 @@
+"""
+Compares per-item overhead of the subprocess engine (one yt-dlp.exe per job)
+with the in-process engine (YoutubeDL inside the add-on's Python).
+
+Without --url only the startup cost is measured (`yt-dlp --version` versus
+constructing a YoutubeDL object). With --url each run also extracts the video's
+metadata, which is what the title step and every download pay.
+
+Usage:
+	python benchmarks/bench_engine.py [--runs 10] [--url URL] [--yt-dlp PATH]
+"""
+import argparse
+import subprocess
+import time
+
+from _common import load_module, timed, report
+
+def main():
+	parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+	parser.add_argument("--runs", type=int, default=10)
+	parser.add_argument("--url", default=None, help="Also extract metadata for this URL on every run")
+	parser.add_argument("--yt-dlp", dest="yt_dlp", default=None, help="Path to the yt-dlp executable (defaults to the add-on's bin folder)")
+	args = parser.parse_args()
+
+	downloader = load_module("downloader")
+	engine = load_module("engine")
+	yt_dlp_path = args.yt_dlp or downloader.get_yt_dlp_path()
+
+	startupinfo = None
+	if hasattr(subprocess, "STARTUPINFO"):
+		startupinfo = subprocess.STARTUPINFO()
+		startupinfo.dwFlags |= subprocess.STARTF_USESHOWWINDOW
+
+	if args.url:
+		cmd = [yt_dlp_path, "--skip-download", "--no-warnings", "--print", "title", args.url]
+	else:
+		cmd = [yt_dlp_path, "--version"]
+
+	def run_subprocess():
+		subprocess.run(cmd, capture_output=True, startupinfo=startupinfo, check=True)
+
+	start = time.perf_counter()
+	yt_dlp = engine.load_yt_dlp()
+	import_cost = time.perf_counter() - start
+	opts = {'quiet': True, 'no_warnings': True, 'skip_download': True, 'logger': engine._NullLogger()}
+
+	def run_in_process():
+		with yt_dlp.YoutubeDL(opts) as ydl:
+			if args.url:
+				ydl.extract_info(args.url, download=False)
+
+	print(f"yt-dlp {yt_dlp.version.__version__}, {args.runs} runs" + (f", url={args.url}" if args.url else ", startup only"))
+	print(f"{'in-process one-off import':<32} {import_cost * 1000:9.2f} ms")
+	sub_mean = report("subprocess per item", timed(run_subprocess, args.runs))
+	inproc_mean = report("in-process per item", timed(run_in_process, args.runs))
+	saved = sub_mean - inproc_mean
+	print(f"\nSaved per item: {saved * 1000:.2f} ms  ({sub_mean / inproc_mean if inproc_mean else float('inf'):.1f}x)")
+	print(f"A 300-item playlist pays the subprocess overhead 600 times (title + download): ~{saved * 600:.1f} s")
+
+if __name__ == "__main__":
+	main()
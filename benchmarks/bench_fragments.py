@@ -0,0 +1,121 @@
+"""
+Measures what concurrent fragment downloading buys on a fragmented (HLS) stream.
+
+A local HTTP server serves an HLS playlist whose fragments are delayed and
+throttled per connection, like a CDN edge that is far away. The stream is then
+downloaded through yt-dlp with the arguments the add-on builds
+(downloader.transfer_args) for each --concurrent-fragments value.
+
+Needs the yt_dlp package (installed, or copied into the add-on's bin/yt_dlp).
+
+Usage:
+	python benchmarks/bench_fragments.py [--fragments 40] [--fragment-kib 256]
+		[--latency-ms 80] [--kib-per-s 2048] [--levels 1,2,4,8] [--runs 3]
+"""
+import argparse
+import os
+import shutil
+import tempfile
+import threading
+import time
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+from _common import load_module, timed, report
+
+CHUNK = 16 * 1024
+
+class FragmentServer(ThreadingHTTPServer):
+	daemon_threads = True
+
+	def __init__(self, fragments, fragment_bytes, latency, bytes_per_second):
+		super().__init__(("127.0.0.1", 0), FragmentHandler)
+		self.fragments = fragments
+		self.payload = os.urandom(fragment_bytes)
+		self.latency = latency
+		self.bytes_per_second = bytes_per_second
+
+	def playlist(self):
+		lines = ["#EXTM3U", "#EXT-X-VERSION:3", "#EXT-X-TARGETDURATION:4", "#EXT-X-MEDIA-SEQUENCE:0"]
+		for i in range(self.fragments):
+			lines.extend(["#EXTINF:4.0,", f"frag{i}.ts"])
+		lines.append("#EXT-X-ENDLIST")
+		return ("\n".join(lines) + "\n").encode("ascii")
+
+class FragmentHandler(BaseHTTPRequestHandler):
+	protocol_version = "HTTP/1.1"
+
+	def log_message(self, format, *args):
+		pass
+
+	def do_GET(self):
+		if self.path.endswith(".m3u8"):
+			body = self.server.playlist()
+			self.send_response(200)
+			self.send_header("Content-Type", "application/vnd.apple.mpegurl")
+			self.send_header("Content-Length", str(len(body)))
+			self.end_headers()
+			self.wfile.write(body)
+			return
+		if not self.path.startswith("/frag"):
+			self.send_error(404)
+			return
+		payload = self.server.payload
+		time.sleep(self.server.latency)
+		self.send_response(200)
+		self.send_header("Content-Type", "video/mp2t")
+		self.send_header("Content-Length", str(len(payload)))
+		self.end_headers()
+		# Per-connection throttle, so parallel connections add up like on a real link
+		chunk_time = CHUNK / self.server.bytes_per_second
+		for offset in range(0, len(payload), CHUNK):
+			start = time.perf_counter()
+			self.wfile.write(payload[offset:offset + CHUNK])
+			remaining = chunk_time - (time.perf_counter() - start)
+			if remaining > 0:
+				time.sleep(remaining)
+
+def main():
+	parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+	parser.add_argument("--fragments", type=int, default=40)
+	parser.add_argument("--fragment-kib", type=int, default=256)
+	parser.add_argument("--latency-ms", type=int, default=80, help="Delay before each fragment response")
+	parser.add_argument("--kib-per-s", type=int, default=2048, help="Throughput of a single connection")
+	parser.add_argument("--levels", default="1,2,4,8", help="--concurrent-fragments values to compare")
+	parser.add_argument("--runs", type=int, default=3)
+	args = parser.parse_args()
+
+	downloader = load_module("downloader")
+	engine = load_module("engine")
+	yt_dlp = engine.load_yt_dlp()
+
+	server = FragmentServer(args.fragments, args.fragment_kib * 1024, args.latency_ms / 1000.0, args.kib_per_s * 1024)
+	threading.Thread(target=server.serve_forever, daemon=True).start()
+	url = f"http://127.0.0.1:{server.server_address[1]}/stream.m3u8"
+	out_dir = tempfile.mkdtemp(prefix="bench_fragments_")
+
+	total_mib = args.fragments * args.fragment_kib / 1024
+	print(f"yt-dlp {yt_dlp.version.__version__}: {args.fragments} fragments x {args.fragment_kib} KiB = {total_mib:.1f} MiB, "
+		f"{args.latency_ms} ms latency, {args.kib_per_s} KiB/s per connection")
+
+	try:
+		baseline = None
+		for level in [int(x) for x in args.levels.split(",")]:
+			cli = ["--output", os.path.join(out_dir, "%(id)s.%(ext)s"), "--force-overwrites", "--quiet", "--no-warnings"]
+			cli += downloader.transfer_args(level)
+			opts = dict(yt_dlp.parse_options(cli + [url]).ydl_opts)
+			opts['logger'] = engine._NullLogger()
+
+			def run():
+				with yt_dlp.YoutubeDL(opts) as ydl:
+					ydl.download([url])
+
+			mean = report(f"--concurrent-fragments {level}", timed(run, args.runs))
+			if baseline is None:
+				baseline = mean
+			print(f"{'':<32} {total_mib / mean:6.2f} MiB/s   {baseline / mean:4.1f}x vs {args.levels.split(',')[0]}")
+	finally:
+		server.shutdown()
+		shutil.rmtree(out_dir, ignore_errors=True)
+
+if __name__ == "__main__":
+	main()
@@ -0,0 +1,106 @@
+"""
+Simulates a playlist of audio jobs with the old lifecycle (one slot covers the
+download and the conversion) and with the staged pipeline (download slots,
+then postprocess.StagePool sized to the cores).
+
+The line is one shared resource: downloads take turns moving chunks, so
+concurrent downloads split the bandwidth. Conversion is modelled as a sleep
+inside a semaphore with one permit per core, so it uses a core but does not
+hold Python's GIL (ffmpeg is a separate process). The script reports the wall
+time for the playlist and how busy the line and the cores were.
+
+Usage:
+	python benchmarks/bench_pipeline.py [--jobs 24] [--slots 3] [--cores 4] [--download-ms 200] [--convert-ms 600]
+"""
+import argparse
+import threading
+import time
+
+from _common import load_module
+
+CHUNKS = 10
+
+class Resources:
+	def __init__(self, cores, download_s, convert_s):
+		self.link = threading.Lock()
+		self.cores = threading.Semaphore(cores)
+		self.chunk_s = download_s / CHUNKS
+		self.convert_s = convert_s
+		self.busy_lock = threading.Lock()
+		self.link_busy = 0.0
+		self.core_busy = 0.0
+
+	def download(self):
+		for _ in range(CHUNKS):
+			with self.link:
+				time.sleep(self.chunk_s)
+			with self.busy_lock:
+				self.link_busy += self.chunk_s
+
+	def convert(self):
+		with self.cores:
+			time.sleep(self.convert_s)
+		with self.busy_lock:
+			self.core_busy += self.convert_s
+
+def run_old(jobs, slots, res):
+	"""Each job holds its slot from the first byte to the converted file."""
+	slot = threading.Semaphore(slots)
+
+	def job():
+		with slot:
+			res.download()
+			res.convert()
+	threads = [threading.Thread(target=job) for _ in range(jobs)]
+	for thread in threads:
+		thread.start()
+	for thread in threads:
+		thread.join()
+
+def run_staged(jobs, slots, cores, res):
+	"""Slots cover downloads only, finished downloads queue for the conversion pool."""
+	postprocess = load_module("postprocess")
+	pool = postprocess.StagePool(lambda: cores)
+	slot = threading.Semaphore(slots)
+	done = threading.Semaphore(0)
+
+	def convert():
+		res.convert()
+		done.release()
+
+	def job():
+		with slot:
+			res.download()
+		pool.submit(convert)
+	threads = [threading.Thread(target=job) for _ in range(jobs)]
+	for thread in threads:
+		thread.start()
+	for _ in range(jobs):
+		done.acquire()
+
+def measure(label, run, args):
+	res = Resources(args.cores, args.download_ms / 1000, args.convert_ms / 1000)
+	start = time.perf_counter()
+	run(res)
+	wall = time.perf_counter() - start
+	line = res.link_busy / wall * 100
+	cpu = res.core_busy / (wall * args.cores) * 100
+	print(f"{label:<32} {wall:6.2f} s   line busy {line:3.0f}%   cores busy {cpu:3.0f}%")
+	return wall
+
+def main():
+	parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+	parser.add_argument("--jobs", type=int, default=24)
+	parser.add_argument("--slots", type=int, default=3, help="Download slots")
+	parser.add_argument("--cores", type=int, default=4)
+	parser.add_argument("--download-ms", type=float, default=200.0, help="Line time per job if it had the line to itself")
+	parser.add_argument("--convert-ms", type=float, default=600.0, help="Conversion time per job on one core")
+	args = parser.parse_args()
+
+	print(f"{args.jobs} jobs, {args.slots} download slots, {args.cores} cores")
+	old = measure("old: slot covers conversion", lambda res: run_old(args.jobs, args.slots, res), args)
+	new = measure("staged: download -> convert pool", lambda res: run_staged(args.jobs, args.slots, args.cores, res), args)
+	print(f"{'':<32} {old / new:.2f}x faster")
+
+if __name__ == "__main__":
+	main()
@@ -0,0 +1,97 @@
+"""
+Micro-benchmark for progress parsing: lines per second decoded by
+progress.parse_line (structured JSON records) versus the old approach of
+splitting every [download] line and scanning tokens for '%'.
+
+The legacy parser only recovers a percentage; the structured parser also
+returns bytes, speed, ETA, fragment and postprocessor information.
+
+The structured lines are rendered by yt-dlp from the add-on's own template
+(YoutubeDL.evaluate_outtmpl), with the fields a plain HTTP download leaves
+out; without yt_dlp installed, the saved capture is repeated (see _records.py).
+
+Usage:
+	python benchmarks/bench_progress.py [--lines 200000]
+"""
+import argparse
+import time
+
+import _records
+from _common import load_module
+
+def legacy_parse(line):
+	# Copy of the parser that used to live in download_video/_run_download_thread
+	if "[download]" in line:
+		percent = None
+		try:
+			parts = line.split()
+			for part in parts:
+				if "%" in part:
+					percent = float(part.replace("%", ""))
+					break
+		except:
+			pass
+		return percent
+	return None
+
+def make_legacy_lines(count):
+	lines = []
+	for i in range(count):
+		pct = (i % 1000) / 10.0
+		lines.append(f"[download] {pct:5.1f}% of   10.00MiB at    2.00MiB/s ETA 00:05")
+	return lines
+
+def make_structured_lines(progress, count):
+	if not _records.have_yt_dlp():
+		captured = [line for line in _records.captured() if progress.PREFIX + progress.KIND_DOWNLOAD in line]
+		return [captured[i % len(captured)] for i in range(count)]
+	info = {'id': "dQw4w9WgXcQ"}
+	total = 10 * 1024 * 1024
+	# 1000 distinct lines are enough, rendering is far slower than parsing
+	rendered = []
+	for i in range(min(count, 1000)):
+		# No playlist, no fragments, no size estimate: yt-dlp leaves those fields out
+		rendered.append(_records.render(progress, progress.KIND_DOWNLOAD, info, {
+			'status': "downloading",
+			'filename': "C:\\Users\\me\\Downloads\\Some video title.f137.mp4",
+			'downloaded_bytes': total * i // 1000,
+			'total_bytes': total,
+			'speed': 2097152.0,
+			'eta': 5,
+		}))
+	return [rendered[i % len(rendered)] for i in range(count)]
+
+def bench(label, parse, lines):
+	start = time.perf_counter()
+	for line in lines:
+		parse(line)
+	elapsed = time.perf_counter() - start
+	rate = len(lines) / elapsed
+	print(f"{label:<28} {rate:14,.0f} lines/s   ({elapsed * 1e6 / len(lines):.2f} us/line)")
+	return rate
+
+def main():
+	parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+	parser.add_argument("--lines", type=int, default=200000)
+	args = parser.parse_args()
+
+	progress = load_module("progress")
+	legacy_lines = make_legacy_lines(args.lines)
+	structured_lines = make_structured_lines(progress, args.lines)
+	# Most output lines in a real run are not progress at all
+	noise = ["[youtube] dQw4w9WgXcQ: Downloading webpage"] * args.lines
+
+	# A parser that rejects the lines would look fast
+	assert all(progress.parse_line(line) for line in structured_lines[:1000]), "yt-dlp's records did not parse"
+	bench("legacy split/scan", legacy_parse, legacy_lines)
+	bench("structured parse_line", progress.parse_line, structured_lines)
+	bench("legacy, non-progress line", legacy_parse, noise)
+	bench("structured, non-progress", progress.parse_line, noise)
+
+	# At --newline rates (~10 lines/s per job) either is far below 0.1% of a core
+	event = progress.parse_line(structured_lines[min(500, len(structured_lines) - 1)])
+	print(f"\nSample event: {event}")
+	print(f"Described as: {progress.describe(event)}")
+
+if __name__ == "__main__":
+	main()
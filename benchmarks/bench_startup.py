@@ -0,0 +1,183 @@
+"""
+Measures what the add-on adds to NVDA's startup: importing the package and
+constructing GlobalPlugin, against stub NVDA modules (no NVDA or wx needed).
+
+Each run is a fresh interpreter with HOME pointed at a temporary folder that
+holds a saved download list and a metadata cache of the given sizes, so import
+caching and file system state are the same for every run. The script also
+reports the time until the saved downloads are usable (they are read off the
+startup path) and which heavy modules were imported during startup.
+
+Usage:
+	python benchmarks/bench_startup.py [--runs 10] [--jobs 500] [--cache-entries 2000]
+"""
+import argparse
+import builtins
+import json
+import os
+import re
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import types
+
+from _common import PACKAGE_DIR, PACKAGE_NAME, report
+
+# Modules the add-on should not need until the user does something
+HEAVY_MODULES = ["youtubeDownloader.dialogs", "urllib.request", "http.client", "ssl", "hashlib", "zipfile"]
+# Submodules that run processes (and pull in subprocess). GlobalPlugin() hands them to its
+# state thread, so they are checked right after the package import, before that thread exists.
+PROCESS_MODULES = ["youtubeDownloader." + name for name in ("downloader", "engine", "pool", "updater", "postprocess", "loudness")]
+
+class _Stub:
+	"""Accepts any call, attribute or flag arithmetic (wx widgets, NVDA GUI objects)."""
+	def __init__(self, *args, **kwargs):
+		pass
+
+	def __getattr__(self, name):
+		return _Stub()
+
+	def __call__(self, *args, **kwargs):
+		return _Stub()
+
+	def __or__(self, other):
+		return self
+
+	__ror__ = __or__
+
+	def __iter__(self):
+		return iter(())
+
+class _Conf(dict):
+	"""config.conf with every setting at its spec default."""
+	def __init__(self):
+		super().__init__()
+		self.spec = {}
+
+	def __missing__(self, section):
+		values = {}
+		for key, spec in self.spec.get(section, {}).items():
+			match = re.search(r"default=('[^']*'|[^,)]+)", spec)
+			raw = match.group(1) if match else "None"
+			if raw.startswith("'"):
+				values[key] = raw.strip("'")
+			elif raw in ("True", "False", "None"):
+				values[key] = {"True": True, "False": False, "None": None}[raw]
+			else:
+				values[key] = int(raw)
+		self[section] = values
+		return values
+
+def _module(name, **attrs):
+	module = types.ModuleType(name)
+	module.__dict__.update(attrs)
+	sys.modules[name] = module
+	return module
+
+def install_stubs():
+	wx = _module("wx", CallAfter=lambda *a, **k: None, CallLater=lambda *a, **k: None)
+	# Constants are ints, classes and everything else are stubs
+	wx.__getattr__ = lambda name: 0 if name.isupper() and not name.startswith("EVT_") else _Stub
+
+	class GlobalPlugin:
+		def __init__(self):
+			pass
+
+		def terminate(self):
+			pass
+
+	_module("globalPluginHandler", GlobalPlugin=GlobalPlugin, runningPlugins=set())
+	_module("addonHandler", initTranslation=lambda: setattr(builtins, "_", lambda text: text))
+	_module("api", getFocusObject=_Stub(), getForegroundObject=_Stub())
+	_module("controlTypes", Role=_Stub())
+	_module("ui", message=lambda text: None)
+	_module("config", conf=_Conf())
+	_module("NVDAObjects")
+	_module("NVDAObjects.IAccessible", IAccessible=_Stub)
+	settings = _module("gui.settingsDialogs", SettingsPanel=_Stub, NVDASettingsDialog=types.SimpleNamespace(categoryClasses=[]))
+	helper = _module("gui.guiHelper", BoxSizerHelper=_Stub)
+	_module("gui", guiHelper=helper, settingsDialogs=settings, mainFrame=_Stub())
+
+def child(package_dir):
+	install_stubs()
+	import importlib.util
+	start = time.perf_counter()
+	spec = importlib.util.spec_from_file_location(PACKAGE_NAME, os.path.join(package_dir, "__init__.py"), submodule_search_locations=[package_dir])
+	package = importlib.util.module_from_spec(spec)
+	sys.modules[PACKAGE_NAME] = package
+	spec.loader.exec_module(package)
+	imported = time.perf_counter()
+	heavy = [name for name in PROCESS_MODULES if name in sys.modules]
+	plugin = package.GlobalPlugin()
+	constructed = time.perf_counter()
+	heavy += [name for name in HEAVY_MODULES if name in sys.modules]
+	# What the first use of the download list waits for
+	if hasattr(plugin, "ensure_state_loaded"):
+		plugin.ensure_state_loaded()
+	loaded = time.perf_counter()
+	print(json.dumps({
+		'import': imported - start,
+		'init': constructed - imported,
+		'loaded': loaded - start,
+		'downloads': len(plugin.downloads),
+		'heavy': heavy,
+	}))
+
+def make_home(jobs, cache_entries):
+	home = tempfile.mkdtemp(prefix="bench_startup_")
+	state = {}
+	for i in range(jobs):
+		url = f"https://www.youtube.com/watch?v=vid{i:08d}"
+		state[str(i)] = {
+			'title': f"Video {i}", 'state': "completed", 'status': f"Video {i} - Completed", 'url': url,
+			'params': {'url': url, 'is_audio': True, 'quality_str': "Best Quality", 'start_time': None, 'end_time': None,
+				'playlist_mode': None, 'playlist_items': None, 'playlist_title': None, 'known_title': f"Video {i}"},
+		}
+	with open(os.path.join(home, "nvda_yt_downloader_state.json"), 'w', encoding='utf-8') as f:
+		json.dump(state, f)
+	cache_dir = os.path.join(home, "nvda_yt_downloader_cache")
+	os.makedirs(cache_dir)
+	index = []
+	for i in range(cache_entries):
+		key = f"vid{i:08d}"
+		with open(os.path.join(cache_dir, key + ".info.json"), 'w', encoding='utf-8') as f:
+			f.write("{}")
+		index.append([key, {'stored': time.time(), 'size': 2}])
+	with open(os.path.join(cache_dir, "index.json"), 'w', encoding='utf-8') as f:
+		json.dump(index, f)
+	return home
+
+def main():
+	parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+	parser.add_argument("--runs", type=int, default=10)
+	parser.add_argument("--jobs", type=int, default=500, help="Saved downloads in the state file")
+	parser.add_argument("--cache-entries", type=int, default=2000, help="Entries in the metadata cache index")
+	parser.add_argument("--package-dir", default=PACKAGE_DIR, help="Add-on package to measure (e.g. a checkout of an older version)")
+	parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+	args = parser.parse_args()
+	if args.child:
+		child(args.package_dir)
+		return
+
+	results = []
+	for _ in range(args.runs):
+		# A fresh home per run, loading the state compacts the journal
+		home = make_home(args.jobs, args.cache_entries)
+		try:
+			env = dict(os.environ, HOME=home, USERPROFILE=home)
+			out = subprocess.run([sys.executable, __file__, "--child", "--package-dir", args.package_dir], env=env, capture_output=True, text=True, check=True)
+			results.append(json.loads(out.stdout.strip().splitlines()[-1]))
+		finally:
+			shutil.rmtree(home, ignore_errors=True)
+
+	print(f"{args.jobs} saved downloads, {args.cache_entries} cache entries, {args.runs} runs")
+	report("import package", [r['import'] for r in results])
+	report("GlobalPlugin()", [r['init'] for r in results])
+	report("until downloads usable", [r['loaded'] for r in results])
+	print(f"downloads restored: {results[-1]['downloads']}")
+	print(f"heavy modules imported at startup: {', '.join(results[-1]['heavy']) or 'none'}")
+
+if __name__ == "__main__":
+	main()
@@ -0,0 +1,181 @@
+"""
+Micro-benchmark for finding the browser address bar (NVDA+Shift+Y).
+
+Builds a synthetic accessibility tree for a browser window, with the address
+bar at a chosen breadth-first position and the focus deep below it. Every
+property read spins for --call-us
+microseconds to stand in for a cross-process COM call. It then compares the
+old lookup (a list used as a queue, a fresh search on every press) with
+browser.AddressBarFinder on the first press and on repeated presses in the
+same window, and reports how long the sliced main-thread lookup blocks at a time.
+
+Usage:
+	python benchmarks/bench_url_lookup.py [--call-us 50] [--position 300] [--fanout 6] [--runs 20]
+"""
+import argparse
+import time
+
+from _common import load_module, timed, report
+
+EDIT = "edit"
+WINDOW = "window"
+PANE = "pane"
+ADDRESS = "www.youtube.com/watch?v=dQw4w9WgXcQ"
+
+class FakeObject:
+	"""An accessibility object whose every property read costs call_s seconds."""
+	call_s = 0.0
+
+	def __init__(self, role, name="", value="", parent=None):
+		self._role = role
+		self._name = name
+		self._value = value
+		self._parent = parent
+		self._children = []
+		self._next = None
+
+	def _call(self):
+		end = time.perf_counter() + self.call_s
+		while time.perf_counter() < end:
+			pass
+
+	@property
+	def role(self):
+		self._call()
+		return self._role
+
+	@property
+	def name(self):
+		self._call()
+		return self._name
+
+	@property
+	def value(self):
+		self._call()
+		return self._value
+
+	@property
+	def parent(self):
+		self._call()
+		return self._parent
+
+	@property
+	def firstChild(self):
+		self._call()
+		return self._children[0] if self._children else None
+
+	@property
+	def next(self):
+		self._call()
+		return self._next
+
+	@property
+	def windowHandle(self):
+		self._call()
+		return id(self)
+
+	def add(self, child):
+		if self._children:
+			self._children[-1]._next = child
+		self._children.append(child)
+		return child
+
+def build_tree(position, fanout):
+	"""Returns (window, focus) with the address bar as roughly the position-th object in BFS order."""
+	window = FakeObject(WINDOW)
+	level = [window]
+	count = 1
+	placed = False
+	while not placed:
+		next_level = []
+		for node in level:
+			for _ in range(fanout):
+				count += 1
+				if count >= position and not placed:
+					child = node.add(FakeObject(EDIT, "Address and search bar", ADDRESS, node))
+					placed = True
+				else:
+					child = node.add(FakeObject(PANE, "", "", node))
+				next_level.append(child)
+		level = next_level
+	# Focus sits deep inside the document, below the address bar's level
+	focus = level[-1].add(FakeObject(PANE, "", "", level[-1]))
+	return window, focus
+
+def legacy_lookup(focus):
+	# Copy of the search that used to live in GlobalPlugin.get_video_url
+	def is_address_bar(obj):
+		if obj.role == EDIT:
+			name = (obj.name or "").lower()
+			if "address" in name or "search" in name or "location" in name:
+				val = obj.value or ""
+				if "youtube.com" in val:
+					return True
+		return False
+	curr = focus
+	while curr and curr.role != WINDOW:
+		curr = curr.parent
+	window = curr
+	if window:
+		queue = [window]
+		count = 0
+		while queue and count < 500:
+			node = queue.pop(0)
+			count += 1
+			if is_address_bar(node):
+				return node.value
+			child = node.firstChild
+			while child:
+				queue.append(child)
+				child = child.next
+	return ""
+
+def main():
+	parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+	parser.add_argument("--call-us", type=float, default=50.0, help="Cost of one property read (cross-process call)")
+	parser.add_argument("--position", type=int, default=300, help="BFS position of the address bar")
+	parser.add_argument("--fanout", type=int, default=6)
+	parser.add_argument("--runs", type=int, default=20)
+	args = parser.parse_args()
+
+	browser = load_module("browser")
+	FakeObject.call_s = args.call_us / 1e6
+	window, focus = build_tree(args.position, args.fanout)
+	print(f"Address bar at BFS position ~{args.position}, fanout {args.fanout}, {args.call_us:g} us per property read")
+
+	assert legacy_lookup(focus) == ADDRESS
+	legacy = report("old: search every press", timed(lambda: legacy_lookup(focus), args.runs))
+
+	def first_press():
+		finder = browser.AddressBarFinder(EDIT, WINDOW, budget=10.0)
+		assert finder.find_url(focus, "chrome") == ADDRESS
+	report("new: first press (search)", timed(first_press, args.runs))
+
+	finder = browser.AddressBarFinder(EDIT, WINDOW, budget=10.0)
+	finder.find_url(focus, "chrome")
+	repeat = report("new: repeat press (cached)", timed(lambda: finder.find_url(focus, "chrome"), args.runs))
+	print(f"{'':<32} {legacy / repeat:.0f}x faster on repeat presses")
+
+	budget = browser.TIME_BUDGET
+	slow = browser.AddressBarFinder(EDIT, WINDOW, budget=0.05)
+	start = time.perf_counter()
+	slow.find_url(focus, "chrome")
+	print(f"with a 50 ms budget the search gives up after {(time.perf_counter() - start) * 1000:.1f} ms (default budget {budget * 1000:.0f} ms)")
+
+	# lookup() walks on the main thread in slices, with NVDA handling events in between
+	sliced = browser.AddressBarFinder(EDIT, WINDOW, budget=10.0)
+	scheduled = []
+	found = []
+	slices = []
+	start = time.perf_counter()
+	sliced.lookup(focus, "chrome", found.append, scheduled.append)
+	slices.append(time.perf_counter() - start)
+	while scheduled:
+		start = time.perf_counter()
+		scheduled.pop(0)()
+		slices.append(time.perf_counter() - start)
+	assert found == [ADDRESS]
+	print(f"sliced first press: {len(slices)} slices, longest {max(slices) * 1000:.1f} ms (slice budget {browser.SLICE_BUDGET * 1000:.0f} ms)")
+
+if __name__ == "__main__":
+	main()
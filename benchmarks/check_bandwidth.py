@@ -0,0 +1,44 @@
+"""
+Regression check for the global bandwidth budget.
+
+yt-dlp.exe jobs keep the --limit-rate they were started with, and used to get
+the budget divided by the jobs running at the time, so the total went over the
+budget as soon as more jobs started. This starts fixed-rate jobs one by one up
+to the slot limit, mixed with in-process jobs that can be re-throttled, and
+checks that the shares never add up to more than the budget. It also checks
+that the jobs of a worker, which share one yt-dlp, hold one share between them.
+
+Usage:
+	python benchmarks/check_bandwidth.py
+"""
+from _common import load_module
+
+BUDGET_KIB = 1000
+MAX_JOBS = 4
+
+def main():
+	bandwidth = load_module("bandwidth")
+	budget = bandwidth.BandwidthBudget(lambda: (BUDGET_KIB, ""), lambda: MAX_JOBS)
+	rates = {}
+	for d_id in range(MAX_JOBS):
+		rates[d_id] = budget.register(d_id)
+		if d_id % 2:
+			# In-process job, re-throttled as others start and finish
+			budget.attach(d_id, lambda share, d_id=d_id: rates.__setitem__(d_id, share))
+		total = sum(rates.values())
+		assert total <= BUDGET_KIB * 1024, f"{d_id + 1} jobs hold {total} of {BUDGET_KIB * 1024} bytes/s"
+	assert total == budget.total_share() == BUDGET_KIB * 1024, (total, budget.total_share())
+	# What a finished fixed-rate job leaves goes to the adjustable ones
+	budget.unregister(0)
+	del rates[0]
+	assert sum(rates.values()) == BUDGET_KIB * 1024, rates
+
+	worker = object()
+	budget.unregister(1)
+	share = budget.register(worker)
+	assert budget.register(worker) == share and len(budget.jobs) == MAX_JOBS - 1, budget.jobs
+	budget.unregister(worker)
+	print(f"bandwidth: {MAX_JOBS} jobs within {BUDGET_KIB} KiB/s, one share per worker - OK")
+
+if __name__ == "__main__":
+	main()
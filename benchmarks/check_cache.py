@@ -0,0 +1,44 @@
+"""
+Regression check for the metadata cache index.
+
+Every put used to rewrite the whole index, so caching a playlist's videos one
+by one cost time quadratic in the number of entries. This caches ENTRIES
+entries in a burst (in a temporary folder), checks that the index was written
+at most a couple of times, and that a new cache on the same folder sees every
+entry after flush().
+
+Usage:
+	python benchmarks/check_cache.py
+"""
+import shutil
+import tempfile
+import time
+
+from _common import load_module
+
+ENTRIES = 2000
+
+def main():
+	cache = load_module("cache")
+	folder = tempfile.mkdtemp()
+	try:
+		metadata = cache.MetadataCache(cache_dir=folder)
+		writes = []
+		save_index = metadata._save_index
+		metadata._save_index = lambda: (writes.append(len(metadata.index)), save_index())
+		info = {'id': None, 'title': "Song", 'formats': [{'format_id': str(n), 'url': "https://example.com/" + "x" * 200} for n in range(10)]}
+		start = time.perf_counter()
+		for n in range(ENTRIES):
+			metadata.put(f"video{n:06d}", dict(info, id=f"video{n:06d}"))
+		elapsed = time.perf_counter() - start
+		assert len(writes) <= 2, f"index written {len(writes)} times for {ENTRIES} puts"
+		metadata.flush()
+		reopened = cache.MetadataCache(cache_dir=folder)
+		assert reopened.get("video000000")['title'] == "Song"
+		assert reopened.stats()['entries'] == ENTRIES, reopened.stats()
+	finally:
+		shutil.rmtree(folder)
+	print(f"cache: {ENTRIES} puts in {elapsed * 1000:.0f} ms with {len(writes)} index write(s) before flush - OK")
+
+if __name__ == "__main__":
+	main()
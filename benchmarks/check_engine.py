@@ -0,0 +1,51 @@
+"""
+Regression check for falling back to yt-dlp.exe when yt_dlp cannot be imported.
+
+A failed import was not remembered, so every resolve_engine call (one per job
+and per worker) tried the import again and logged the failure again. This
+makes the import fail and checks that it is attempted and logged only once.
+
+Usage:
+	python benchmarks/check_engine.py
+"""
+import sys
+import logging
+import builtins
+
+from _common import load_module
+
+class _Count(logging.Handler):
+	def __init__(self):
+		super().__init__()
+		self.records = 0
+
+	def emit(self, record):
+		self.records += 1
+
+def main():
+	engine = load_module("engine")
+	sys.modules.pop("yt_dlp", None)
+	attempts = []
+	real_import = builtins.__import__
+
+	def failing_import(name, *args, **kwargs):
+		if name == "yt_dlp":
+			attempts.append(name)
+			raise ImportError("No module named 'yt_dlp'")
+		return real_import(name, *args, **kwargs)
+	builtins.__import__ = failing_import
+	logged = _Count()
+	logging.getLogger().addHandler(logged)
+	logging.getLogger().setLevel(logging.INFO)
+	try:
+		for _ in range(100):
+			assert engine.resolve_engine(engine.ENGINE_INPROCESS) == engine.ENGINE_SUBPROCESS
+	finally:
+		builtins.__import__ = real_import
+		logging.getLogger().removeHandler(logged)
+	assert len(attempts) == 1, f"yt_dlp imported {len(attempts)} times"
+	assert logged.records == 1, f"failure logged {logged.records} times"
+	print("engine: failed yt_dlp import tried and logged once for 100 jobs - OK")
+
+if __name__ == "__main__":
+	main()
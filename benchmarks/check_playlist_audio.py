@@ -0,0 +1,44 @@
+"""
+Regression check for staged audio jobs from a playlist.
+
+A staged download lands in the staging folder, not in yt-dlp's playlist
+subfolder, so that folder did not exist when ffmpeg was told to write the
+converted file into it. This builds the target path the way the download
+thread does for a playlist audio job (in a temporary download folder) and
+checks that postprocess.converting_path creates the playlist folder before the
+conversion writes there.
+
+Usage:
+	python benchmarks/check_playlist_audio.py
+"""
+import os
+import shutil
+import tempfile
+
+from _common import load_module
+
+def main():
+	downloader = load_module("downloader")
+	postprocess = load_module("postprocess")
+	download_path = tempfile.mkdtemp()
+	try:
+		source = os.path.join(download_path, "staged", "Song: Live [dQw4w9WgXcQ].webm")
+		final_dir = downloader.output_dir(download_path, "My / Playlist")
+		target = postprocess.target_path(source, final_dir, "mp3", "dQw4w9WgXcQ")
+		assert not os.path.isdir(final_dir), final_dir
+		tmp_target = postprocess.converting_path(target)
+		assert os.path.isdir(final_dir), f"playlist folder not created: {final_dir}"
+		assert os.path.dirname(tmp_target) == final_dir, tmp_target
+		# Writing and renaming the way transcode does must work now
+		with open(tmp_target, 'w') as f:
+			f.write("")
+		os.replace(tmp_target, target)
+		assert os.path.isfile(os.path.join(final_dir, "Song: Live.mp3")), target
+		# Called again for the next track of the same playlist
+		postprocess.converting_path(target)
+	finally:
+		shutil.rmtree(download_path)
+	print("playlist audio: target folder created before conversion - OK")
+
+if __name__ == "__main__":
+	main()
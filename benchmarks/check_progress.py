@@ -0,0 +1,119 @@
+"""
+Regression checks for the progress records, on output printed by yt-dlp itself
+(see _records.py; the saved capture is used if yt_dlp is not installed).
+
+- progress: every record line parses, download records carry bytes and file
+  names, a record with missing fields is still valid JSON
+- concurrency: the adaptive controller counts the bytes of those records and
+  adds a slot when all slots are busy
+- pool: a SubprocessWorker splits one process's output for two items (with
+  warnings in between) back into each item's own lines
+
+Usage:
+	python benchmarks/check_progress.py [--saved]
+"""
+import io
+import argparse
+
+import _records
+from _common import load_module
+
+def check_parse(progress, lines):
+	records = [line for line in lines if progress.PREFIX in line]
+	assert records, "yt-dlp printed no records"
+	events = [progress.parse_line(line) for line in records]
+	unparsed = [line for line, event in zip(records, events) if event is None]
+	assert not unparsed, f"{len(unparsed)} of {len(records)} records did not parse, e.g. {unparsed[0]}"
+	downloads = [event for event in events if event.kind == progress.KIND_DOWNLOAD]
+	assert downloads, "no download records"
+	for event in downloads:
+		assert event.video_id and event.filename and event.downloaded_bytes is not None, event
+	assert any(event.percent is not None for event in downloads)
+	files = [event for event in events if event.kind == progress.KIND_FILE]
+	assert sorted(event.video_id for event in files) == sorted(_records.CAPTURE_IDS), files
+	if _records.have_yt_dlp():
+		# Nothing but the ID and status known, as in an early record of a fragmented download
+		line = _records.render(progress, progress.KIND_DOWNLOAD, {'id': "dQw4w9WgXcQ"}, {'status': "downloading"})
+		event = progress.parse_line(line)
+		assert event is not None and event.status == "downloading" and event.total_bytes is None, line
+	print(f"progress: {len(records)} records from yt-dlp parsed - OK")
+
+def check_concurrency(progress, lines):
+	concurrency = load_module("concurrency")
+	controller = concurrency.ConcurrencyController(lambda: (True, 1, 6))
+	# What the download thread passes on: download records while downloading
+	events = [event for event in map(progress.parse_line, lines) if event and event.kind == progress.KIND_DOWNLOAD and event.status == "downloading"]
+	per_job = sum(max(event.downloaded_bytes for event in events if event.filename == name) for name in set(event.filename for event in events))
+	active = concurrency.INITIAL_LIMIT
+	for d_id in range(active):
+		for event in events:
+			controller.record_progress(d_id, event)
+	counted = controller.window_bytes
+	assert counted == active * per_job, (counted, active * per_job)
+	# Close the window as if WINDOW seconds had passed
+	controller.window_start -= concurrency.WINDOW
+	limit = controller.evaluate(active, 5)
+	assert limit == concurrency.INITIAL_LIMIT + 1, controller.stats()
+	print(f"concurrency: {counted} bytes counted, limit {concurrency.INITIAL_LIMIT} -> {limit} - OK")
+
+class _WorkerProcess:
+	"""The worker's yt-dlp process: stdout is the captured output."""
+	def __init__(self, text):
+		self.stdout = io.StringIO(text)
+		self.returncode = None
+
+	def wait(self, timeout=None):
+		self.returncode = 0
+		return 0
+
+	def kill(self):
+		pass
+
+	terminate = kill
+
+def check_pool(progress, lines):
+	pool = load_module("pool")
+	first, second = _records.CAPTURE_IDS
+	# Plain output between the records, as yt-dlp prints it for either item
+	output = []
+	for index, line in enumerate(lines):
+		output.append(line)
+		if index % 3 == 0:
+			output.append("WARNING: [generic] Falling back on generic information extractor")
+	spawned = []
+
+	def start_process(*args, **kwargs):
+		spawned.append(kwargs.get('more_urls'))
+		return _WorkerProcess("\n".join(output) + "\n")
+	pool.downloader.download_video_with_process = start_process
+
+	items = [(1, "https://youtu.be/" + first), (2, "https://www.youtube.com/watch?v=" + second)]
+	worker = pool.SubprocessWorker(items)
+	received = {}
+	for d_id, url in items:
+		item = worker.start(d_id, url, "", False, "720p", None, None, lambda status: None)
+		received[d_id] = [progress.parse_line(line) for line in item.stdout]
+		assert item.wait() == 0 and item.finished, (d_id, item.returncode)
+	assert len(spawned) == 1 and spawned[0] == [items[1][1]], spawned
+	for d_id, video_id in ((1, first), (2, second)):
+		events = [event for event in received[d_id] if event is not None]
+		expected = [line for line in lines if progress.PREFIX in line and f'"{video_id}"' in line]
+		assert len(events) == len(expected) and all(event.video_id == video_id for event in events), (d_id, len(events), len(expected))
+		assert any(event.kind == progress.KIND_DOWNLOAD and event.percent for event in events)
+		assert events[-1].kind == progress.KIND_FILE
+	worker.close()
+	print(f"pool: {len(received[1])} + {len(received[2])} lines split between two items of one process - OK")
+
+def main():
+	parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+	parser.add_argument("--saved", action="store_true", help="Use the saved capture even if yt_dlp is installed")
+	args = parser.parse_args()
+
+	progress = load_module("progress")
+	lines = _records.captured() if args.saved else _records.real_lines(progress)
+	check_parse(progress, lines)
+	check_concurrency(progress, lines)
+	check_pool(progress, lines)
+
+if __name__ == "__main__":
+	main()
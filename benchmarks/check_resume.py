@@ -0,0 +1,143 @@
+"""
+Regression check for resuming downloads on the yt-dlp.exe engine.
+
+Runs GlobalPlugin._run_download_thread (against the stub NVDA modules of
+bench_startup) with a stand-in for yt-dlp.exe that prints records yt-dlp
+itself printed (see _records.py) and dies partway through the file. Checks
+that the partial file's byte offset reached the job store's journal while
+the download was still running, i.e. that it would survive a crash, and that
+the next run passes --continue and counts the resumed bytes.
+
+Usage:
+	python benchmarks/check_resume.py
+"""
+import os
+import sys
+import json
+import shutil
+import tempfile
+import subprocess
+import importlib.util
+
+import _records
+from _common import PACKAGE_DIR, PACKAGE_NAME
+
+class FakeProcess:
+	"""Plays back output lines like a yt-dlp.exe Popen; on_line(index) runs before each line and at the end."""
+	def __init__(self, lines, returncode, on_line=None):
+		self.lines = lines
+		self.returncode = None
+		self.final_returncode = returncode
+		self.on_line = on_line
+		self.stdout = self._stdout()
+
+	def _stdout(self):
+		for index, line in enumerate(self.lines):
+			if self.on_line:
+				self.on_line(index)
+			yield line + "\n"
+		if self.on_line:
+			self.on_line(len(self.lines))
+
+	def poll(self):
+		return self.returncode
+
+	def wait(self, timeout=None):
+		self.returncode = self.final_returncode
+		return self.returncode
+
+	def terminate(self):
+		pass
+
+	kill = terminate
+
+def journal_jobs(path):
+	"""Last journaled version of every job."""
+	jobs = {}
+	if os.path.exists(path):
+		with open(path, 'r', encoding='utf-8') as f:
+			for line in f:
+				record = json.loads(line)
+				if record['op'] == 'put':
+					jobs[record['id']] = record['job']
+	return jobs
+
+def child():
+	from bench_startup import install_stubs
+	install_stubs()
+	spec = importlib.util.spec_from_file_location(PACKAGE_NAME, os.path.join(PACKAGE_DIR, "__init__.py"), submodule_search_locations=[PACKAGE_DIR])
+	package = importlib.util.module_from_spec(spec)
+	sys.modules[PACKAGE_NAME] = package
+	spec.loader.exec_module(package)
+	from youtubeDownloader import downloader, progress, store
+	from youtubeDownloader.jobs import JobState
+	# The saved capture's files are 2 MiB, checkpoint well inside one
+	store.CHECKPOINT_BYTES = 256 * 1024
+
+	plugin = package.GlobalPlugin()
+	plugin.ensure_state_loaded()
+	plugin._process_queue = lambda: None
+	d_id = plugin.next_download_id
+	plugin.start_download("https://www.youtube.com/watch?v=" + _records.CAPTURE_IDS[0], False, "720p", None, None, known_title="Song")
+
+	video_lines = [line for line in _records.captured() if _records.CAPTURE_IDS[0] in line]
+	records = [progress.parse_line(line) for line in video_lines]
+	# yt-dlp dies once a good part of the file is on disk
+	crash_at = next(index for index, event in enumerate(records) if (event.downloaded_bytes or 0) >= 4 * store.CHECKPOINT_BYTES) + 1
+	journaled = {}
+
+	def before_line(index):
+		if index == crash_at:
+			# What a crash right now would leave behind
+			plugin.job_store.flush()
+			journaled.update(journal_jobs(plugin.job_store.journal_path).get(str(d_id), {}))
+	calls = []
+
+	def start(*args):
+		calls.append(args)
+		if len(calls) == 1:
+			return FakeProcess(video_lines[:crash_at], 1, before_line)
+		return FakeProcess(video_lines, 0)
+	downloader.download_video_with_process = start
+
+	def run():
+		plugin._update_ui_status(d_id, "Starting...", state=JobState.STARTING)
+		plugin._run_download_thread(d_id, *plugin._download_args(plugin.downloads[d_id]['params']))
+
+	run()
+	filename = records[0].filename
+	reached = max(event.downloaded_bytes for event in records[:crash_at] if event.kind == progress.KIND_DOWNLOAD)
+	assert plugin.downloads[d_id]['partial_files'] == {filename: reached}, plugin.downloads[d_id].get('partial_files')
+	assert journaled.get('state') == JobState.DOWNLOADING.value, journaled.get('state')
+	saved = journaled.get('partial_files', {}).get(filename)
+	assert saved and saved >= store.CHECKPOINT_BYTES, f"no checkpoint in the journal while downloading: {journaled.get('partial_files')}"
+	print(f"checkpoint: {saved} of {reached} bytes journaled before the crash")
+
+	plugin.retry_download(d_id)
+	plugin.downloads[d_id]['manual_stop'] = False
+	run()
+	extra_args = calls[1][-1]
+	assert "--continue" in extra_args, extra_args
+	assert plugin.downloads[d_id].get('resumed_bytes'), "resumed bytes not counted"
+	assert plugin.downloads[d_id]['partial_files'] == {}
+	assert plugin.downloads[d_id]['state'] == JobState.COMPLETED.value, plugin.downloads[d_id]['state']
+	plugin.terminate()
+	print("resume: partial offsets journaled while downloading, next run continues - OK")
+
+def main():
+	if "--child" in sys.argv:
+		child()
+		return
+	home = tempfile.mkdtemp(prefix="check_resume_")
+	try:
+		env = dict(os.environ, HOME=home, USERPROFILE=home)
+		result = subprocess.run([sys.executable, os.path.abspath(__file__), "--child"], env=env, cwd=os.path.dirname(os.path.abspath(__file__)), capture_output=True, text=True)
+		print(result.stdout, end="")
+		if result.returncode != 0:
+			print(result.stderr, end="")
+			sys.exit(result.returncode)
+	finally:
+		shutil.rmtree(home, ignore_errors=True)
+
+if __name__ == "__main__":
+	main()
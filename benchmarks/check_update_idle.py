@@ -0,0 +1,52 @@
+"""
+Regression check for swapping in a staged yt-dlp update.
+
+The update used to go in whenever no download held a slot, but the resolver,
+the dialog's info probe, the clipboard prefetch and playlist listings run
+yt-dlp.exe too. This stages an update (in a temporary folder) while a process
+started the way downloader starts yt-dlp.exe is still running, e.g. an info
+probe, and checks that the update waits until that process has ended.
+
+Usage:
+	python benchmarks/check_update_idle.py
+"""
+import os
+import sys
+import shutil
+import tempfile
+import subprocess
+
+from _common import load_module
+
+def main():
+	downloader = load_module("downloader")
+	updater = load_module("updater")
+	folder = tempfile.mkdtemp()
+	try:
+		binary = os.path.join(folder, "yt-dlp.exe")
+		downloader.get_yt_dlp_path = lambda: binary
+		with open(binary, 'w') as f:
+			f.write("old")
+		update = updater.Updater(lambda: 24, lambda: downloader.running_processes() == 0, state_path=os.path.join(folder, "state.json"))
+		with open(update.staged_path, 'w') as f:
+			f.write("new")
+		update.state['staged_version'] = "2099.01.01"
+
+		# Stands in for an info probe: runs until its input is closed
+		probe = downloader._start_yt_dlp([sys.executable, "-c", "import sys; sys.stdin.read()"], stdin=subprocess.PIPE)
+		try:
+			assert downloader.running_processes() == 1
+			assert update.apply_staged() is None, "update swapped in while yt-dlp.exe was running"
+		finally:
+			probe.stdin.close()
+			probe.wait()
+		assert downloader.running_processes() == 0
+		assert update.apply_staged() == "2099.01.01"
+		with open(binary) as f:
+			assert f.read() == "new"
+	finally:
+		shutil.rmtree(folder)
+	print("update: waits for running yt-dlp.exe processes, then installs - OK")
+
+if __name__ == "__main__":
+	main()
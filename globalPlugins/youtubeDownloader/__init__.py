@@ -1,19 +1,30 @@
 import globalPluginHandler
 import addonHandler
 import wx
-from . import dialogs
 import os
 import logging
 import api
 import controlTypes
-from NVDAObjects.IAccessible import IAccessible
 import threading
-import subprocess
-from . import downloader
+import time
+import functools
+from . import cache
+from . import resolver
+from . import progress
+from . import status
+from . import jobs
+from .jobs import JobState
+from . import scheduler
+from . import concurrency
+from . import bandwidth
+from . import store
+from . import archive
+from . import urls
+from . import browser
+from . import clipboard
 import config
 import gui
 from gui import guiHelper, settingsDialogs
-from urllib.parse import urlparse
 
 
 # Try to import UIAHandler (only available in NVDA)
@@ -39,7 +50,25 @@ confspec = {
 		"sponsorBlockEnabled": "boolean(default=False)",
 		"embedMetadata": "boolean(default=True)",
 		"downloadSubtitles": "boolean(default=False)",
-		"normalizeAudio": "boolean(default=False)"
+		"normalizeAudio": "boolean(default=False)",
+		"normalizeMode": "option('twopass', 'tags', default='twopass')",
+		"engine": "option('subprocess', 'inprocess', default='subprocess')",
+		"uiUpdateRate": "integer(default=4, min=1, max=30)",
+		"adaptiveConcurrency": "boolean(default=True)",
+		"minConcurrent": "integer(default=1, min=1, max=16)",
+		"maxConcurrent": "integer(default=6, min=1, max=16)",
+		"bandwidthLimit": "integer(default=0, min=0)",
+		"bandwidthSchedule": "string(default='')",
+		"autoResume": "boolean(default=True)",
+		"resumeDelay": "integer(default=5, min=0, max=600)",
+		"skipDownloaded": "boolean(default=True)",
+		"concurrentFragments": "integer(default=4, min=1, max=16)",
+		"externalDownloader": "option('none', 'aria2c', default='none')",
+		"downloaderConnections": "integer(default=8, min=1, max=16)",
+		"batchWorkerSize": "integer(default=8, min=1, max=50)",
+		"convertWorkers": "integer(default=0, min=0, max=32)",
+		"updateCheckHours": "integer(default=24, min=1, max=720)",
+		"prefetchClipboard": "boolean(default=False)"
 	}
 }
 config.conf.spec.update(confspec)
@@ -48,6 +77,9 @@ class YouTubeDownloaderSettingsPanel(settingsDialogs.SettingsPanel):
 	title = _("YouTube Downloader")
 	
 	def makeSettings(self, settingsSizer):
+		from . import downloader
+		from . import engine
+		from . import loudness
 		sHelper = guiHelper.BoxSizerHelper(self, sizer=settingsSizer)
 		
 		# Download Path
@@ -65,6 +97,7 @@ class YouTubeDownloaderSettingsPanel(settingsDialogs.SettingsPanel):
 		b_update = wx.Button(self, label=_("Check for Updates"))
 		b_update.Bind(wx.EVT_BUTTON, self.onCheckUpdates)
 		sHelper.addItem(b_update)
+		self.spinUpdateHours = sHelper.addLabeledControl(_("Hours between automatic yt-dlp update checks:"), wx.SpinCtrl, min=1, max=720, initial=config.conf["youtubeDownloader"]["updateCheckHours"])
 		
 		# SponsorBlock Setting
 		self.chkSponsorBlock = wx.CheckBox(self, label=_("Enable SponsorBlock (Remove Sponsors)"))
@@ -85,19 +118,71 @@ class YouTubeDownloaderSettingsPanel(settingsDialogs.SettingsPanel):
 		self.chkNormalize = wx.CheckBox(self, label=_("Normalize Audio (Consistent Volume)"))
 		self.chkNormalize.Value = config.conf["youtubeDownloader"]["normalizeAudio"]
 		sHelper.addItem(self.chkNormalize)
+		self.normalizeModes = [loudness.MODE_TWO_PASS, loudness.MODE_TAGS]
+		normalize_labels = [_("Adjust the audio (two-pass loudness normalization)"), _("Only add ReplayGain tags (no re-encoding, needs a player that reads them)")]
+		self.choiceNormalizeMode = sHelper.addLabeledControl(_("Normalization method:"), wx.Choice, choices=normalize_labels)
+		self.choiceNormalizeMode.SetSelection(self.normalizeModes.index(config.conf["youtubeDownloader"]["normalizeMode"]))
+
+		# Download Engine Setting
+		self.engines = [engine.ENGINE_SUBPROCESS, engine.ENGINE_INPROCESS]
+		engine_labels = [_("yt-dlp.exe (separate process per download)"), _("Built-in (in-process, needs the yt_dlp package)")]
+		self.choiceEngine = sHelper.addLabeledControl(_("Download Engine:"), wx.Choice, choices=engine_labels)
+		self.choiceEngine.SetSelection(self.engines.index(config.conf["youtubeDownloader"]["engine"]))
+
+		# Progress refresh rate (lower keeps NVDA more responsive with many downloads)
+		self.spinUpdateRate = sHelper.addLabeledControl(_("Progress updates per second:"), wx.SpinCtrl, min=1, max=30, initial=config.conf["youtubeDownloader"]["uiUpdateRate"])
+
+		# Transfer Settings (per download)
+		self.spinFragments = sHelper.addLabeledControl(_("Fragments downloaded in parallel per download:"), wx.SpinCtrl, min=1, max=16, initial=config.conf["youtubeDownloader"]["concurrentFragments"])
+		self.externalDownloaders = [downloader.EXTERNAL_DOWNLOADER_NONE, downloader.EXTERNAL_DOWNLOADER_ARIA2C]
+		downloader_labels = [_("Built-in"), _("aria2c (needs aria2c.exe in the bin folder or on PATH)")]
+		self.choiceDownloader = sHelper.addLabeledControl(_("Downloader:"), wx.Choice, choices=downloader_labels)
+		self.choiceDownloader.SetSelection(self.externalDownloaders.index(config.conf["youtubeDownloader"]["externalDownloader"]))
+		self.spinConnections = sHelper.addLabeledControl(_("Connections per file (aria2c):"), wx.SpinCtrl, min=1, max=16, initial=config.conf["youtubeDownloader"]["downloaderConnections"])
+		self.spinWorkerSize = sHelper.addLabeledControl(_("Playlist videos downloaded per yt-dlp instance (1 for one each):"), wx.SpinCtrl, min=1, max=50, initial=config.conf["youtubeDownloader"]["batchWorkerSize"])
+
+		# Concurrency Settings
+		self.chkAdaptive = wx.CheckBox(self, label=_("Adjust number of simultaneous downloads to connection speed"))
+		self.chkAdaptive.Value = config.conf["youtubeDownloader"]["adaptiveConcurrency"]
+		sHelper.addItem(self.chkAdaptive)
+		self.spinMinConcurrent = sHelper.addLabeledControl(_("Minimum simultaneous downloads:"), wx.SpinCtrl, min=1, max=16, initial=config.conf["youtubeDownloader"]["minConcurrent"])
+		self.spinMaxConcurrent = sHelper.addLabeledControl(_("Maximum simultaneous downloads:"), wx.SpinCtrl, min=1, max=16, initial=config.conf["youtubeDownloader"]["maxConcurrent"])
+		self.spinConvertWorkers = sHelper.addLabeledControl(_("Simultaneous audio conversions (0 = one per CPU core):"), wx.SpinCtrl, min=0, max=32, initial=config.conf["youtubeDownloader"]["convertWorkers"])
+
+		# Bandwidth Settings (shared by all downloads)
+		self.spinBandwidth = sHelper.addLabeledControl(_("Total download speed limit in KiB/s (0 = unlimited):"), wx.SpinCtrl, min=0, max=1000000, initial=config.conf["youtubeDownloader"]["bandwidthLimit"])
+		self.bandwidthScheduleEntry = sHelper.addLabeledControl(_("Speed limit schedule (e.g. 09:00-17:00=256, 22:00-06:00=0):"), wx.TextCtrl)
+		self.bandwidthScheduleEntry.Value = config.conf["youtubeDownloader"]["bandwidthSchedule"]
+
+		# Download Archive Setting
+		self.chkSkipDownloaded = wx.CheckBox(self, label=_("Skip videos that were already downloaded in the same format"))
+		self.chkSkipDownloaded.Value = config.conf["youtubeDownloader"]["skipDownloaded"]
+		sHelper.addItem(self.chkSkipDownloaded)
+
+		# Resume Settings
+		self.chkAutoResume = wx.CheckBox(self, label=_("Resume interrupted downloads when NVDA starts"))
+		self.chkAutoResume.Value = config.conf["youtubeDownloader"]["autoResume"]
+		sHelper.addItem(self.chkAutoResume)
+		self.spinResumeDelay = sHelper.addLabeledControl(_("Seconds to wait before resuming:"), wx.SpinCtrl, min=0, max=600, initial=config.conf["youtubeDownloader"]["resumeDelay"])
+
+		# Clipboard Prefetch
+		self.chkPrefetchClipboard = wx.CheckBox(self, label=_("Fetch video details in the background when a YouTube link is copied"))
+		self.chkPrefetchClipboard.Value = config.conf["youtubeDownloader"]["prefetchClipboard"]
+		sHelper.addItem(self.chkPrefetchClipboard)
 		
 	def onCheckUpdates(self, event):
 		# We need to run this in a thread to not block GUI
 		threading.Thread(target=self._run_manual_update).start()
 		
-	def _run_manual_update(self):
-		# Get the plugin instance
-		plugin = None
+	def _get_plugin(self):
+		"""Returns the running GlobalPlugin instance, or None."""
 		for p in globalPluginHandler.runningPlugins:
 			if isinstance(p, GlobalPlugin):
-				plugin = p
-				break
-				
+				return p
+		return None
+
+	def _run_manual_update(self):
+		plugin = self._get_plugin()
 		if plugin:
 			result = plugin._silent_update(manual=True)
 			wx.CallAfter(wx.MessageBox, result, _("Update Check"), wx.OK | wx.ICON_INFORMATION)
@@ -112,10 +197,32 @@ class YouTubeDownloaderSettingsPanel(settingsDialogs.SettingsPanel):
 		
 	def onSave(self):
 		config.conf["youtubeDownloader"]["downloadPath"] = self.pathEntry.Value
+		config.conf["youtubeDownloader"]["updateCheckHours"] = self.spinUpdateHours.GetValue()
 		config.conf["youtubeDownloader"]["sponsorBlockEnabled"] = self.chkSponsorBlock.Value
 		config.conf["youtubeDownloader"]["embedMetadata"] = self.chkEmbedMetadata.Value
 		config.conf["youtubeDownloader"]["downloadSubtitles"] = self.chkSubtitles.Value
 		config.conf["youtubeDownloader"]["normalizeAudio"] = self.chkNormalize.Value
+		config.conf["youtubeDownloader"]["normalizeMode"] = self.normalizeModes[self.choiceNormalizeMode.GetSelection()]
+		config.conf["youtubeDownloader"]["engine"] = self.engines[self.choiceEngine.GetSelection()]
+		config.conf["youtubeDownloader"]["uiUpdateRate"] = self.spinUpdateRate.GetValue()
+		config.conf["youtubeDownloader"]["concurrentFragments"] = self.spinFragments.GetValue()
+		config.conf["youtubeDownloader"]["externalDownloader"] = self.externalDownloaders[self.choiceDownloader.GetSelection()]
+		config.conf["youtubeDownloader"]["downloaderConnections"] = self.spinConnections.GetValue()
+		config.conf["youtubeDownloader"]["batchWorkerSize"] = self.spinWorkerSize.GetValue()
+		config.conf["youtubeDownloader"]["adaptiveConcurrency"] = self.chkAdaptive.Value
+		min_concurrent = self.spinMinConcurrent.GetValue()
+		config.conf["youtubeDownloader"]["minConcurrent"] = min_concurrent
+		config.conf["youtubeDownloader"]["maxConcurrent"] = max(min_concurrent, self.spinMaxConcurrent.GetValue())
+		config.conf["youtubeDownloader"]["convertWorkers"] = self.spinConvertWorkers.GetValue()
+		config.conf["youtubeDownloader"]["bandwidthLimit"] = self.spinBandwidth.GetValue()
+		config.conf["youtubeDownloader"]["bandwidthSchedule"] = self.bandwidthScheduleEntry.Value.strip()
+		config.conf["youtubeDownloader"]["autoResume"] = self.chkAutoResume.Value
+		config.conf["youtubeDownloader"]["skipDownloaded"] = self.chkSkipDownloaded.Value
+		config.conf["youtubeDownloader"]["resumeDelay"] = self.spinResumeDelay.GetValue()
+		config.conf["youtubeDownloader"]["prefetchClipboard"] = self.chkPrefetchClipboard.Value
+		plugin = self._get_plugin()
+		if plugin:
+			plugin.update_clipboard_watcher()
 
 class GlobalPlugin(globalPluginHandler.GlobalPlugin):
 	def __init__(self):
@@ -127,22 +234,77 @@ class GlobalPlugin(globalPluginHandler.GlobalPlugin):
 		
 		# Initialize state
 		self.dlg = None
-		self.downloads = {} # {id: {'title': str, 'status': str, 'process': Popen}}
+		self.downloads = {} # {id: {'title': str, 'state': JobState value, 'status': str, 'process': Popen}}
 		self.next_download_id = 0
-		self.is_updating = False
+		self.resumed_bytes_total = 0 # Bytes reused from .part files instead of downloaded again
+		self.job_store = store.JobStore(os.path.join(os.path.expanduser("~"), "nvda_yt_downloader_state.json"))
+		self.metadata_cache = cache.MetadataCache()
+		self.archive = archive.DownloadArchive()
+		self.browser_finder = browser.AddressBarFinder(controlTypes.Role.EDIT, controlTypes.Role.WINDOW)
+		self.clipboard_watcher = clipboard.ClipboardWatcher(self._prefetch_url, self._is_prefetched)
+		self.in_flight = {} # (video or playlist ID, format profile) -> d_id of a queued or running job
+		self.title_resolver = resolver.TitleResolver(self._fetch_info_batch, self._on_info_resolved)
+		self.status_aggregator = status.StatusAggregator(self._deliver_statuses, lambda: config.conf["youtubeDownloader"]["uiUpdateRate"])
 		
-		# Queue System
-		self.download_queue = [] # List of d_ids waiting to start
-		self.MAX_CONCURRENT = 3
+		# Queue System (the number of slots is adjusted by the concurrency controller)
+		self.concurrency = concurrency.ConcurrencyController(self._get_concurrency_settings)
+		self.scheduler = scheduler.Scheduler(self.concurrency.limit)
+		self.bandwidth = bandwidth.BandwidthBudget(lambda: (config.conf["youtubeDownloader"]["bandwidthLimit"], config.conf["youtubeDownloader"]["bandwidthSchedule"]), lambda: max(self.scheduler.max_active, self._get_concurrency_settings()[2]))
 		
 		# Create Menu
 		self.createMenu()
 		
-		# Start silent update check (Always enabled now)
-		threading.Thread(target=self._silent_update, daemon=True).start()
+		# Opt-in: warm the metadata cache for copied links
+		self.update_clipboard_watcher()
 			
-		# Load saved downloads
-		self.load_state()
+		# Saved downloads are read off NVDA's startup path and applied on the main thread afterwards.
+		# The parts that run processes (and their modules) are set up on the same thread.
+		self.state_loaded = False
+		self.saved_state = None
+		self.state_reader = threading.Thread(target=self._read_state, daemon=True)
+		self.state_reader.start()
+
+	def _create_stages(self):
+		"""Sets up conversion and yt-dlp updates (state thread); importing them pulls in subprocess."""
+		from . import downloader
+		from . import postprocess
+		from . import loudness
+		from . import updater
+		# Audio conversion runs after the download slot is freed, on its own CPU-sized pool
+		self.converter = postprocess.StagePool(lambda: config.conf["youtubeDownloader"]["convertWorkers"] or postprocess.default_workers())
+		self.cpu_meter = postprocess.CpuMeter()
+		self.loudness_cache = loudness.MeasurementCache()
+		# yt-dlp self-update, swapped in only while no yt-dlp.exe is running (downloads, but
+		# also the resolver, dialog probes, clipboard prefetch and playlist listings)
+		self.updater = updater.Updater(lambda: config.conf["youtubeDownloader"]["updateCheckHours"], lambda: downloader.running_processes() == 0)
+
+	def _read_state(self):
+		self._create_stages()
+		try:
+			self.saved_state = self.job_store.load()
+		except Exception as e:
+			logging.error(f"Failed to read saved downloads: {e}")
+		wx.CallAfter(self.ensure_state_loaded)
+
+	def ensure_state_loaded(self):
+		"""
+		Applies the saved downloads once (main thread). Anything that shows or adds
+		downloads calls this first, so it never works on a half-loaded list.
+		"""
+		if self.state_loaded:
+			return
+		self.state_reader.join()
+		self.state_loaded = True
+		# A release staged in an earlier session is installed before anything uses the binary
+		self._apply_update()
+		self.load_state(self.saved_state)
+		self.saved_state = None
+		# Background update check, at most once per configured interval
+		if self.updater.is_due():
+			threading.Thread(target=self._silent_update, daemon=True).start()
+		if config.conf["youtubeDownloader"]["autoResume"]:
+			# Give NVDA a moment to finish starting before downloads compete for the line
+			wx.CallLater(max(1, config.conf["youtubeDownloader"]["resumeDelay"] * 1000), self._resume_interrupted)
 
 	def createMenu(self):
 		# Add to Tools menu
@@ -170,6 +332,11 @@ class GlobalPlugin(globalPluginHandler.GlobalPlugin):
 			
 		# Kill all active downloads
 		for d_id, data in self.downloads.items():
+			# Mark as interrupted first, so the dying thread cannot report it as an error
+			# (partial files are kept in the temp folder to resume from)
+			if jobs.get_state(data) not in jobs.TERMINAL_STATES:
+				jobs.transition(data, JobState.INTERRUPTED)
+				data['status'] = "Interrupted"
 			if data.get('process'):
 				try:
 					data['process'].terminate()
@@ -177,48 +344,65 @@ class GlobalPlugin(globalPluginHandler.GlobalPlugin):
 					data['process'].wait(timeout=1)
 				except:
 					pass
-			# Mark as interrupted if it was running
-			status = data.get('status', '')
-			if "Completed" not in status and "Error" not in status and "Stopped" not in status:
-				data['status'] = "Interrupted"
 		
-		self.save_state()
+		self.clipboard_watcher.stop()
+		# The conversion pool is set up on the state thread
+		self.state_reader.join()
+		# Waiting conversions resume from their staged files next time
+		self.converter.stop()
+		# Stop in-process jobs as well
+		from . import engine
+		engine.shutdown()
+		self.title_resolver.stop()
+		
+		self.metadata_cache.flush()
+		logging.info(f"Metadata cache stats: {self.metadata_cache.stats()}")
+		logging.info(f"Download concurrency stats: {self.concurrency.stats()}")
+		logging.info(f"Address bar lookup stats: {self.browser_finder.stats()}")
+		logging.info(f"Clipboard prefetch stats: {self.clipboard_watcher.stats()}")
+		logging.info(f"Audio conversion stats: {self.converter.stats()}")
+		logging.info(f"Audio conversion CPU stats: {self.cpu_meter.stats()}")
+		logging.info(f"Loudness measurement cache stats: {self.loudness_cache.stats()}")
+		logging.info(f"Bytes resumed from partial downloads this session: {self.resumed_bytes_total}")
+		
+		if self.state_loaded:
+			self.save_state()
+		else:
+			# Nothing was changed, just let the reader finish with the files
+			self.state_reader.join()
+			self.state_loaded = True
+		self.job_store.close()
 			
 		super(GlobalPlugin, self).terminate()
 
-	def save_state(self):
-		"""Saves the current downloads to a JSON file."""
-		state_file = os.path.join(os.path.expanduser("~"), "nvda_yt_downloader_state.json")
-		data_to_save = {}
-		for d_id, data in self.downloads.items():
+	def save_state(self, d_id=None):
+		"""
+		Persists one download (or all of them) through the job store.
+		Writes are journaled and batched, so this is cheap to call on every change.
+		"""
+		d_ids = [d_id] if d_id is not None else list(self.downloads)
+		for d_id in d_ids:
+			data = self.downloads.get(d_id)
 			# Skip completed items to keep list clean on restart
-			if "Completed" in data.get('status', ''):
+			if data is None or jobs.get_state(data) == JobState.COMPLETED:
+				self.job_store.delete(d_id)
 				continue
 				
 			# Create serializable copy
 			item = data.copy()
 			if 'process' in item:
 				del item['process']
-			data_to_save[d_id] = item
-			
-		try:
-			import json
-			with open(state_file, 'w', encoding='utf-8') as f:
-				json.dump(data_to_save, f, indent=4)
-		except Exception as e:
-			logging.error(f"Failed to save state: {e}")
+			if 'params' in item:
+				item['params'] = dict(item['params'])
+			if 'partial_files' in item:
+				item['partial_files'] = dict(item['partial_files'])
+			self.job_store.put(d_id, item)
 
-	def load_state(self):
-		"""Loads downloads from JSON file."""
-		state_file = os.path.join(os.path.expanduser("~"), "nvda_yt_downloader_state.json")
-		if not os.path.exists(state_file):
-			return
-			
+	def load_state(self, saved_data=None):
+		"""Loads downloads from the job store (snapshot + journal), or from saved_data already read from it."""
 		try:
-			import json
-			with open(state_file, 'r', encoding='utf-8') as f:
-				saved_data = json.load(f)
-				
+			if saved_data is None:
+				saved_data = self.job_store.load()
 			if not saved_data: return
 			
 			# Restore
@@ -229,8 +413,15 @@ class GlobalPlugin(globalPluginHandler.GlobalPlugin):
 				
 				# Reset process and status
 				data['process'] = None
-				status = data.get('status', '')
-				if "Error" not in status and "Stopped" not in status and "Completed" not in status:
+				data.pop('resolving', None)
+				if 'state' not in data:
+					# Saved by a version without job states
+					data['state'] = jobs.state_from_status(data.get('status', '')).value
+				params = data.get('params')
+				if 'dedup_key' not in data and params:
+					data['dedup_key'] = list(self._dedup_key(params['url'], params['is_audio'], params['quality_str'], params.get('audio_format', "mp3"), params.get('start_time'), params.get('end_time'), params.get('playlist_mode')))
+				if jobs.get_state(data) not in jobs.TERMINAL_STATES:
+					data['state'] = JobState.INTERRUPTED.value
 					data['status'] = "Interrupted"
 				
 				self.downloads[d_id] = data
@@ -240,157 +431,78 @@ class GlobalPlugin(globalPluginHandler.GlobalPlugin):
 			logging.error(f"Failed to load state: {e}")
 
 	def _silent_update(self, manual=False):
-		"""Runs yt-dlp -U to update the binary."""
-		self.is_updating = True
-		status_msg = "Update check failed."
-		try:
-			yt_dlp_path = downloader.get_yt_dlp_path()
-			if os.path.exists(yt_dlp_path):
-				logging.info("Checking for yt-dlp updates...")
-				# Hide console
-				startupinfo = subprocess.STARTUPINFO()
-				startupinfo.dwFlags |= subprocess.STARTF_USESHOWWINDOW
-				
-				# Capture output
-				proc = subprocess.run(
-					[yt_dlp_path, "-U"], 
-					capture_output=True, 
-					text=True, 
-					startupinfo=startupinfo, 
-					check=False,
-					encoding='utf-8', 
-					errors='replace',
-					timeout=120
-				)
-				
-				output = proc.stdout + "\n" + proc.stderr
-				logging.info(f"Update Output: {output}")
-				
-				if "up-to-date" in output or "is up to date" in output:
-					status_msg = "yt-dlp is up to date."
-				elif "Updating to version" in output:
-					# Parse version if possible
-					try:
-						ver = output.split("Updating to version")[1].split()[0]
-						status_msg = f"Updated yt-dlp to version {ver}."
-					except:
-						status_msg = "Updated yt-dlp to latest version."
-				else:
-					status_msg = f"Update Info: {output.strip()[:100]}..." # Truncate for msg box
-					
-		except Exception as e:
-			logging.error(f"Auto-update failed: {e}")
-			status_msg = f"Update failed: {str(e)}"
-		finally:
-			self.is_updating = False
-			# Process queue in case downloads were added while updating
-			wx.CallAfter(self._process_queue)
-			
+		"""
+		Checks for a new yt-dlp and stages it (worker thread). Downloads keep running meanwhile;
+		the new binary is swapped in once none of them is using the old one.
+		"""
+		# The updater is set up on the state thread
+		self.state_reader.join()
+		status_msg = self.updater.check(manual)
+		wx.CallAfter(self._apply_update)
 		return status_msg
 
+	def _apply_update(self):
+		"""Installs a staged yt-dlp if no yt-dlp.exe is running (main thread)."""
+		version = self.updater.apply_staged()
+		if version:
+			logging.info(f"yt-dlp updated to {version}")
+
 	scriptCategory = _("YouTube Downloader")
 
 	def script_openDownloader(self, gesture):
 		"""Opens the YouTube Downloader dialog."""
 		logging.info("Opening Downloader GUI")
-		url = self.get_video_url()
-		# Ensure we are on the main thread for GUI operations
-		wx.CallAfter(self._showGui, url)
+		focus = api.getFocusObject()
+		app_name = getattr(focus.appModule, 'appName', None)
+		# NVDA objects only work on the main thread, the walk runs there in short slices
+		self.get_video_url(focus, app_name, self._open_with_url)
 	
 	def script_openSettings(self, gesture):
 		"""Opens the YouTube Downloader settings."""
 		wx.CallAfter(gui.mainFrame._popupSettingsDialog, settingsDialogs.NVDASettingsDialog, YouTubeDownloaderSettingsPanel)
 
-	def get_video_url(self):
-		url = ""
-		
+	def get_video_url(self, focus, app_name, on_done):
+		"""Calls on_done with the YouTube address shown in the focused browser window, or '' (main thread)."""
+		def found(url):
+			# Secure Check
+			if urls.is_youtube_host(url):
+				logging.info(f"Found URL via UIA: {url}")
+				on_done(url)
+			else:
+				on_done("")
 		# Strategy 1: UIA (Robust Browser Detection)
 		if handler and UIA:
-			try:
-				# Get the foreground window
-				focus = api.getFocusObject()
-				if focus.appModule.appName in ["chrome", "msedge", "firefox", "brave"]:
-					# We are in a browser. Try to find the address bar.
-					# Helper to check if obj is address bar
-					def is_address_bar(obj):
-						if obj.role == controlTypes.Role.EDIT:
-							name = (obj.name or "").lower()
-							if "address" in name or "search" in name or "location" in name:
-								# Check value
-								# Check value
-								val = obj.value or ""
-								# Secure Check
-								try:
-									u = val
-									if "://" not in u:
-										u = "https://" + u
-									parsed = urlparse(u)
-									host = (parsed.hostname or "").lower()
-									if host in ["youtube.com", "www.youtube.com", "m.youtube.com", "music.youtube.com", "youtu.be"]:
-										return True
-								except:
-									pass
-						return False
-					# Search up to window
-					curr = focus
-					while curr and curr.role != controlTypes.Role.WINDOW:
-						curr = curr.parent
-					
-					window = curr
-					if window:
-						# BFS Search
-						queue = [window]
-						visited = set()
-						# Limit depth/count to avoid freeze
-						count = 0
-						while queue and count < 500:
-							node = queue.pop(0)
-							count += 1
-							
-							if is_address_bar(node):
-								url = node.value
-								logging.info(f"Found URL via UIA: {url}")
-								return url
-							
-							# Add children
-							child = node.firstChild
-							while child:
-								queue.append(child)
-								child = child.next
-			except Exception as e:
-				logging.error(f"UIA URL fetch failed: {type(e).__name__}: {e}", exc_info=True)
+			# CallLater lets NVDA handle queued events between slices of the walk
+			self.browser_finder.lookup(focus, app_name, found, lambda func: wx.CallLater(1, func))
+		else:
+			on_done("")
 
+	def _open_with_url(self, url):
 		# Strategy 2: Clipboard (Fallback)
 		if not url:
-			try:
-				if wx.TheClipboard.Open():
-					if wx.TheClipboard.IsSupported(wx.DataFormat(wx.DF_TEXT)):
-						data = wx.TextDataObject()
-						wx.TheClipboard.GetData(data)
-						text = data.GetText()
-						# Secure Check
-						is_yt = False
-						try:
-							u = text
-							if "://" not in u:
-								u = "https://" + u
-							parsed = urlparse(u)
-							host = (parsed.hostname or "").lower()
-							if host in ["youtube.com", "www.youtube.com", "m.youtube.com", "music.youtube.com", "youtu.be"]:
-								is_yt = True
-						except:
-							pass
-						
-						if is_yt:
-							url = text
-							logging.info(f"Found URL via Clipboard: {url}")
-					wx.TheClipboard.Close()
-			except:
-				pass
-			
+			url = self._get_clipboard_url()
+		self._showGui(url)
+
+	def _get_clipboard_url(self):
+		"""Returns a YouTube link from the clipboard, or '' (main thread)."""
+		url = ""
+		try:
+			if wx.TheClipboard.Open():
+				if wx.TheClipboard.IsSupported(wx.DataFormat(wx.DF_TEXT)):
+					data = wx.TextDataObject()
+					wx.TheClipboard.GetData(data)
+					text = data.GetText()
+					# Secure Check
+					if urls.is_youtube_host(text):
+						url = text
+						logging.info(f"Found URL via Clipboard: {url}")
+				wx.TheClipboard.Close()
+		except:
+			pass
 		return url
 
 	def _showGui(self, url=""):
+		self.ensure_state_loaded()
 		if self.dlg:
 			self.dlg.Raise()
 			self.dlg.SetFocus()
@@ -398,34 +510,87 @@ class GlobalPlugin(globalPluginHandler.GlobalPlugin):
 				self.dlg.txt_url.Value = url
 			return
 
-		# Create and show the dialog
+		# Create and show the dialog (imported on first use, it is not needed while NVDA starts)
 		# We pass self (plugin instance) to the dialog
+		from . import dialogs
 		self.dlg = dialogs.DownloaderDialog(None, self, url)
 		self.dlg.Show()
 		self.dlg.Raise()
 		self.dlg.SetFocus()
 
-	def is_url_downloading(self, url):
-		"""Checks if a URL is currently being downloaded."""
-		for data in self.downloads.values():
-			if data.get('url') == url and data.get('status') != "Completed" and data.get('status') != "Error":
-				return True
-		return False
+	def _dedup_key(self, url, is_audio, quality_str, audio_format="mp3", start_time=None, end_time=None, playlist_mode=None):
+		"""
+		Key of the in-flight index: the canonical video (or playlist) ID plus the format profile,
+		so every spelling of a link maps to the same job. Clips of one video are different jobs.
+		"""
+		parsed = urls.parse(url)
+		if parsed and playlist_mode is True and parsed.playlist_id:
+			target = "playlist:" + parsed.playlist_id
+		elif parsed and parsed.channel:
+			target = "channel:" + parsed.channel
+		elif parsed and parsed.video_id:
+			target = parsed.video_id
+		else:
+			target = url.strip()
+		profile = archive.format_profile(is_audio, quality_str, audio_format)
+		if start_time and end_time:
+			profile += f"@{start_time}-{end_time}"
+		return (target, profile)
+
+	def _index_job(self, d_id):
+		key = tuple(self.downloads[d_id]['dedup_key'])
+		self.in_flight[key] = d_id
+
+	def _unindex_job(self, d_id):
+		data = self.downloads.get(d_id)
+		if not data or 'dedup_key' not in data:
+			return
+		key = tuple(data['dedup_key'])
+		if self.in_flight.get(key) == d_id:
+			del self.in_flight[key]
+
+	def is_url_downloading(self, url, is_audio, quality_str, audio_format="mp3", start_time=None, end_time=None, playlist_mode=None):
+		"""Checks if the same video in the same format is already queued or downloading (O(1))."""
+		return self._dedup_key(url, is_audio, quality_str, audio_format, start_time, end_time, playlist_mode) in self.in_flight
 
 	def start_batch_download(self, playlist_url, is_audio, quality_str, items, playlist_title, audio_format="mp3"):
 		"""Starts downloads for multiple items from a playlist."""
+		self.ensure_state_loaded()
 		# items is list of {'id':..., 'title':...}
+		# Already downloaded or already queued videos are dropped before anything is queued
+		skip_downloaded = config.conf["youtubeDownloader"]["skipDownloaded"]
+		profile = archive.format_profile(is_audio, quality_str, audio_format)
+		new_items = []
+		for item in items:
+			if skip_downloaded and self.archive.contains(item['id'], profile):
+				continue
+			if (item['id'], profile) in self.in_flight:
+				continue
+			new_items.append(item)
+		skipped = len(items) - len(new_items)
+		if skipped:
+			import ui
+			ui.message(f"Skipping {skipped} videos that are already downloaded or in the list")
+		items = new_items
+		# The whole selection shares one batch, which takes turns with other batches for slots
+		batch = f"playlist_{self.next_download_id}"
 		for item in items:
 			video_id = item['id']
 			video_title = item['title']
-			video_url = f"https://www.youtube.com/watch?v={video_id}"
+			video_url = urls.watch_url(video_id)
 			
 			# We pass playlist_title to ensure they go into the same folder
 			# We pass video_title as known_title to avoid "Resolving..."
-			self.start_download(video_url, is_audio, quality_str, None, None, playlist_mode=False, playlist_title=playlist_title, known_title=video_title)
+			self.start_download(video_url, is_audio, quality_str, None, None, playlist_mode=False, playlist_title=playlist_title, known_title=video_title, audio_format=audio_format, batch=batch)
+
+	def start_download(self, url, is_audio, quality_str, start_time, end_time, playlist_mode=None, playlist_items=None, playlist_title=None, known_title=None, audio_format="mp3", batch=None, priority=scheduler.PRIORITY_NORMAL):
+		"""Adds a download to the queue. Returns its ID, or None if it was already downloaded."""
+		self.ensure_state_loaded()
+		if self.is_archived(url, is_audio, quality_str, audio_format, start_time, end_time, playlist_mode):
+			import ui
+			ui.message(f"Already downloaded: {known_title or url}")
+			return None
 
-	def start_download(self, url, is_audio, quality_str, start_time, end_time, playlist_mode=None, playlist_items=None, playlist_title=None, known_title=None, audio_format="mp3"):
-		"""Adds a download to the queue."""
 		d_id = self.next_download_id
 		self.next_download_id += 1
 		
@@ -434,16 +599,28 @@ class GlobalPlugin(globalPluginHandler.GlobalPlugin):
 		embed_metadata = config.conf["youtubeDownloader"]["embedMetadata"]
 		download_subs = config.conf["youtubeDownloader"]["downloadSubtitles"]
 		normalize_audio = config.conf["youtubeDownloader"]["normalizeAudio"]
+		concurrent_fragments = config.conf["youtubeDownloader"]["concurrentFragments"]
+		external_downloader = config.conf["youtubeDownloader"]["externalDownloader"]
+		downloader_connections = config.conf["youtubeDownloader"]["downloaderConnections"]
 		
+		dedup_key = self._dedup_key(url, is_audio, quality_str, audio_format, start_time, end_time, playlist_mode)
+		if dedup_key in self.in_flight:
+			logging.info(f"Not adding duplicate download {url}")
+			return None
+
 		initial_title = known_title if known_title else f"Resolving... {url}"
 		if playlist_title and not known_title:
 			initial_title = f"{playlist_title} - Item"
 			
 		self.downloads[d_id] = {
 			'title': initial_title,
+			'state': JobState.QUEUED.value,
 			'status': "Queued",
 			'process': None,
 			'url': url,
+			'dedup_key': list(dedup_key),
+			'batch': batch or scheduler.ADHOC_BATCH,
+			'priority': priority,
 			'params': {
 				'url': url,
 				'is_audio': is_audio,
@@ -460,53 +637,197 @@ class GlobalPlugin(globalPluginHandler.GlobalPlugin):
 				'embed_metadata': embed_metadata,
 				'download_subs': download_subs,
 				'normalize_audio': normalize_audio,
-				'audio_format': audio_format
+				'audio_format': audio_format,
+				'concurrent_fragments': concurrent_fragments,
+				'external_downloader': external_downloader,
+				'downloader_connections': downloader_connections
 			}
 		}
 		
+		self._index_job(d_id)
+		self.save_state(d_id)
+		
 		# Update UI immediately
 		if self.dlg:
 			self.dlg.add_download_item(d_id, self.downloads[d_id]['title'])
 		
-		self.download_queue.append(d_id)
+		# Single videos without a title are resolved in batches before they take a slot
+		if not known_title and not playlist_title and playlist_mode is not True:
+			info = self.metadata_cache.get(urls.video_id(url))
+			if info and info.get('title'):
+				self.downloads[d_id]['title'] = info['title']
+				self.downloads[d_id]['params']['known_title'] = info['title']
+				self._update_ui_status(d_id, f"{info['title']} - Queued")
+			else:
+				self.downloads[d_id]['resolving'] = True
+				self._update_ui_status(d_id, f"{initial_title} - Resolving...", state=JobState.RESOLVING)
+				self.title_resolver.submit(d_id, url)
+				return
+		
+		self._enqueue(d_id)
 		self._process_queue()
 
-	def _process_queue(self):
-		"""Checks active downloads and starts new ones from queue."""
-		# Prevent starting downloads while updating binary
-		if self.is_updating:
+	def is_archived(self, url, is_audio, quality_str, audio_format="mp3", start_time=None, end_time=None, playlist_mode=None):
+		"""True if this exact download (video and format profile) is in the download archive."""
+		if not config.conf["youtubeDownloader"]["skipDownloaded"]:
+			return False
+		# Clips and whole-playlist jobs are never skipped up front
+		if (start_time and end_time) or playlist_mode is True:
+			return False
+		return self.archive.contains(urls.video_id(url), archive.format_profile(is_audio, quality_str, audio_format))
+
+	def _enqueue(self, d_id, front=False):
+		data = self.downloads[d_id]
+		return self.scheduler.enqueue(d_id, data.get('priority', scheduler.PRIORITY_NORMAL), data.get('batch', scheduler.ADHOC_BATCH), front)
+
+	def prioritize_download(self, d_id):
+		"""Moves a waiting job ahead of everything else ("Download Next")."""
+		data = self.downloads.get(d_id)
+		if not data:
 			return
+		data['priority'] = scheduler.PRIORITY_HIGH
+		# A job still being resolved keeps the priority for when it is queued
+		if self.scheduler.is_queued(d_id):
+			self._enqueue(d_id, front=True)
+			self._process_queue()
 
-		# Count active
-		active_count = 0
-		for data in self.downloads.values():
-			status = data.get('status', '')
-			# We consider these states as "taking up a slot"
-			if "Downloading" in status or "Starting" in status or "Resolving" in status or "Converting" in status or "Merging" in status or "Resuming" in status:
-				active_count += 1
-		
-		# Start new downloads if slots available
-		while active_count < self.MAX_CONCURRENT and self.download_queue:
-			d_id = self.download_queue.pop(0)
+	def _fetch_info_batch(self, urls):
+		"""Resolves a batch of URLs with one extraction call on the configured engine."""
+		from . import downloader
+		from . import engine
+		active_engine = engine.resolve_engine(config.conf["youtubeDownloader"]["engine"])
+		if active_engine == engine.ENGINE_INPROCESS:
+			results = engine.extract_info_batch(urls)
+		else:
+			results = downloader.fetch_video_info_batch(urls)
+		for info in results.values():
+			self.metadata_cache.put(info.get('id'), info)
+		return results
+
+	def _on_info_resolved(self, d_id, url, info):
+		# Called from the resolver thread, apply on the main thread
+		wx.CallAfter(self._apply_resolved_info, d_id, info)
+
+	def _apply_resolved_info(self, d_id, info):
+		data = self.downloads.get(d_id)
+		# Ignore results for items that were removed, stopped or retried meanwhile
+		if not data or not data.pop('resolving', False):
+			return
+		if info and info.get('title'):
+			data['title'] = info['title']
+			data['params']['known_title'] = info['title']
+		# Without a title the download thread will try once more on its own
+		if self._update_ui_status(d_id, f"{data['title']} - Queued", state=JobState.QUEUED):
+			self._enqueue(d_id)
+			self._process_queue()
+
+	def _process_queue(self):
+		"""Checks active downloads and starts new ones from queue."""
+		# Start new downloads if slots available (the scheduler tracks active slots itself)
+		for d_id in self.scheduler.dispatch():
 			if d_id in self.downloads:
 				# Double check it wasn't cancelled/removed
-				self._start_actual_download(d_id)
-				active_count += 1
+				self._start_actual_download(d_id, self._claim_worker_items(d_id))
+			else:
+				self.scheduler.finish(d_id)
 
-	def _start_actual_download(self, d_id):
-		"""Spawns the thread for a download."""
+	def _claim_worker_items(self, d_id):
+		"""
+		Takes the queued items that will share a playlist job's worker (see pool),
+		in queue order. They ride on its slot instead of taking their own.
+		"""
+		from . import pool
 		data = self.downloads[d_id]
 		params = data['params']
+		size = config.conf["youtubeDownloader"]["batchWorkerSize"]
+		batch = data.get('batch', scheduler.ADHOC_BATCH)
+		if size <= 1 or batch == scheduler.ADHOC_BATCH or params.get('playlist_mode') is True:
+			return []
+		key = pool.group_key(params)
+
+		def accept(other_id):
+			other = self.downloads.get(other_id)
+			return other is not None and jobs.get_state(other) == JobState.QUEUED and pool.group_key(other['params']) == key
+
+		return self.scheduler.claim(batch, data.get('priority', scheduler.PRIORITY_NORMAL), accept, size - 1)
+
+	def _get_concurrency_settings(self):
+		conf = config.conf["youtubeDownloader"]
+		min_slots = conf["minConcurrent"]
+		return conf["adaptiveConcurrency"], min_slots, max(min_slots, conf["maxConcurrent"])
+
+	def _adjust_concurrency(self):
+		"""Lets the controller close its measurement window and applies the new slot limit (main thread)."""
+		limit = self.concurrency.evaluate(self.scheduler.active_count, self.scheduler.queued_count)
+		if limit != self.scheduler.max_active:
+			# Lowering the limit never stops running jobs, it only holds back new ones
+			self.scheduler.max_active = limit
+			self._process_queue()
+
+	def _on_job_finished(self, *d_ids):
+		"""Frees the slot of a job, or of a worker's items, once its thread is done (main thread)."""
+		for d_id in d_ids:
+			self.scheduler.finish(d_id)
+			# Retried while its stopped thread was still winding down
+			data = self.downloads.get(d_id)
+			if data and jobs.get_state(data) == JobState.QUEUED:
+				self._enqueue(d_id)
+		# Also picks up failures, which produce no progress events
+		self.scheduler.max_active = self.concurrency.evaluate(self.scheduler.active_count, self.scheduler.queued_count)
+		if self.scheduler.active_count == 0:
+			# A staged yt-dlp update goes in between downloads
+			self._apply_update()
+		self._process_queue()
+
+	def _start_actual_download(self, d_id, worker_items=()):
+		"""Spawns the thread for a download, or for a worker that also downloads worker_items after it."""
+		data = self.downloads[d_id]
 		
-		# Set status synchronously to avoid race condition where _process_queue runs again before thread starts
-		self._update_ui_status(d_id, f"{data['title']} - Starting...")
+		# Set state synchronously so the job is visibly running before the thread starts
+		if not self._update_ui_status(d_id, f"{data['title']} - Starting...", state=JobState.STARTING):
+			self.scheduler.finish(d_id)
+			for item_id in worker_items:
+				self._enqueue(item_id)
+			return
+		
+		if not worker_items:
+			thread = threading.Thread(target=self._run_download_thread, args=(d_id,) + self._download_args(data['params']))
+			thread.start()
+			return
 		
-		thread = threading.Thread(
-			target=self._run_download_thread, 
-			args=(d_id, params['url'], params['is_audio'], params['quality_str'], params['start_time'], params['end_time'], params['playlist_mode'], params['playlist_items'], params['playlist_title'], params.get('known_title'), params.get('remove_sponsors', False), params.get('embed_metadata', True), params.get('download_subs', False), params.get('normalize_audio', False), params.get('audio_format', "mp3"))
-		)
+		for item_id in worker_items:
+			self._update_ui_status(item_id, f"{self.downloads[item_id]['title']} - Waiting in batch...", state=JobState.STARTING)
+		thread = threading.Thread(target=self._run_worker_thread, args=([d_id] + list(worker_items),))
 		thread.start()
 
+	def _download_args(self, params):
+		"""_run_download_thread's arguments after d_id, from a job's saved params."""
+		from . import downloader
+		return (params['url'], params['is_audio'], params['quality_str'], params['start_time'], params['end_time'], params['playlist_mode'], params['playlist_items'], params['playlist_title'], params.get('known_title'), params.get('remove_sponsors', False), params.get('embed_metadata', True), params.get('download_subs', False), params.get('normalize_audio', False), params.get('audio_format', "mp3"), params.get('concurrent_fragments', 1), params.get('external_downloader', downloader.EXTERNAL_DOWNLOADER_NONE), params.get('downloader_connections', 1))
+
+	def _run_worker_thread(self, d_ids):
+		"""Downloads a worker's items one after another in one yt-dlp instance, on the first item's slot."""
+		from . import engine
+		from . import pool
+		if engine.resolve_engine(config.conf["youtubeDownloader"]["engine"]) == engine.ENGINE_INPROCESS:
+			worker = pool.InProcessWorker()
+		else:
+			worker = pool.SubprocessWorker([(d_id, self.downloads[d_id]['params']['url']) for d_id in d_ids if d_id in self.downloads])
+		try:
+			for d_id in d_ids:
+				data = self.downloads.get(d_id)
+				if not data or jobs.get_state(data) != JobState.STARTING:
+					# Stopped or removed while waiting for its turn
+					worker.skip(d_id)
+					continue
+				self._run_download_thread(d_id, *self._download_args(data['params']), worker=worker)
+		except Exception as e:
+			logging.error(f"Worker for downloads {d_ids} failed: {e}")
+		finally:
+			worker.close()
+			self.bandwidth.unregister(worker)
+			wx.CallAfter(self._on_job_finished, *d_ids)
+
 	def start_playlist_download(self, url, is_audio, quality_str, playlist_items, playlist_title):
 		"""Legacy helper, now redirects to batch if possible or single."""
 		# If we get here with a string of items "1,2,3", it's the old way.
@@ -516,33 +837,104 @@ class GlobalPlugin(globalPluginHandler.GlobalPlugin):
 		# For now, let's just call start_download which queues it.
 		self.start_download(url, is_audio, quality_str, None, None, playlist_mode=True, playlist_items=playlist_items, playlist_title=playlist_title)
 
-	def _run_download_thread(self, d_id, url, is_audio, quality_str, start_time, end_time, playlist_mode, playlist_items, playlist_title, known_title=None, remove_sponsors=False, embed_metadata=True, download_subs=False, normalize_audio=False, audio_format="mp3"):
+	def update_clipboard_watcher(self):
+		"""Starts or stops the clipboard watcher to match the setting."""
+		if config.conf["youtubeDownloader"]["prefetchClipboard"]:
+			self.clipboard_watcher.start()
+		else:
+			self.clipboard_watcher.stop()
+
+	def _is_prefetched(self, url):
+		parsed = urls.parse(url)
+		if parsed.video_id:
+			return self.metadata_cache.get_path(parsed.video_id, max_age=cache.INFO_JSON_MAX_AGE) is not None
+		return self.metadata_cache.get_path(cache.playlist_key(parsed.playlist_id), max_age=cache.PLAYLIST_MAX_AGE) is not None
+
+	def _prefetch_url(self, url):
+		"""Caches a copied link's info (clipboard watcher thread), so the dialog and the download can skip extraction."""
+		from . import downloader
+		parsed = urls.parse(url)
+		if parsed.video_id:
+			self._extract_video_info(url, parsed.video_id, timeout=clipboard.PREFETCH_TIMEOUT)
+		else:
+			cancel_event = threading.Event()
+			timer = threading.Timer(clipboard.PREFETCH_TIMEOUT, cancel_event.set)
+			timer.start()
+			try:
+				downloader.get_playlist_info(url, self.metadata_cache, cancel_event)
+			finally:
+				timer.cancel()
+
+	def _extract_video_info(self, url, video_id, timeout=None, cancel_event=None):
+		"""Extracts a video's info with the configured engine and caches it. Returns None if cancelled."""
+		from . import downloader
+		from . import engine
+		if engine.resolve_engine(config.conf["youtubeDownloader"]["engine"]) == engine.ENGINE_INPROCESS:
+			# The API call cannot be interrupted, a cancelled result is still worth caching
+			info = engine.extract_info(url, timeout=timeout)
+		else:
+			info = downloader.fetch_video_info(url, timeout=timeout, cancel_event=cancel_event)
+		if info:
+			self.metadata_cache.put(info.get('id') or video_id, info)
+		return info
+
+	def probe_video_info(self, url, cancel_event=None):
+		"""
+		Info with a fresh format list for the dialog's quality choices (dialog probe thread).
+		Only info young enough for --load-info-json is reused, so the job downloads from what was shown.
+		"""
+		video_id = urls.video_id(url)
+		info = self.metadata_cache.get(video_id, max_age=cache.INFO_JSON_MAX_AGE)
+		if info:
+			return info
+		return self._extract_video_info(url, video_id, cancel_event=cancel_event)
+
+	def _get_video_info(self, url, active_engine):
+		"""Returns the info dict for a single video, from the metadata cache if possible."""
+		from . import downloader
+		from . import engine
+		video_id = urls.video_id(url)
+		info = self.metadata_cache.get(video_id)
+		if info:
+			return info
+		try:
+			if active_engine == engine.ENGINE_INPROCESS:
+				info = engine.extract_info(url)
+			else:
+				info = downloader.fetch_video_info(url)
+		except Exception as e:
+			logging.error(f"Failed to fetch title for {url}: {e}")
+			return None
+		self.metadata_cache.put(info.get('id') or video_id, info)
+		return info
+
+	def _run_download_thread(self, d_id, url, is_audio, quality_str, start_time, end_time, playlist_mode, playlist_items, playlist_title, known_title=None, remove_sponsors=False, embed_metadata=True, download_subs=False, normalize_audio=False, audio_format="mp3", concurrent_fragments=1, external_downloader=None, downloader_connections=1, worker=None):
+		"""Downloads one job. With a worker (pool), the job runs on the worker's yt-dlp and the worker frees the slot."""
+		from . import downloader
+		from . import engine
+		from . import postprocess
+		if external_downloader is None:
+			external_downloader = downloader.EXTERNAL_DOWNLOADER_NONE
+		info_json = None
 		try:
 			# 1. Fetch Title
 			title = known_title if known_title else "Unknown Video"
 			
+			# Engine choice is read per job so a settings change applies to the next download
+			active_engine = engine.resolve_engine(config.conf["youtubeDownloader"]["engine"])
+			
 			if not known_title:
 				if playlist_title and not playlist_mode:
 					# It's an item in a playlist, but we don't have the title?
 					# We'll let yt-dlp resolve it.
 					pass
 				elif playlist_mode is not True:
-					yt_dlp_path = downloader.get_yt_dlp_path()
-					try:
-						startupinfo = subprocess.STARTUPINFO()
-						startupinfo.dwFlags |= subprocess.STARTF_USESHOWWINDOW
-						result = subprocess.run(
-							[yt_dlp_path, "--get-title", "--skip-download", "--no-warnings", "--user-agent", "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36", url],
-							capture_output=True, text=True, startupinfo=startupinfo, check=False
-						)
-						if result.returncode == 0:
-							title = result.stdout.strip()
-						else:
-							logging.error(f"Failed to fetch title for {url}. Return code: {result.returncode}. Stderr: {result.stderr}")
-							# Fallback title if individual fetch fails (try to proceed with download anyway using URL as pseudo-title)
-							title = "Video_" + url.split("v=")[-1].split("&")[0]
-					except:
-						pass
+					info = self._get_video_info(url, active_engine)
+					if info and info.get('title'):
+						title = info['title']
+					else:
+						# Fallback title if individual fetch fails (try to proceed with download anyway using URL as pseudo-title)
+						title = "Video_" + (urls.video_id(url) or "Unknown")
 				else:
 					title = playlist_title if playlist_title else "Playlist"
 
@@ -552,7 +944,7 @@ class GlobalPlugin(globalPluginHandler.GlobalPlugin):
 				display_title = display_title[:27] + "..."
 				
 			self.downloads[d_id]['title'] = title 
-			self._update_ui_status(d_id, f"{display_title} - Downloading...")
+			self._update_ui_status(d_id, f"{display_title} - Downloading...", state=JobState.DOWNLOADING)
 
 			# 2. Download
 			download_path = config.conf["youtubeDownloader"]["downloadPath"]
@@ -577,123 +969,357 @@ class GlobalPlugin(globalPluginHandler.GlobalPlugin):
 			def progress_hook(status):
 				self._update_ui_status(d_id, f"{display_title} - {status}")
 
-			process = downloader.download_video_with_process(
-				url, download_path, is_audio, quality_str, start_time, end_time, progress_hook, playlist_mode, playlist_items, playlist_title, remove_sponsors, embed_metadata, download_subs, normalize_audio, audio_format
+			# Audio is fetched as is and converted after the slot is freed (see postprocess)
+			staged = is_audio and playlist_mode is not True and audio_format in postprocess.CODEC_ARGS
+			fetch_path, fetch_playlist_title, fetch_format = download_path, playlist_title, audio_format
+			if staged:
+				fetch_path, fetch_playlist_title, fetch_format = downloader.get_staging_path(), None, downloader.raw_audio(audio_format)
+
+			# Reuse already extracted info (title step, earlier attempt) so yt-dlp skips extraction
+			if playlist_mode is not True:
+				video_id = urls.video_id(url)
+				info_json = self.metadata_cache.get_path(video_id, max_age=cache.INFO_JSON_MAX_AGE)
+
+			extra_args = downloader.transfer_args(concurrent_fragments, external_downloader, downloader_connections)
+			# Partial files left by an interrupted run, {filename: bytes at last progress}
+			partial_files = self.downloads[d_id].setdefault('partial_files', {})
+			resume_files = dict(partial_files)
+			checkpoint_bytes = sum(partial_files.values())
+			checkpoint_time = time.monotonic()
+			if resume_files:
+				# yt-dlp's default, but resuming is the point of this run
+				extra_args.append("--continue")
+			# Completed downloads are archived per format profile (clips are not the full video)
+			profile = None
+			archive_file = None
+			completed_ids = []
+			if not (start_time and end_time):
+				profile = archive.format_profile(is_audio, quality_str, audio_format)
+				if config.conf["youtubeDownloader"]["skipDownloaded"] and not staged:
+					# yt-dlp skips and records entries itself, e.g. inside whole-playlist jobs
+					# (staged jobs are recorded once converted)
+					archive_file = self.archive.path(profile)
+					extra_args.extend(["--download-archive", archive_file])
+			# Share of the global bandwidth budget; a worker's jobs share the worker's
+			budget_id = d_id if worker is None else worker
+			rate_limit = self.bandwidth.register(budget_id)
+			if rate_limit:
+				extra_args.extend(["--limit-rate", str(rate_limit)])
+
+			if worker is not None:
+				start_process = functools.partial(worker.start, d_id)
+			elif active_engine == engine.ENGINE_INPROCESS:
+				start_process = engine.download_video_in_process
+			else:
+				start_process = downloader.download_video_with_process
+			process = start_process(
+				url, fetch_path, is_audio, quality_str, start_time, end_time, progress_hook, playlist_mode, playlist_items, fetch_playlist_title, remove_sponsors, embed_metadata, download_subs, normalize_audio, fetch_format, info_json, extra_args
 			)
 			self.downloads[d_id]['process'] = process
+			if hasattr(process, 'set_rate_limit'):
+				# In-process jobs are re-throttled as other jobs start and finish
+				self.bandwidth.attach(budget_id, process.set_rate_limit)
 			
 			# Read output in real-time
 			last_lines = []
 			current_video_name = ""
 			
 			for line in process.stdout:
-				line = line.strip()
-				if not line: continue
+				event = progress.parse_line(line)
+				if event is None:
+					# Plain output (warnings/errors), kept for the error report
+					line = line.strip()
+					if line:
+						last_lines.append(line)
+						if len(last_lines) > 10:
+							last_lines.pop(0)
+					continue
 				
-				last_lines.append(line)
-				if len(last_lines) > 10:
-					last_lines.pop(0)
-				
-				if "[download]" in line:
-					if "Destination:" in line:
-						parts = line.split("Destination: ")
-						if len(parts) > 1:
-							self.downloads[d_id]['current_filename'] = parts[1].strip()
-							fname = os.path.basename(self.downloads[d_id]['current_filename'])
-							current_video_name = os.path.splitext(fname)[0]
-							if len(current_video_name) > 20:
-								current_video_name = current_video_name[:17] + "..."
+				if event.kind == progress.KIND_DOWNLOAD:
+					if event.filename in resume_files:
+						# yt-dlp's first report for a resumed file starts at the bytes already on disk
+						resumed = event.downloaded_bytes or 0
+						del resume_files[event.filename]
+						if resumed:
+							self.downloads[d_id]['resumed_bytes'] = self.downloads[d_id].get('resumed_bytes', 0) + resumed
+							self.resumed_bytes_total += resumed
+							logging.info(f"Download {d_id} resumed {os.path.basename(event.filename)} at {resumed} bytes")
+					if event.filename:
+						# Byte offset reached so far, saved with the job in case NVDA exits
+						if event.status == "finished":
+							partial_files.pop(event.filename, None)
+						elif event.downloaded_bytes is not None:
+							partial_files[event.filename] = event.downloaded_bytes
+							# Checkpoint now and then, not only when the job changes state
+							saved_bytes = sum(partial_files.values())
+							if saved_bytes - checkpoint_bytes >= store.CHECKPOINT_BYTES or time.monotonic() - checkpoint_time >= store.CHECKPOINT_INTERVAL:
+								checkpoint_bytes = saved_bytes
+								checkpoint_time = time.monotonic()
+								self.save_state(d_id)
+					if event.filename and event.filename != self.downloads[d_id].get('current_filename'):
+						self.downloads[d_id]['current_filename'] = event.filename
+						fname = os.path.basename(event.filename)
+						current_video_name = os.path.splitext(fname)[0]
+						if len(current_video_name) > 20:
+							current_video_name = current_video_name[:17] + "..."
+					if event.status != "downloading":
 						continue
 						
-					percent = None
-					try:
-						parts = line.split()
-						for part in parts:
-							if "%" in part:
-								percent = float(part.replace("%", ""))
-								break
-					except:
-						pass
-					
-					if "Downloading video" in line:
-						try:
-							progress_part = line.split("Downloading video ")[1].strip()
-							self._update_ui_status(d_id, f"{display_title} - Video {progress_part}")
-						except:
-							self._update_ui_status(d_id, f"{display_title} - {line}")
-					elif percent is not None:
-						status_msg = f"{display_title} - "
-						if current_video_name:
-							status_msg += f"{current_video_name} "
-						status_msg += f"{percent}%"
-						self._update_ui_status(d_id, status_msg, percent)
+					status_msg = f"{display_title} - "
+					if playlist_mode is True and event.playlist_index and event.playlist_count:
+						status_msg += f"Video {event.playlist_index} of {event.playlist_count}, "
+					if current_video_name:
+						status_msg += f"{current_video_name} "
+					status_msg += progress.describe(event)
+					if self.concurrency.record_progress(d_id, event):
+						wx.CallAfter(self._adjust_concurrency)
+					self.bandwidth.refresh()
+					self._update_ui_status(d_id, status_msg, event.percent, state=JobState.DOWNLOADING)
+						
+				elif event.kind == progress.KIND_POSTPROCESS:
+					if event.status != "started":
+						continue
+					if event.postprocessor == "ExtractAudio":
+						self._update_ui_status(d_id, f"Converting to {audio_format.upper()}...", None, state=JobState.PROCESSING)
+					elif event.postprocessor == "Merger":
+						self._update_ui_status(d_id, "Merging video/audio...", None, state=JobState.PROCESSING)
 						
-				elif "[ExtractAudio]" in line:
-					self._update_ui_status(d_id, f"Converting to {audio_format.upper()}...", None)
-				elif "[Merger]" in line:
-					self._update_ui_status(d_id, "Merging video/audio...", None)
-				elif "Merging formats into" in line:
-					parts = line.split('Merging formats into "')
-					if len(parts) > 1:
-						fname = parts[1].strip()
-						if fname.endswith('"'): fname = fname[:-1]
-						self.downloads[d_id]['current_filename'] = fname
+				elif event.kind == progress.KIND_FILE and event.filename:
+					self.downloads[d_id]['current_filename'] = event.filename
+					if event.video_id:
+						completed_ids.append(event.video_id)
 
 			process.wait()
 			
 			if process.returncode == 0:
-				self.downloads[d_id]['status'] = "Completed"
-				self._update_ui_status(d_id, f"{title} - Completed", 100)
-				import ui
-				ui.message(f"Download complete: {title}")
-				self.save_state()
+				self.concurrency.record_result(d_id, True)
+				partial_files.clear()
+				if profile and not completed_ids and playlist_mode is not True:
+					completed_ids.append(urls.video_id(url))
+				if staged:
+					source = self.downloads[d_id].get('current_filename')
+					if not source or not os.path.exists(source):
+						raise Exception("Downloaded audio file not found")
+					video_id = urls.video_id(url)
+					self._queue_conversion(d_id, {
+						'title': title,
+						'source': source,
+						'target': postprocess.target_path(source, downloader.output_dir(download_path, playlist_title), audio_format, video_id),
+						'audio_format': audio_format,
+						'bitrate': quality_str.split(" ")[0] if quality_str and "kbps" in quality_str else None,
+						'normalize_mode': config.conf["youtubeDownloader"]["normalizeMode"] if normalize_audio else None,
+						'video_id': video_id,
+						'clip': bool(start_time and end_time),
+						'profile': profile,
+						'completed_ids': completed_ids,
+					})
+				else:
+					self._complete_download(d_id, title, profile, completed_ids, persist=archive_file is None)
 			else:
+				if info_json:
+					# Stream URLs in the cached info may have expired, re-extract on retry
+					self.metadata_cache.invalidate(video_id)
 				error_details = "\n".join(last_lines)
 				raise Exception(f"Process returned non-zero exit code.\nLast output:\n{error_details}")
 
 		except Exception as e:
 			# Check if manually stopped to avoid overwriting "Stopped" status with "Error"
 			if not self.downloads[d_id].get('manual_stop', False):
-				self.downloads[d_id]['status'] = "Error"
-				self._update_ui_status(d_id, f"Error: {title}")
+				self.concurrency.record_result(d_id, False)
+				self._update_ui_status(d_id, f"Error: {title}", state=JobState.ERROR)
 				logging.error(f"Download error {d_id}: {e}")
 			else:
 				logging.info(f"Download {d_id} stopped manually.")
-				
-			self.save_state()
 		
 		finally:
-			# Trigger queue processing
-			wx.CallAfter(self._process_queue)
+			if worker is None:
+				self.bandwidth.unregister(d_id)
+				# Free the slot and trigger queue processing
+				wx.CallAfter(self._on_job_finished, d_id)
+
+	def _complete_download(self, d_id, title, profile, completed_ids, persist=True, note=None):
+		"""Archives a finished job's videos and marks it completed (any thread)."""
+		if profile:
+			for completed_id in completed_ids:
+				self.archive.record(completed_id, profile, persist=persist)
+		status_text = f"{title} - Completed ({note})" if note else f"{title} - Completed"
+		if self._update_ui_status(d_id, status_text, 100, state=JobState.COMPLETED):
+			import ui
+			ui.message(f"Download complete: {title}")
 
-	def _update_ui_status(self, d_id, status_text, percent=None):
-		self.downloads[d_id]['status'] = status_text
+	def _queue_conversion(self, d_id, task):
+		"""Hands a job's staged audio to the conversion pool (download thread). The slot is freed meanwhile."""
+		if not self._update_ui_status(d_id, f"{task['title']} - Waiting to convert...", state=JobState.PROCESSING):
+			return
+		self.downloads[d_id]['process'] = None
+		self.converter.submit(functools.partial(self._run_conversion, d_id, task))
+
+	def _run_conversion(self, d_id, task):
+		"""Converts a staged file to the job's format with ffmpeg (conversion pool thread)."""
+		from . import downloader
+		from . import postprocess
+		from . import loudness
+		data = self.downloads.get(d_id)
+		if data is None:
+			# Removed while waiting, nothing will resume from the staged file
+			self._remove_file(task['source'])
+			return
+		if jobs.get_state(data) != JobState.PROCESSING:
+			# Stopped or interrupted while waiting
+			return
+		display_title = task['title'] if len(task['title']) <= 30 else task['title'][:27] + "..."
+		label = f"{display_title} - Converting to {task['audio_format'].upper()}"
+		self._update_ui_status(d_id, f"{label}...", 0)
+		duration = None
+		if not task['clip'] and task['video_id']:
+			info = self.metadata_cache.get(task['video_id'])
+			duration = info.get('duration') if info else None
+		try:
+			source_info = postprocess.probe(downloader.get_ffprobe_path(), task['source'])
+			if source_info and source_info['duration']:
+				# Exact for clips and sections removed by SponsorBlock as well
+				duration = source_info['duration']
+			# Copy the stream into the new container if it fits (see postprocess)
+			copy = postprocess.can_copy(source_info, task['audio_format'], task['bitrate'])
+			audio_filter, extra_args = None, None
+			if task['normalize_mode']:
+				measurement = self._measure_loudness(d_id, data, task, display_title)
+				if measurement:
+					opus = copy and source_info['codec'] == "opus"
+					audio_filter, extra_args = loudness.ffmpeg_args(measurement, task['normalize_mode'], task['audio_format'], opus)
+				if jobs.get_state(data) != JobState.PROCESSING:
+					# Stopped while measuring
+					return
+				self._update_ui_status(d_id, f"{label}...", 0)
+			if audio_filter:
+				# Changing the samples means encoding them
+				copy = False
+			cmd = postprocess.transcode_args(downloader.get_ffmpeg_path(), task['source'], task['audio_format'], task['bitrate'], audio_filter, extra_args, copy)
+			returncode, error, cpu_seconds = postprocess.transcode(
+				cmd, task['target'],
+				on_start=lambda process: data.__setitem__('process', process),
+				on_progress=lambda percent: self._update_ui_status(d_id, f"{label} {percent:.0f}%", percent),
+				duration=duration
+			)
+		except Exception as e:
+			returncode, error, cpu_seconds = -1, str(e), None
+		data['process'] = None
+		if returncode != 0:
+			if not data.get('manual_stop', False) and jobs.get_state(data) == JobState.PROCESSING:
+				# The staged file is kept, a retry converts it without downloading again
+				self._update_ui_status(d_id, f"Error: {task['title']}", state=JobState.ERROR)
+				logging.error(f"Conversion error {d_id}: {error}")
+			return
+		self._remove_file(task['source'])
+		note = None
+		if copy:
+			saved = self.cpu_meter.saved(task['audio_format'], duration, cpu_seconds)
+			note = "no re-encoding"
+			if saved is not None:
+				data['cpu_seconds_saved'] = saved
+				logging.info(f"Download {d_id}: {source_info['codec']} copied into {task['audio_format']}, about {saved:.1f} CPU seconds saved")
+		elif audio_filter is None:
+			# Plain conversions teach the meter what a copy saves (filters add their own cost)
+			self.cpu_meter.record(task['audio_format'], cpu_seconds, duration)
+		self._complete_download(d_id, task['title'], task['profile'], task['completed_ids'], note=note)
+
+	def _measure_loudness(self, d_id, data, task, display_title):
+		"""A staged file's loudness, cached per video (clips are measured every time). None for silence."""
+		from . import downloader
+		from . import loudness
+		key = None if task['clip'] else task['video_id']
+		measurement = self.loudness_cache.get(key) if key else None
+		if measurement:
+			return measurement
+		self._update_ui_status(d_id, f"{display_title} - Measuring loudness...")
+		measurement = loudness.measure(downloader.get_ffmpeg_path(), task['source'], on_start=lambda process: data.__setitem__('process', process))
+		if measurement and key:
+			self.loudness_cache.put(key, measurement)
+		return measurement
+
+	def _remove_file(self, path):
+		try:
+			os.remove(path)
+		except OSError:
+			pass
+
+	def _update_ui_status(self, d_id, status_text, percent=None, state=None):
+		"""
+		Sets a job's status text and, if given, moves it to `state` first.
+		Returns False (and changes nothing) if the state transition is not allowed,
+		e.g. a late progress update for a job that was already stopped.
+		"""
+		data = self.downloads.get(d_id)
+		if data is None:
+			return False
+		changed = False
+		if state is not None:
+			try:
+				changed = jobs.transition(data, state)
+			except jobs.InvalidTransition as e:
+				logging.warning(f"Ignoring status update for download {d_id}: {e}")
+				return False
+		elif jobs.get_state(data) in jobs.TERMINAL_STATES:
+			# Text-only update from a thread that has not noticed it was stopped yet
+			return False
+		data['status'] = status_text
+		if changed:
+			# Only queued and running jobs count as duplicates
+			if jobs.get_state(data) in jobs.TERMINAL_STATES:
+				self._unindex_job(d_id)
+			elif 'dedup_key' in data:
+				self._index_job(d_id)
+			# Journaled and batched, so every state change can be persisted
+			self.save_state(d_id)
+		if self.dlg:
+			# Coalesced: only the latest status per download reaches the dialog, a few times a second
+			self.status_aggregator.push(d_id, status_text, percent, terminal=jobs.get_state(data) in jobs.TERMINAL_STATES)
+		return True
+
+	def _deliver_statuses(self, updates):
+		"""Applies a batch of coalesced status updates (main thread)."""
 		if self.dlg:
-			wx.CallAfter(self.dlg.update_status, d_id, status_text, percent)
+			self.dlg.update_statuses(updates)
 
 	def retry_download(self, d_id):
 		if d_id in self.downloads:
 			data = self.downloads[d_id]
+			if jobs.get_state(data) not in jobs.RETRYABLE_STATES:
+				return
+			
+			# The same video may have been added again meanwhile
+			key = tuple(data.get('dedup_key') or ())
+			if self.in_flight.get(key, d_id) != d_id:
+				import ui
+				ui.message("This video is already in the download list.")
+				return
 			
 			# Reset status
-			data['status'] = "Queued"
-			self._update_ui_status(d_id, f"{data['title']} - Queued")
+			data['manual_stop'] = False
+			data.pop('resolving', None)
+			self._update_ui_status(d_id, f"{data['title']} - Queued", state=JobState.QUEUED)
 			
 			# Re-add to queue
-			if d_id not in self.download_queue:
-				self.download_queue.append(d_id)
-			
+			self._enqueue(d_id)
 			self._process_queue()
 
+	def _resume_interrupted(self):
+		"""Re-queues jobs interrupted by the last NVDA exit; yt-dlp continues their .part files."""
+		for d_id, data in list(self.downloads.items()):
+			if jobs.get_state(data) == JobState.INTERRUPTED:
+				self.retry_download(d_id)
+
 	def stop_download(self, d_id):
+		from . import downloader
 		if d_id in self.downloads:
 			data = self.downloads[d_id]
 			
-			if d_id in self.download_queue:
-				self.download_queue.remove(d_id)
+			self.scheduler.remove(d_id)
 			
 			# Flag as manual stop to prevent "Error" status race condition in thread
 			data['manual_stop'] = True
+			# A pending batch resolution result is discarded
+			data.pop('resolving', None)
 			
 			proc = data.get('process')
 			if proc and proc.poll() is None:
@@ -718,13 +1344,13 @@ class GlobalPlugin(globalPluginHandler.GlobalPlugin):
 			filename = data.get('current_filename')
 			downloader.cleanup_partial_files(download_path, data['title'], filename)
 			downloader.cleanup_partial_files(temp_path, data['title'], filename)
+			# Nothing left to resume from
+			data.pop('partial_files', None)
 			
 			# Mark as Stopped (Keep in list so user can Retry or Remove)
-			self.downloads[d_id]['status'] = "Stopped"
-			self._update_ui_status(d_id, f"{data['title']} - Stopped")
-			self.save_state()
+			self._update_ui_status(d_id, f"{data['title']} - Stopped", state=JobState.STOPPED)
 			
-			# Free up slot
+			# The slot is freed when the download thread exits
 			wx.CallAfter(self._process_queue)
 
 	def remove_download(self, d_id):
@@ -734,9 +1360,12 @@ class GlobalPlugin(globalPluginHandler.GlobalPlugin):
 			proc = self.downloads[d_id].get('process')
 			if proc and proc.poll() is None:
 				self.stop_download(d_id)
+			self.scheduler.remove(d_id)
 				
+			self._unindex_job(d_id)
 			del self.downloads[d_id]
-			self.save_state()
+			self.status_aggregator.discard(d_id)
+			self.save_state(d_id)
 			
 			# Update UI
 			if self.dlg:
@@ -0,0 +1,92 @@
+"""
+Download archive.
+
+Remembers which videos were already downloaded, per format profile (MP3 at
+best quality and MP4 at 1080p are different downloads of the same video). Each
+profile is a plain yt-dlp --download-archive file ("youtube <id>" per line), so
+yt-dlp reads and extends the same files, and the plugin checks them through an
+in-memory set before doing any network work.
+"""
+import os
+import re
+import threading
+import logging
+
+ARCHIVE_DIR = os.path.join(os.path.expanduser("~"), "nvda_yt_downloader_archive")
+EXTRACTOR = "youtube"
+
+def format_profile(is_audio, quality_str, audio_format="mp3"):
+	"""Returns a short, file-name safe profile name, e.g. 'audio-mp3-192k' or 'video-1080p'."""
+	if is_audio:
+		if quality_str and "kbps" in quality_str:
+			quality = quality_str.split(" ")[0] + "k"
+		else:
+			quality = "best"
+		profile = f"audio-{audio_format}-{quality}"
+	else:
+		if quality_str and "p" in quality_str and quality_str[0].isdigit():
+			quality = quality_str.split(" ")[0]
+		else:
+			quality = "best"
+		profile = f"video-{quality}"
+	return re.sub(r"[^a-z0-9-]", "", profile.lower())
+
+class DownloadArchive:
+	def __init__(self, archive_dir=ARCHIVE_DIR):
+		self.archive_dir = archive_dir
+		self.lock = threading.Lock()
+		self.profiles = {} # profile -> set of "youtube <id>", loaded on first use
+
+	def path(self, profile):
+		"""Archive file for a profile (for --download-archive)."""
+		if not os.path.exists(self.archive_dir):
+			try:
+				os.makedirs(self.archive_dir)
+			except OSError:
+				pass
+		return os.path.join(self.archive_dir, profile + ".txt")
+
+	def _entries(self, profile):
+		"""Returns the profile's set, reading its file once. Caller holds the lock."""
+		entries = self.profiles.get(profile)
+		if entries is None:
+			entries = set()
+			try:
+				with open(os.path.join(self.archive_dir, profile + ".txt"), 'r', encoding='utf-8') as f:
+					for line in f:
+						line = line.strip()
+						if line:
+							entries.add(line)
+			except FileNotFoundError:
+				pass
+			except Exception as e:
+				logging.error(f"Failed to read download archive {profile}: {e}")
+			self.profiles[profile] = entries
+		return entries
+
+	def contains(self, video_id, profile):
+		if not video_id:
+			return False
+		with self.lock:
+			return f"{EXTRACTOR} {video_id}" in self._entries(profile)
+
+	def record(self, video_id, profile, persist=True):
+		"""
+		Marks a video as downloaded. persist=False only updates the in-memory set,
+		for downloads where yt-dlp already wrote the line through --download-archive.
+		"""
+		if not video_id:
+			return
+		entry = f"{EXTRACTOR} {video_id}"
+		with self.lock:
+			entries = self._entries(profile)
+			if entry in entries:
+				return
+			entries.add(entry)
+			if not persist:
+				return
+			try:
+				with open(self.path(profile), 'a', encoding='utf-8') as f:
+					f.write(entry + "\n")
+			except Exception as e:
+				logging.error(f"Failed to write download archive {profile}: {e}")
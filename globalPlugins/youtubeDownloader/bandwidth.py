@@ -0,0 +1,160 @@
+"""
+Global bandwidth budget.
+
+A single download limit (optionally varying by time of day) is split across the
+running jobs. Every job starts with its share passed as --limit-rate. Jobs that
+can be throttled while running (the in-process engine) are rebalanced whenever
+a job starts or finishes or the schedule changes, so the total stays under the
+budget and the share of finished jobs goes back to the ones still running.
+
+yt-dlp.exe jobs keep the rate they were started with, so a job starts with
+the budget divided by the most jobs that can ever run at once (the highest slot
+limit): handing out what the earlier fixed-rate jobs left over would leave the
+first job most of the budget and every later one crawling at MIN_SHARE, and a
+share based on the jobs running now overshoots the budget once more start.
+Adjustable jobs then take whatever the fixed-rate jobs leave over.
+
+A worker (pool) runs several jobs one after another on one yt-dlp, so it holds
+one share for all of them, registered under the worker instead of a job.
+"""
+import time
+import threading
+import logging
+
+# No job is throttled below this, even if the budget is already handed out
+MIN_SHARE = 16 * 1024
+# How often running jobs check whether the schedule moved to another limit
+REFRESH_INTERVAL = 30.0
+
+def parse_schedule(text):
+	"""
+	Parses a schedule like "09:00-17:00=256, 22:00-06:00=0" into
+	[(start_minute, end_minute, KiB/s)]. 0 means unlimited during that period.
+	Ranges may wrap around midnight. Invalid entries are logged and skipped.
+	"""
+	periods = []
+	for entry in (text or "").replace(";", ",").split(","):
+		entry = entry.strip()
+		if not entry:
+			continue
+		try:
+			span, rate = entry.split("=")
+			start, end = span.split("-")
+			periods.append((_minutes(start), _minutes(end), int(rate)))
+		except ValueError:
+			logging.warning(f"Ignoring invalid bandwidth schedule entry: {entry}")
+	return periods
+
+def _minutes(hhmm):
+	hours, minutes = hhmm.strip().split(":")
+	hours, minutes = int(hours), int(minutes)
+	if not (0 <= hours <= 24 and 0 <= minutes < 60):
+		raise ValueError(hhmm)
+	return hours * 60 + minutes
+
+def scheduled_limit(periods, default_kib, now=None):
+	"""Returns the limit in KiB/s for the given local time (the first matching period wins)."""
+	local = time.localtime(now)
+	minute = local.tm_hour * 60 + local.tm_min
+	for start, end, rate in periods:
+		if start <= end:
+			if start <= minute < end:
+				return rate
+		elif minute >= start or minute < end:
+			return rate
+	return default_kib
+
+class BandwidthBudget:
+	def __init__(self, get_settings, get_max_jobs):
+		"""
+		get_settings() returns (limit in KiB/s, schedule text); a limit of 0 means unlimited.
+		get_max_jobs() returns the most jobs that may run at once.
+		Thread-safe: jobs register and unregister from their download threads.
+		"""
+		self.get_settings = get_settings
+		self.get_max_jobs = get_max_jobs
+		self.lock = threading.Lock()
+		self.jobs = {} # d_id -> {'share': bytes/s or None, 'setter': callable or None}
+		self.budget = None
+		self.last_refresh = 0.0
+		self._schedule_text = None
+		self._periods = []
+
+	def _current_budget(self):
+		"""Returns the budget in bytes/s now, or None when unlimited. Caller holds the lock."""
+		limit_kib, schedule = self.get_settings()
+		if schedule != self._schedule_text:
+			self._schedule_text = schedule
+			self._periods = parse_schedule(schedule)
+		kib = scheduled_limit(self._periods, limit_kib)
+		return kib * 1024 if kib > 0 else None
+
+	def register(self, d_id):
+		"""
+		Reserves a share for a starting job and returns it in bytes/s (None if unlimited).
+		Registering again (the next job of a worker) returns the share already held.
+		"""
+		with self.lock:
+			job = self.jobs.get(d_id)
+			if job:
+				return job['share']
+			self.budget = self._current_budget()
+			self.last_refresh = time.monotonic()
+			if self.budget is None:
+				share = None
+			else:
+				# A slot's part of the budget (see the module docstring), more jobs only if the
+				# slot limit was lowered under running ones. Jobs that can be re-throttled are
+				# rebalanced once they attach.
+				share = max(MIN_SHARE, self.budget // max(1, self.get_max_jobs(), len(self.jobs) + 1))
+			self.jobs[d_id] = {'share': share, 'setter': None}
+			self._rebalance()
+			return share
+
+	def attach(self, d_id, setter):
+		"""Lets a running job be re-throttled: setter(bytes_per_second or None)."""
+		with self.lock:
+			job = self.jobs.get(d_id)
+			if job:
+				job['setter'] = setter
+				self._rebalance()
+
+	def unregister(self, d_id):
+		with self.lock:
+			if self.jobs.pop(d_id, None) is not None:
+				self._rebalance()
+
+	def refresh(self):
+		"""Re-applies the budget if the schedule moved to another limit. Cheap to call often."""
+		now = time.monotonic()
+		if now - self.last_refresh < REFRESH_INTERVAL:
+			return
+		with self.lock:
+			self.last_refresh = now
+			budget = self._current_budget()
+			if budget != self.budget:
+				logging.info(f"Bandwidth budget changed to {budget // 1024 if budget else 'unlimited'} KiB/s")
+				self.budget = budget
+				self._rebalance()
+
+	def _rebalance(self):
+		"""Splits what fixed-rate jobs leave over across adjustable jobs. Caller holds the lock."""
+		adjustable = [job for job in self.jobs.values() if job['setter']]
+		if not adjustable:
+			return
+		if self.budget is None:
+			share = None
+		else:
+			fixed = sum(job['share'] or 0 for job in self.jobs.values() if not job['setter'])
+			share = max(MIN_SHARE, (self.budget - fixed) // len(adjustable))
+		for job in adjustable:
+			if job['share'] != share:
+				job['share'] = share
+				try:
+					job['setter'](share)
+				except Exception as e:
+					logging.error(f"Failed to apply download rate limit: {e}")
+
+	def total_share(self):
+		with self.lock:
+			return sum(job['share'] or 0 for job in self.jobs.values())
@@ -0,0 +1,184 @@
+"""
+Browser address bar lookup.
+
+Finding the URL of the focused browser tab means walking the browser window's
+accessibility tree, and every object touched is a cross-process call into the
+browser. The walk is breadth-first over a deque with a time budget, and the
+address bar it finds is remembered per window handle and app, so pressing the
+gesture again in the same window costs one call (reading its value).
+
+NVDA objects wrap COM objects that belong to NVDA's main thread; touching them
+from another thread fails (CO_E_NOTINITIALIZED, RPC_E_WRONG_THREAD). The walk
+therefore stays on the main thread, split into short slices (lookup) with the
+next slice scheduled after NVDA has handled pending events, so a slow browser
+cannot freeze speech for the whole budget.
+
+NVDA specifics (roles, the focus object) are passed in, so the module can be
+exercised with plain Python objects.
+"""
+import time
+import threading
+import logging
+from collections import OrderedDict, deque
+
+BROWSER_APPS = frozenset(["chrome", "msedge", "firefox", "brave"])
+# Seconds a lookup may spend walking the tree
+TIME_BUDGET = 0.5
+# Seconds one slice of a main-thread lookup may take before NVDA gets control back
+SLICE_BUDGET = 0.05
+MAX_NODES = 500
+# Browser windows remembered
+MAX_WINDOWS = 32
+ADDRESS_BAR_NAMES = ("address", "search", "location")
+
+class TreeSearch:
+	def __init__(self, root, is_match, budget=TIME_BUDGET, max_nodes=MAX_NODES):
+		"""
+		Breadth-first search from root that can run in slices (see step).
+		It gives up after max_nodes objects or when budget seconds of walking are spent.
+		"""
+		self.pending = deque([root])
+		self.is_match = is_match
+		self.budget_left = budget
+		self.max_nodes = max_nodes
+		self.visited = 0
+		self.result = None
+		self.done = False
+
+	def step(self, slice_budget):
+		"""Walks for up to slice_budget seconds. Returns True once the search is over."""
+		start = time.monotonic()
+		deadline = start + min(slice_budget, self.budget_left)
+		while self.pending and self.visited < self.max_nodes and time.monotonic() < deadline:
+			node = self.pending.popleft()
+			self.visited += 1
+			if self.is_match(node):
+				self.result = node
+				self.done = True
+				return True
+			child = node.firstChild
+			while child:
+				self.pending.append(child)
+				child = child.next
+		self.budget_left -= time.monotonic() - start
+		self.done = not self.pending or self.visited >= self.max_nodes or self.budget_left <= 0
+		return self.done
+
+def find_in_tree(root, is_match, budget=TIME_BUDGET, max_nodes=MAX_NODES):
+	"""
+	Breadth-first search from root in one go. Returns (matching object or None, objects visited).
+	"""
+	search = TreeSearch(root, is_match, budget, max_nodes)
+	search.step(budget)
+	return search.result, search.visited
+
+def _looks_like_url(text):
+	# Address bars show the page address, unlike search boxes inside the page
+	return bool(text) and " " not in text and "." in text
+
+class AddressBarFinder:
+	def __init__(self, edit_role, window_role, budget=TIME_BUDGET, max_nodes=MAX_NODES):
+		self.edit_role = edit_role
+		self.window_role = window_role
+		self.budget = budget
+		self.max_nodes = max_nodes
+		self.lock = threading.Lock()
+		self.bars = OrderedDict() # (window handle, app name) -> address bar object, least recently used first
+		# Counters for tuning
+		self.hits = 0
+		self.misses = 0
+
+	def _is_address_bar(self, obj):
+		if obj.role != self.edit_role:
+			return False
+		name = (obj.name or "").lower()
+		return any(word in name for word in ADDRESS_BAR_NAMES) and _looks_like_url(obj.value or "")
+
+	def _window_of(self, obj):
+		while obj and obj.role != self.window_role:
+			obj = obj.parent
+		return obj
+
+	def _cached_value(self, key):
+		"""Value of the remembered address bar, or None if there is none or it went away."""
+		with self.lock:
+			bar = self.bars.get(key)
+			if bar is None:
+				return None
+			self.bars.move_to_end(key)
+		try:
+			if bar.role == self.edit_role:
+				return bar.value or ""
+		except Exception:
+			# The window was closed or rebuilt
+			pass
+		with self.lock:
+			self.bars.pop(key, None)
+		return None
+
+	def _begin(self, focus, app_name):
+		"""
+		Returns (address, None, key) if no walk is needed (a remembered bar or not a browser),
+		else (None, TreeSearch over the window, key).
+		"""
+		if app_name not in BROWSER_APPS:
+			return "", None, None
+		window = self._window_of(focus)
+		if not window:
+			return "", None, None
+		key = (window.windowHandle, app_name)
+		value = self._cached_value(key)
+		if value is not None:
+			self.hits += 1
+			return value, None, key
+		self.misses += 1
+		return None, TreeSearch(window, self._is_address_bar, self.budget, self.max_nodes), key
+
+	def _finish(self, search, key, app_name):
+		"""Remembers the bar a finished search found and returns its address, or ''."""
+		bar = search.result
+		if bar is None:
+			logging.info(f"No address bar found in {app_name} after {search.visited} objects")
+			return ""
+		with self.lock:
+			self.bars[key] = bar
+			while len(self.bars) > MAX_WINDOWS:
+				self.bars.popitem(last=False)
+		return bar.value or ""
+
+	def find_url(self, focus, app_name):
+		"""Returns the address shown in the browser window that contains focus, or '' (walks in one go)."""
+		value, search, key = self._begin(focus, app_name)
+		if search is None:
+			return value
+		search.step(self.budget)
+		return self._finish(search, key, app_name)
+
+	def lookup(self, focus, app_name, on_done, schedule, slice_budget=SLICE_BUDGET):
+		"""
+		find_url for the thread that owns the objects (NVDA's main thread): the walk runs in
+		slices of slice_budget seconds, schedule(func) must call func once pending events are handled.
+		on_done(address or '') is called on that thread when the lookup is over.
+		"""
+		def run(search, key):
+			try:
+				if not search.step(slice_budget):
+					schedule(lambda: run(search, key))
+					return
+				value = self._finish(search, key, app_name)
+			except Exception as e:
+				logging.error(f"Address bar lookup failed: {type(e).__name__}: {e}", exc_info=True)
+				value = ""
+			on_done(value)
+		try:
+			value, search, key = self._begin(focus, app_name)
+		except Exception as e:
+			logging.error(f"Address bar lookup failed: {type(e).__name__}: {e}", exc_info=True)
+			value, search = "", None
+		if search is None:
+			on_done(value)
+			return
+		run(search, key)
+
+	def stats(self):
+		return {'hits': self.hits, 'misses': self.misses, 'windows': len(self.bars)}
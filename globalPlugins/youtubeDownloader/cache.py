@@ -0,0 +1,228 @@
+"""
+Persistent metadata cache.
+
+Stores the info JSON yt-dlp extracts for a video (or a flattened playlist) on
+disk, keyed by its canonical ID, so titles, retries and the playlist dialog can
+skip extraction. Entries expire after a TTL and the cache is kept under an entry
+and byte budget by evicting the least recently used entries first.
+
+Every entry is its own file; the index (stored time, size and LRU order of all
+entries) is one JSON file. Rewriting it on every put made resolving a playlist
+quadratic in the cache size, so changes are collected for a short moment and
+the index is written once for the whole burst, as the job store does. After a
+crash the index may miss the last few entries: their files are then simply not
+used.
+"""
+import os
+import json
+import time
+import threading
+import logging
+from collections import OrderedDict
+
+CACHE_DIR = os.path.join(os.path.expanduser("~"), "nvda_yt_downloader_cache")
+INDEX_FILE = "index.json"
+
+DEFAULT_TTL = 24 * 3600 # Titles and format lists rarely change within a day
+DEFAULT_MAX_ENTRIES = 2000
+DEFAULT_MAX_BYTES = 100 * 1024 * 1024
+
+# Stream URLs inside an info JSON expire after roughly 6 hours, so only reuse
+# it for --load-info-json while it is comfortably fresh
+INFO_JSON_MAX_AGE = 3 * 3600
+PLAYLIST_MAX_AGE = 3600
+# Seconds to collect changes before the index is written
+DEBOUNCE = 1.0
+
+def playlist_key(playlist_id):
+	return f"playlist_{playlist_id}"
+
+class MetadataCache:
+	def __init__(self, cache_dir=CACHE_DIR, ttl=DEFAULT_TTL, max_entries=DEFAULT_MAX_ENTRIES, max_bytes=DEFAULT_MAX_BYTES):
+		self.cache_dir = cache_dir
+		self.ttl = ttl
+		self.max_entries = max_entries
+		self.max_bytes = max_bytes
+		self.lock = threading.Lock()
+		self.index_changed = threading.Condition(self.lock)
+		self.dirty = False # Index changed since it was last written
+		self.writer = None
+		# key -> {'stored': timestamp, 'size': bytes}, least recently used first
+		self.index = OrderedDict()
+		self.total_bytes = 0
+		# Counters for tuning
+		self.hits = 0
+		self.misses = 0
+		self.expired = 0
+		self.evictions = 0
+		# The index is read on first use, not while NVDA starts
+		self.loaded = False
+
+	def _path(self, key):
+		# IDs are [A-Za-z0-9_-], but never let a key escape the cache folder
+		safe_key = "".join(c for c in key if c.isalnum() or c in "_-")
+		return os.path.join(self.cache_dir, safe_key + ".info.json")
+
+	def _load_index(self):
+		"""Reads the index once. Caller holds the lock."""
+		if self.loaded:
+			return
+		self.loaded = True
+		try:
+			with open(os.path.join(self.cache_dir, INDEX_FILE), 'r', encoding='utf-8') as f:
+				entries = json.load(f)
+		except Exception:
+			return
+		for key, meta in entries:
+			if os.path.exists(self._path(key)):
+				self.index[key] = meta
+				self.total_bytes += meta.get('size', 0)
+
+	def _save_index(self):
+		"""Writes the index atomically (temp file + rename). Caller holds the lock."""
+		try:
+			if not os.path.exists(self.cache_dir):
+				os.makedirs(self.cache_dir)
+			path = os.path.join(self.cache_dir, INDEX_FILE)
+			tmp_path = path + ".tmp"
+			with open(tmp_path, 'w', encoding='utf-8') as f:
+				json.dump(list(self.index.items()), f)
+			os.replace(tmp_path, path)
+			self.dirty = False
+		except Exception as e:
+			# Still dirty, the next write retries
+			logging.error(f"Failed to save metadata cache index: {e}")
+
+	def _schedule_save(self):
+		"""Has the writer thread save the index once the current burst of changes settles. Caller holds the lock."""
+		self.dirty = True
+		if self.writer is None:
+			self.writer = threading.Thread(target=self._run_writer, daemon=True)
+			self.writer.start()
+		self.index_changed.notify()
+
+	def _run_writer(self):
+		with self.lock:
+			while True:
+				while not self.dirty:
+					self.index_changed.wait()
+				# Let a burst of puts (e.g. a whole playlist resolved) settle into one write
+				deadline = time.monotonic() + DEBOUNCE
+				remaining = DEBOUNCE
+				while remaining > 0:
+					self.index_changed.wait(remaining)
+					remaining = deadline - time.monotonic()
+				if self.dirty:
+					self._save_index()
+
+	def _drop(self, key):
+		"""Removes an entry and its file. Caller holds the lock."""
+		meta = self.index.pop(key, None)
+		if meta:
+			self.total_bytes -= meta.get('size', 0)
+		try:
+			os.remove(self._path(key))
+		except OSError:
+			pass
+
+	def _lookup(self, key, max_age):
+		"""Returns the entry's path if present and fresh. Caller holds the lock."""
+		self._load_index()
+		meta = self.index.get(key)
+		if not meta:
+			self.misses += 1
+			return None
+		age = time.time() - meta['stored']
+		if age > self.ttl:
+			self._drop(key)
+			self.expired += 1
+			self.misses += 1
+			return None
+		if max_age is not None and age > max_age:
+			# Still valid for other uses, just too old for this caller
+			self.misses += 1
+			return None
+		self.index.move_to_end(key)
+		self.hits += 1
+		return self._path(key)
+
+	def get(self, key, max_age=None):
+		"""Returns the cached info dict for key, or None."""
+		if not key: return None
+		with self.lock:
+			path = self._lookup(key, max_age)
+			if not path: return None
+			try:
+				with open(path, 'r', encoding='utf-8') as f:
+					return json.load(f)
+			except Exception:
+				# Corrupt or deleted behind our back, count it as a miss
+				self._drop(key)
+				self.hits -= 1
+				self.misses += 1
+				return None
+
+	def get_path(self, key, max_age=None):
+		"""Returns the path of the cached info JSON (for --load-info-json), or None."""
+		if not key: return None
+		with self.lock:
+			return self._lookup(key, max_age)
+
+	def put(self, key, info):
+		"""Stores an info dict under key and evicts old entries if over budget."""
+		if not key or not info: return
+		with self.lock:
+			try:
+				if not os.path.exists(self.cache_dir):
+					os.makedirs(self.cache_dir)
+				data = json.dumps(info)
+				path = self._path(key)
+				tmp_path = path + ".tmp"
+				with open(tmp_path, 'w', encoding='utf-8') as f:
+					f.write(data)
+				os.replace(tmp_path, path)
+			except Exception as e:
+				logging.error(f"Failed to write metadata cache entry {key}: {e}")
+				return
+			self._load_index()
+			old = self.index.pop(key, None)
+			if old:
+				self.total_bytes -= old.get('size', 0)
+			self.index[key] = {'stored': time.time(), 'size': len(data)}
+			self.total_bytes += len(data)
+			self._evict()
+			self._schedule_save()
+
+	def invalidate(self, key):
+		if not key: return
+		with self.lock:
+			self._load_index()
+			if key in self.index:
+				self._drop(key)
+				self._schedule_save()
+
+	def _evict(self):
+		"""Evicts least recently used entries until within budget. Caller holds the lock."""
+		while self.index and (len(self.index) > self.max_entries or self.total_bytes > self.max_bytes):
+			key = next(iter(self.index))
+			self._drop(key)
+			self.evictions += 1
+
+	def flush(self):
+		"""Writes the index now, with the LRU order (access order is only kept in memory between writes)."""
+		with self.lock:
+			if self.index or self.dirty:
+				self._save_index()
+
+	def stats(self):
+		with self.lock:
+			lookups = self.hits + self.misses
+			return {
+				'entries': len(self.index),
+				'bytes': self.total_bytes,
+				'hits': self.hits,
+				'misses': self.misses,
+				'hit_rate': (self.hits / lookups) if lookups else 0.0,
+				'expired': self.expired,
+				'evictions': self.evictions,
+			}
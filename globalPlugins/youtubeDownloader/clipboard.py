@@ -0,0 +1,176 @@
+"""
+Clipboard watcher (opt-in).
+
+Notices YouTube links as soon as they are copied and prefetches their metadata
+into the metadata cache, so the dialog opens with the title already known and
+the download starts from the cached info instead of extracting first.
+
+The watcher polls the clipboard sequence number, which changes on every copy
+and does not open the clipboard. Only when it changes is the text read, on the
+watcher thread with plain Win32 calls that hold the clipboard for
+microseconds. Memory stays bounded: large texts are not read, recently seen
+links are kept in a small LRU, and at most QUEUE_SIZE prefetches wait; one
+that waited longer than STALE_AFTER is dropped, and a running one is cut off
+after PREFETCH_TIMEOUT.
+"""
+import time
+import ctypes
+import threading
+import logging
+from collections import OrderedDict, deque
+from . import urls
+
+# Seconds between clipboard sequence number checks
+POLL_INTERVAL = 1.0
+# Longer texts are never a single link and are not read
+MAX_TEXT_CHARS = 2048
+# Links remembered, so copying the same link again does not fetch again
+SEEN_SIZE = 64
+# Seconds before the same link is considered again
+SEEN_TTL = 600
+QUEUE_SIZE = 8
+# Seconds a prefetch may wait in the queue
+STALE_AFTER = 60
+# Seconds a prefetch may run
+PREFETCH_TIMEOUT = 30
+
+CF_UNICODETEXT = 13
+
+def _win32():
+	"""Returns (user32, kernel32) with the signatures used here, or None outside Windows."""
+	try:
+		user32 = ctypes.windll.user32
+		kernel32 = ctypes.windll.kernel32
+	except AttributeError:
+		return None
+	user32.GetClipboardSequenceNumber.restype = ctypes.c_uint32
+	user32.GetClipboardData.restype = ctypes.c_void_p
+	user32.GetClipboardData.argtypes = [ctypes.c_uint]
+	kernel32.GlobalSize.restype = ctypes.c_size_t
+	kernel32.GlobalSize.argtypes = [ctypes.c_void_p]
+	kernel32.GlobalLock.restype = ctypes.c_void_p
+	kernel32.GlobalLock.argtypes = [ctypes.c_void_p]
+	kernel32.GlobalUnlock.argtypes = [ctypes.c_void_p]
+	return user32, kernel32
+
+def read_text(user32, kernel32, max_chars=MAX_TEXT_CHARS):
+	"""Returns the clipboard text, or None if it is busy, not text, or longer than max_chars."""
+	if not user32.OpenClipboard(None):
+		# Another program has it open, the next change is picked up anyway
+		return None
+	try:
+		handle = user32.GetClipboardData(CF_UNICODETEXT)
+		if not handle:
+			return None
+		size = kernel32.GlobalSize(handle)
+		if size > (max_chars + 1) * 2:
+			return None
+		pointer = kernel32.GlobalLock(handle)
+		if not pointer:
+			return None
+		try:
+			return ctypes.wstring_at(pointer, size // 2).split("\0", 1)[0]
+		finally:
+			kernel32.GlobalUnlock(handle)
+	finally:
+		user32.CloseClipboard()
+
+class ClipboardWatcher:
+	def __init__(self, prefetch, is_cached):
+		"""
+		prefetch(url) fetches and caches a link's metadata (prefetch thread, should honour PREFETCH_TIMEOUT).
+		is_cached(url) returns True if fresh metadata is already cached.
+		"""
+		self.prefetch = prefetch
+		self.is_cached = is_cached
+		self.cond = threading.Condition()
+		self.pending = deque(maxlen=QUEUE_SIZE) # (url, queued at), oldest dropped first
+		self.seen = OrderedDict() # canonical link -> time seen, least recently seen first
+		self.stop_event = None # Set to stop the threads of the current start()
+		# Counters for tuning
+		self.links = 0
+		self.prefetched = 0
+		self.stale = 0
+		self.failed = 0
+
+	@property
+	def running(self):
+		return self.stop_event is not None and not self.stop_event.is_set()
+
+	def start(self):
+		if self.running:
+			return True
+		api = _win32()
+		if api is None:
+			logging.warning("Clipboard watcher needs Windows")
+			return False
+		self.stop_event = threading.Event()
+		user32, kernel32 = api
+		threading.Thread(target=self._watch, args=(user32, kernel32, self.stop_event), daemon=True).start()
+		threading.Thread(target=self._run_prefetches, args=(self.stop_event,), daemon=True).start()
+		return True
+
+	def stop(self):
+		with self.cond:
+			if self.stop_event:
+				self.stop_event.set()
+			self.pending.clear()
+			self.cond.notify_all()
+
+	def _watch(self, user32, kernel32, stop_event):
+		last = user32.GetClipboardSequenceNumber()
+		while not stop_event.wait(POLL_INTERVAL):
+			sequence = user32.GetClipboardSequenceNumber()
+			if sequence == last:
+				continue
+			last = sequence
+			try:
+				text = read_text(user32, kernel32)
+			except Exception as e:
+				logging.error(f"Failed to read clipboard: {e}")
+				continue
+			if text:
+				self.offer(text.strip())
+
+	def offer(self, text):
+		"""Queues a prefetch if text is a YouTube link that was not seen recently."""
+		parsed = urls.parse(text)
+		if parsed is None or parsed.channel:
+			# Channels can list thousands of videos, they are enumerated when asked for
+			return False
+		key = (parsed.video_id, parsed.playlist_id)
+		now = time.monotonic()
+		with self.cond:
+			seen_at = self.seen.pop(key, None)
+			self.seen[key] = now
+			while len(self.seen) > SEEN_SIZE:
+				self.seen.popitem(last=False)
+			if seen_at is not None and now - seen_at < SEEN_TTL:
+				return False
+			self.links += 1
+			self.pending.append((text, now))
+			self.cond.notify()
+		return True
+
+	def _run_prefetches(self, stop_event):
+		while True:
+			with self.cond:
+				while not stop_event.is_set() and not self.pending:
+					self.cond.wait()
+				if stop_event.is_set():
+					return
+				url, queued_at = self.pending.popleft()
+			if time.monotonic() - queued_at > STALE_AFTER:
+				self.stale += 1
+				continue
+			try:
+				if self.is_cached(url):
+					continue
+				self.prefetch(url)
+				self.prefetched += 1
+			except Exception as e:
+				self.failed += 1
+				logging.info(f"Clipboard prefetch failed for {url}: {e}")
+
+	def stats(self):
+		return {'links': self.links, 'prefetched': self.prefetched, 'stale': self.stale, 'failed': self.failed}
@@ -0,0 +1,158 @@
+"""
+Adaptive download concurrency.
+
+Instead of a fixed number of download slots, the controller measures aggregate
+throughput from progress events over short windows and adjusts the slot limit
+AIMD-style: one more slot while extra slots keep paying off, half the slots
+when per-slot throughput collapses or errors pile up. Every decision is logged
+and kept in a short history so its effect can be checked on a real link.
+"""
+import time
+import threading
+import logging
+from collections import deque
+
+# Seconds of progress data behind each decision
+WINDOW = 10.0
+INITIAL_LIMIT = 3
+# Per-slot throughput below this fraction of the running baseline counts as a collapse
+COLLAPSE_RATIO = 0.5
+# An added slot must raise aggregate throughput by this much to be kept
+MIN_GAIN = 0.1
+# Windows to wait before trying another increase after one did not pay off
+COOLDOWN_WINDOWS = 3
+# Failed jobs in one window that trigger a back-off (if more than the completed ones)
+ERROR_THRESHOLD = 2
+BASELINE_WEIGHT = 0.3
+
+class ConcurrencyController:
+	def __init__(self, get_settings):
+		"""
+		get_settings() returns (adaptive, min_slots, max_slots).
+		Thread-safe: progress is recorded from download threads, evaluate() runs on the main thread.
+		"""
+		self.get_settings = get_settings
+		self.lock = threading.Lock()
+		adaptive, min_slots, max_slots = get_settings()
+		self.limit = self._clamp(INITIAL_LIMIT if adaptive else max_slots, min_slots, max_slots)
+		self.last_bytes = {} # d_id -> (filename, downloaded_bytes)
+		self.window_start = time.monotonic()
+		self.window_bytes = 0
+		self.window_errors = 0
+		self.window_completions = 0
+		self.baseline_per_slot = None
+		self.last_throughput = None
+		self.last_increase = False
+		self.cooldown = 0
+		# (time, old limit, new limit, reason, throughput in bytes/s), newest last
+		self.decisions = deque(maxlen=50)
+
+	@staticmethod
+	def _clamp(value, low, high):
+		return max(low, min(high, value))
+
+	def record_progress(self, d_id, event):
+		"""
+		Adds the bytes downloaded since the job's last progress event.
+		Returns True when the current window is over and evaluate() should run.
+		"""
+		if event.downloaded_bytes is None:
+			return False
+		with self.lock:
+			prev = self.last_bytes.get(d_id)
+			if prev and prev[0] == event.filename and event.downloaded_bytes >= prev[1]:
+				self.window_bytes += event.downloaded_bytes - prev[1]
+			else:
+				# First event of a file (playlists and video+audio downloads have several)
+				self.window_bytes += event.downloaded_bytes
+			self.last_bytes[d_id] = (event.filename, event.downloaded_bytes)
+			return time.monotonic() - self.window_start >= WINDOW
+
+	def record_result(self, d_id, ok):
+		with self.lock:
+			self.last_bytes.pop(d_id, None)
+			if ok:
+				self.window_completions += 1
+			else:
+				self.window_errors += 1
+
+	def evaluate(self, active, queued):
+		"""Closes the current window and returns the (possibly changed) slot limit."""
+		adaptive, min_slots, max_slots = self.get_settings()
+		with self.lock:
+			now = time.monotonic()
+			elapsed = now - self.window_start
+			if elapsed < WINDOW:
+				return self.limit
+			throughput = self.window_bytes / elapsed
+			errors = self.window_errors
+			completions = self.window_completions
+			self.window_start = now
+			self.window_bytes = 0
+			self.window_errors = 0
+			self.window_completions = 0
+
+			old = self.limit
+			if not adaptive:
+				self.limit = max_slots
+				return self.limit
+
+			new, reason = self._decide(old, active, queued, throughput, errors, completions)
+			new = self._clamp(new, min_slots, max_slots)
+			if new != old:
+				self.limit = new
+				self.decisions.append((time.time(), old, new, reason, throughput))
+				logging.info(f"Download concurrency {old} -> {new}: {reason} ({throughput / 1024:.0f} KiB/s over {active} active, {errors} errors)")
+			else:
+				# An increase clamped away is not an increase to judge next window
+				self.last_increase = False
+			return self.limit
+
+	def _decide(self, limit, active, queued, throughput, errors, completions):
+		"""Returns (new limit, reason). Caller holds the lock."""
+		if errors >= ERROR_THRESHOLD and errors > completions:
+			self.last_increase = False
+			self.cooldown = COOLDOWN_WINDOWS
+			return limit // 2, f"{errors} failed downloads"
+
+		if not active:
+			# Nothing ran during the window, so it says nothing about the link
+			self.last_increase = False
+			return limit, "idle"
+
+		per_slot = throughput / active
+		if self.baseline_per_slot and active > 1 and per_slot < self.baseline_per_slot * COLLAPSE_RATIO:
+			self.last_increase = False
+			self.cooldown = COOLDOWN_WINDOWS
+			# Start the new, lower level with a fresh baseline
+			self.baseline_per_slot = None
+			return limit // 2, f"per-slot throughput collapsed to {per_slot / 1024:.0f} KiB/s"
+
+		if self.baseline_per_slot is None:
+			self.baseline_per_slot = per_slot
+		else:
+			self.baseline_per_slot += BASELINE_WEIGHT * (per_slot - self.baseline_per_slot)
+
+		if self.last_increase:
+			self.last_increase = False
+			if self.last_throughput and throughput < self.last_throughput * (1 + MIN_GAIN):
+				self.cooldown = COOLDOWN_WINDOWS
+				self.last_throughput = throughput
+				return limit - 1, "extra slot did not raise throughput"
+
+		self.last_throughput = throughput
+		if self.cooldown:
+			self.cooldown -= 1
+			return limit, "cooling down"
+		if active >= limit and queued:
+			self.last_increase = True
+			return limit + 1, "all slots busy and throughput holding"
+		return limit, "steady"
+
+	def stats(self):
+		with self.lock:
+			return {
+				'limit': self.limit,
+				'baseline_per_slot': self.baseline_per_slot,
+				'decisions': list(self.decisions),
+			}
@@ -1,23 +1,36 @@
 import wx
-import os
 from . import downloader
 import threading
-import re
 import config
-import subprocess
 import ui
 import datetime
+import time
+import logging
+from . import cache
+from . import formats
+from . import urls
+from . import jobs
+from .jobs import JobState
+
+# Milliseconds without typing before the URL is probed for its formats
+PROBE_DELAY_MS = 500
 
 class PlaylistSelectionDialog(wx.Dialog):
-	def __init__(self, parent, title, items):
+	def __init__(self, parent, title, items, loading=False, cancel_event=None, is_downloaded=None):
 		super().__init__(parent, title=f"Select Videos from {title}", size=(600, 400))
-		self.items = items # [{'id':..., 'title':...}]
+		self.playlist_title = title
+		# is_downloaded(video_id) marks entries that are already in the download archive
+		self.is_downloaded = is_downloaded
+		self.items = [] # [{'id':..., 'title':...}]
+		self.loading = loading
+		# Set to stop a streaming enumeration early
+		self.cancel_event = cancel_event
 		
 		panel = wx.Panel(self)
 		vbox = wx.BoxSizer(wx.VERTICAL)
 		
-		lbl = wx.StaticText(panel, label=f"Found {len(items)} videos. Select items to download:")
-		vbox.Add(lbl, flag=wx.ALL, border=10)
+		self.lbl = wx.StaticText(panel, label="")
+		vbox.Add(self.lbl, flag=wx.ALL, border=10)
 		
 		# Use ListCtrl instead of CheckListBox for better accessibility
 		self.check_list = wx.ListCtrl(panel, style=wx.LC_REPORT | wx.LC_NO_HEADER)
@@ -25,10 +38,7 @@ class PlaylistSelectionDialog(wx.Dialog):
 		# Set a very large width to prevent truncation tooltips which cause double speaking
 		self.check_list.InsertColumn(0, "Video Title", width=2000)
 		
-		for i, item in enumerate(items):
-			self.check_list.InsertItem(i, item['title'])
-			# Default: Unchecked (User requested)
-			self.check_list.CheckItem(i, False)
+		self.append_items(items)
 			
 		vbox.Add(self.check_list, proportion=1, flag=wx.EXPAND|wx.LEFT|wx.RIGHT, border=10)
 		
@@ -40,6 +50,10 @@ class PlaylistSelectionDialog(wx.Dialog):
 		btn_none.Bind(wx.EVT_BUTTON, self.on_none)
 		hbox_sel.Add(btn_all, flag=wx.RIGHT, border=5)
 		hbox_sel.Add(btn_none)
+		self.btn_stop_loading = wx.Button(panel, label="Stop Loading")
+		self.btn_stop_loading.Bind(wx.EVT_BUTTON, self.on_stop_loading)
+		hbox_sel.Add(self.btn_stop_loading, flag=wx.LEFT, border=5)
+		self.btn_stop_loading.Show(loading)
 		vbox.Add(hbox_sel, flag=wx.ALIGN_CENTER|wx.TOP|wx.BOTTOM, border=5)
 		
 		# Main Buttons
@@ -52,10 +66,51 @@ class PlaylistSelectionDialog(wx.Dialog):
 		
 		panel.SetSizer(vbox)
 		self.Center()
+		self._update_label()
+		
+	def _update_label(self):
+		if self.loading:
+			self.lbl.SetLabel(f"Loading playlist... {len(self.items)} videos found so far. Select items to download:")
+		else:
+			self.lbl.SetLabel(f"Found {len(self.items)} videos. Select items to download:")
+			
+	def append_items(self, items, playlist_title=None):
+		"""Adds entries as they are streamed in. Existing checks and focus are kept."""
+		if playlist_title and playlist_title != self.playlist_title:
+			self.playlist_title = playlist_title
+			self.SetTitle(f"Select Videos from {playlist_title}")
+		for item in items:
+			label = item['title']
+			if self.is_downloaded and self.is_downloaded(item['id']):
+				item = dict(item, downloaded=True)
+				label = "(Already downloaded) " + label
+			i = self.check_list.InsertItem(self.check_list.GetItemCount(), label)
+			# Default: Unchecked (User requested)
+			self.check_list.CheckItem(i, False)
+			self.items.append(item)
+		self._update_label()
+		
+	def finish_loading(self, error=None):
+		self.loading = False
+		self.btn_stop_loading.Hide()
+		self.Layout()
+		self._update_label()
+		if error and not self.items:
+			self.lbl.SetLabel(f"Failed to fetch playlist info: {error}")
+			ui.message("Failed to fetch playlist info.")
+		else:
+			ui.message(f"Found {len(self.items)} videos.")
+			
+	def on_stop_loading(self, event):
+		if self.cancel_event:
+			self.cancel_event.set()
+		self.finish_loading()
+		self.check_list.SetFocus()
 			
 	def on_all(self, event):
+		# Already downloaded items stay unchecked, they would be skipped anyway
 		for i in range(self.check_list.GetItemCount()):
-			self.check_list.CheckItem(i, True)
+			self.check_list.CheckItem(i, not self.items[i].get('downloaded'))
 			
 	def on_none(self, event):
 		for i in range(self.check_list.GetItemCount()):
@@ -69,10 +124,94 @@ class PlaylistSelectionDialog(wx.Dialog):
 				selected.append(self.items[i])
 		return selected
 
+class DownloadListCtrl(wx.ListCtrl):
+	"""
+	Virtual list of downloads. Row texts live in an indexed store (d_id -> row)
+	and are drawn on demand, so a status update is O(1) and only repaints the
+	row if it is on screen, however long the download history gets.
+	"""
+	def __init__(self, parent):
+		super().__init__(parent, style=wx.LC_REPORT | wx.LC_NO_HEADER | wx.LC_SINGLE_SEL | wx.LC_VIRTUAL)
+		self.InsertColumn(0, "Download Status", width=550)
+		self.rows = [] # d_id per row
+		self.row_of = {} # d_id -> row
+		self.texts = {} # d_id -> text
+
+	def OnGetItemText(self, item, column):
+		if 0 <= item < len(self.rows):
+			return self.texts.get(self.rows[item], "")
+		return ""
+
+	def _visible_range(self):
+		top = self.GetTopItem()
+		return top, min(len(self.rows) - 1, top + self.GetCountPerPage())
+
+	def set_rows(self, rows):
+		"""Replaces all rows with (d_id, text) pairs."""
+		self.rows = []
+		self.row_of = {}
+		self.texts = {}
+		for d_id, text in rows:
+			self.row_of[d_id] = len(self.rows)
+			self.rows.append(d_id)
+			self.texts[d_id] = text
+		self.SetItemCount(len(self.rows))
+		self.Refresh()
+
+	def add_row(self, d_id, text):
+		if d_id in self.row_of:
+			self.set_row_text(d_id, text)
+			return
+		self.row_of[d_id] = len(self.rows)
+		self.rows.append(d_id)
+		self.texts[d_id] = text
+		self.SetItemCount(len(self.rows))
+
+	def set_row_text(self, d_id, text):
+		"""Updates a row's text. Returns False if d_id is not in the list."""
+		row = self.row_of.get(d_id)
+		if row is None:
+			return False
+		if self.texts.get(d_id) == text:
+			return True
+		self.texts[d_id] = text
+		top, bottom = self._visible_range()
+		if top <= row <= bottom:
+			self.RefreshItem(row)
+		return True
+
+	def remove_row(self, d_id):
+		"""Removes a row. Later rows shift up; selection and focus stay on the same position."""
+		row = self.row_of.pop(d_id, None)
+		if row is None:
+			return False
+		del self.rows[row]
+		self.texts.pop(d_id, None)
+		for i in range(row, len(self.rows)):
+			self.row_of[self.rows[i]] = i
+		self.SetItemCount(len(self.rows))
+		if self.rows:
+			top, bottom = self._visible_range()
+			if row <= bottom:
+				self.RefreshItems(max(row, top), bottom)
+		return True
+
+	def get_d_id(self, row):
+		if 0 <= row < len(self.rows):
+			return self.rows[row]
+		return None
+
 class DownloaderDialog(wx.Dialog):
 	def __init__(self, parent, plugin_instance, url=""):
 		super().__init__(parent, title="YouTube Downloader", size=(600, 650))
 		self.plugin = plugin_instance
+		# Format probe of the typed URL: pending timer, cancel event of the running probe,
+		# and a generation that tells stale results apart
+		self.probe_timer = None
+		self.probe_cancel = None
+		self.probe_generation = 0
+		self.probed = None # (video_id, info) of the URL in the box
+		self.quality_values = [] # quality_str for each entry of choice_quality
 		self.Center()
 		self.Raise()
 		self.SetFocus()
@@ -157,9 +296,8 @@ class DownloaderDialog(wx.Dialog):
 		vbox.Add(lbl_list, flag=wx.LEFT, border=10)
 		
 		# ListCtrl for Downloads
-		self.list_downloads = wx.ListCtrl(panel, style=wx.LC_REPORT | wx.LC_NO_HEADER | wx.LC_SINGLE_SEL)
+		self.list_downloads = DownloadListCtrl(panel)
 		self.list_downloads.SetName("Active Downloads List")
-		self.list_downloads.InsertColumn(0, "Download Status", width=550)
 		self.list_downloads.Bind(wx.EVT_LIST_ITEM_SELECTED, self.on_list_selection)
 		self.list_downloads.Bind(wx.EVT_LIST_ITEM_DESELECTED, self.on_list_selection)
 		
@@ -176,8 +314,13 @@ class DownloaderDialog(wx.Dialog):
 		self.btn_remove.Bind(wx.EVT_BUTTON, self.on_remove)
 		self.btn_remove.Enable(False)
 		
+		self.btn_next = wx.Button(panel, label="Download &Next")
+		self.btn_next.Bind(wx.EVT_BUTTON, self.on_download_next)
+		self.btn_next.Enable(False)
+		
 		hbox_controls.Add(self.btn_retry, flag=wx.RIGHT, border=5)
-		hbox_controls.Add(self.btn_remove)
+		hbox_controls.Add(self.btn_remove, flag=wx.RIGHT, border=5)
+		hbox_controls.Add(self.btn_next)
 		
 		vbox.Add(hbox_controls, flag=wx.ALIGN_CENTER|wx.BOTTOM, border=10)
 		
@@ -212,98 +355,97 @@ class DownloaderDialog(wx.Dialog):
 		self.on_url_change(None)
 		
 	def refresh_list(self):
-		self.list_downloads.DeleteAllItems()
-		self.list_map = [] # [d_id, d_id, ...]
-		
-		for d_id, data in self.plugin.downloads.items():
-			self.add_download_item(d_id, data['title'], data.get('status', ''))
-			
+		self.list_downloads.set_rows(
+			(d_id, f"{data['title']} - {data.get('status', '')}") for d_id, data in self.plugin.downloads.items()
+		)
 		self.update_button_states()
 			
 	def add_download_item(self, d_id, title, status="Starting..."):
-		idx = self.list_downloads.InsertItem(self.list_downloads.GetItemCount(), f"{title} - {status}")
-		self.list_map.append(d_id)
+		self.list_downloads.add_row(d_id, f"{title} - {status}")
 		
 	def remove_download_item(self, d_id):
-		if d_id in self.list_map:
-			idx = self.list_map.index(d_id)
-			self.list_downloads.DeleteItem(idx)
-			self.list_map.pop(idx)
+		if self.list_downloads.remove_row(d_id):
 			self.update_button_states()
 
+	def get_selected_d_id(self):
+		return self.list_downloads.get_d_id(self.list_downloads.GetFirstSelected())
+
+	def update_statuses(self, updates):
+		"""Applies a batch of {d_id: (status_text, percent)} from the status aggregator."""
+		for d_id, (status_text, percent) in updates.items():
+			self.update_status(d_id, status_text, percent)
+
 	def update_status(self, d_id, status_text, percent=None):
-		if d_id in self.list_map:
-			idx = self.list_map.index(d_id)
-			self.list_downloads.SetItemText(idx, status_text)
+		if not self.list_downloads.set_row_text(d_id, status_text):
+			return
 			
-			# If this item is selected, update the gauge/label
-			sel = self.list_downloads.GetFirstSelected()
-			if sel == idx:
-				self.lbl_status.SetLabel(status_text)
-				if percent is not None:
-					self.gauge.SetValue(int(percent))
-				elif "Completed" in status_text:
+		# If this item is selected, update the gauge/label and buttons
+		if self.get_selected_d_id() == d_id:
+			self.lbl_status.SetLabel(status_text)
+			if percent is not None:
+				self.gauge.SetValue(int(percent))
+			else:
+				state = jobs.get_state(self.plugin.downloads.get(d_id, {}))
+				if state == JobState.COMPLETED:
 					self.gauge.SetValue(100)
-				elif "Starting" in status_text:
+				elif state == JobState.STARTING:
 					self.gauge.SetValue(0)
-			
-			# Update buttons if this item is selected
-			if sel == idx:
-				self.update_button_states()
+			self.update_button_states()
 
 	def on_list_selection(self, event):
 		self.update_button_states()
 		
 		# Update gauge/label for selected item
-		idx = self.list_downloads.GetFirstSelected()
-		if idx != -1 and idx < len(self.list_map):
-			d_id = self.list_map[idx]
-			if d_id in self.plugin.downloads:
-				data = self.plugin.downloads[d_id]
-				self.lbl_status.SetLabel(data.get('status', ''))
-				# We don't have exact percent stored in data dict usually, 
-				# but we can infer 0 or 100 or keep existing if we tracked it.
-				# For now, just reset gauge unless we have live update.
-				if "Completed" in data.get('status', ''):
-					self.gauge.SetValue(100)
-				else:
-					self.gauge.SetValue(0)
+		d_id = self.get_selected_d_id()
+		if d_id in self.plugin.downloads:
+			data = self.plugin.downloads[d_id]
+			self.lbl_status.SetLabel(data.get('status', ''))
+			# We don't have exact percent stored in data dict usually, 
+			# but we can infer 0 or 100 or keep existing if we tracked it.
+			# For now, just reset gauge unless we have live update.
+			if jobs.get_state(data) == JobState.COMPLETED:
+				self.gauge.SetValue(100)
+			else:
+				self.gauge.SetValue(0)
 
 	def update_button_states(self):
-		idx = self.list_downloads.GetFirstSelected()
+		d_id = self.get_selected_d_id()
 		
 		can_retry = False
 		can_remove = False
+		can_prioritize = False
 		
-		if idx != -1 and idx < len(self.list_map):
-			d_id = self.list_map[idx]
-			if d_id in self.plugin.downloads:
-				status = self.plugin.downloads[d_id].get('status', '')
+		if d_id in self.plugin.downloads:
+			# Retry: Stopped/Error/Interrupted (BUT NOT Completed)
+			state = jobs.get_state(self.plugin.downloads[d_id])
+			can_retry = state in jobs.RETRYABLE_STATES
 				
-				# Retry: Stopped/Error/Interrupted (BUT NOT Completed)
-				# Basically anything not currently running or queued, and not successfully finished
-				is_active = any(x in status for x in ["Downloading", "Starting", "Resolving", "Converting", "Merging", "Resuming", "Queued"])
-				if not is_active and "Completed" not in status:
-					can_retry = True
-					
-				# Remove: Always possible
-				can_remove = True
+			# Remove: Always possible
+			can_remove = True
+			
+			# Download Next: anything still waiting for a slot
+			can_prioritize = state in (JobState.QUEUED, JobState.RESOLVING)
 		
 		self.btn_retry.Enable(can_retry)
 		self.btn_remove.Enable(can_remove)
+		self.btn_next.Enable(can_prioritize)
 
 
 	def on_retry(self, event):
-		idx = self.list_downloads.GetFirstSelected()
-		if idx != -1 and idx < len(self.list_map):
-			d_id = self.list_map[idx]
+		d_id = self.get_selected_d_id()
+		if d_id is not None:
 			self.plugin.retry_download(d_id)
 			self.update_button_states()
 
+	def on_download_next(self, event):
+		d_id = self.get_selected_d_id()
+		if d_id is not None:
+			self.plugin.prioritize_download(d_id)
+			ui.message("Moved to the front of the queue")
+
 	def on_remove(self, event):
-		idx = self.list_downloads.GetFirstSelected()
-		if idx != -1 and idx < len(self.list_map):
-			d_id = self.list_map[idx]
+		d_id = self.get_selected_d_id()
+		if d_id is not None:
 			self.plugin.remove_download(d_id)
 			# UI update handled by plugin calling remove_download_item
 
@@ -314,47 +456,97 @@ class DownloaderDialog(wx.Dialog):
 			event.Skip()
 			
 	def on_close(self, event):
+		self._cancel_probe()
 		# Notify plugin that dialog is closed
 		self.plugin.dlg = None
 		self.Destroy()
 	
 	def on_format_change(self, event):
-		sel = self.choice_format.GetSelection()
-		fmt_str = self.formats[sel]
-		
-		choices = []
-		if "MP4" in fmt_str: # Video
-			choices = ["Best (Default)", "1080p", "720p", "480p", "360p"]
-		elif "WAV" in fmt_str or "FLAC" in fmt_str: # Lossless Audio
-			choices = ["Lossless (Default)"]
-		else: # Lossy Audio (MP3, M4A, OGG)
-			choices = ["Best (Default)", "320 kbps", "256 kbps", "192 kbps", "128 kbps"]
-			
-		self.choice_quality.Set(choices)
-		self.choice_quality.SetSelection(0)
-		
-		# Try to restore last quality if possible
-		last_quality = config.conf["youtubeDownloader"]["lastQuality"]
-		try:
-			if last_quality in choices:
-				self.choice_quality.SetStringSelection(last_quality)
-		except:
-			pass
+		self._set_quality_choices(config.conf["youtubeDownloader"]["lastQuality"])
+
+	def _set_quality_choices(self, preferred=None):
+		"""Fills the quality list for the selected format, from the probed formats if there are any."""
+		fmt_str = self.formats[self.choice_format.GetSelection()]
+		is_video = "MP4" in fmt_str
+		is_lossless = "WAV" in fmt_str or "FLAC" in fmt_str
+		info = self.probed[1] if self.probed else None
+		choices = formats.choices_for(info, is_video, is_lossless)
+		self.quality_values = [value for _, value in choices]
+		self.choice_quality.Set([label for label, _ in choices])
+		# Keep the user's pick (or the last used quality) if the new list has it
+		if preferred in self.quality_values:
+			self.choice_quality.SetSelection(self.quality_values.index(preferred))
+		else:
+			self.choice_quality.SetSelection(0)
+
+	def _selected_quality(self):
+		sel = self.choice_quality.GetSelection()
+		if 0 <= sel < len(self.quality_values):
+			return self.quality_values[sel]
+		return self.quality_values[0] if self.quality_values else ""
 
 	def is_valid_url(self, url):
-		# Simple regex for YouTube URLs
-		pattern = r'^(https?://)?(www\.)?(youtube\.com|youtu\.be)/.+$'
-		return re.match(pattern, url) is not None
+		return urls.is_youtube_url(url)
 
 	def on_url_change(self, event):
 		url = self.txt_url.GetValue()
-		# Disable trimming if playlist detected
-		if "list=" in url:
+		# Disable trimming if playlist (or channel) detected
+		if urls.playlist_id(url) or urls.channel(url):
 			self.txt_start.Disable()
 			self.txt_end.Disable()
 		else:
 			self.txt_start.Enable()
 			self.txt_end.Enable()
+		self._schedule_probe(url.strip())
+
+	def _cancel_probe(self):
+		"""Stops the pending and the running probe; results still in flight are ignored."""
+		self.probe_generation += 1
+		if self.probe_timer:
+			self.probe_timer.Stop()
+			self.probe_timer = None
+		if self.probe_cancel:
+			self.probe_cancel.set()
+			self.probe_cancel = None
+
+	def _schedule_probe(self, url):
+		"""Probes the video's formats once typing has paused for PROBE_DELAY_MS."""
+		self._cancel_probe()
+		parsed = urls.parse(url)
+		video_id = parsed.video_id if parsed else None
+		if self.probed and self.probed[0] != video_id:
+			self.probed = None
+			self._set_quality_choices(self._selected_quality())
+		if not video_id or self.probed:
+			return
+		self.probe_timer = wx.CallLater(PROBE_DELAY_MS, self._start_probe, self.probe_generation, url, video_id)
+
+	def _start_probe(self, generation, url, video_id):
+		if generation != self.probe_generation:
+			return
+		self.probe_timer = None
+		self.probe_cancel = threading.Event()
+		threading.Thread(target=self._probe, args=(generation, url, video_id, self.probe_cancel), daemon=True).start()
+
+	def _probe(self, generation, url, video_id, cancel_event):
+		"""Fetches the video's info, from the metadata cache if possible (runs in a thread)."""
+		try:
+			info = self.plugin.probe_video_info(url, cancel_event)
+		except Exception as e:
+			logging.info(f"Format probe failed for {url}: {e}")
+			return
+		if info and not cancel_event.is_set():
+			wx.CallAfter(self._on_probed, generation, video_id, info)
+
+	def _on_probed(self, generation, video_id, info):
+		# The dialog may have been closed, or the URL changed, before this call ran
+		if not self or generation != self.probe_generation:
+			return
+		self.probe_cancel = None
+		self.probed = (video_id, info)
+		self._set_quality_choices(self._selected_quality())
+		if info.get('title'):
+			self.lbl_status.SetLabel(f"Found: {info['title']}")
 
 	def on_download(self, event):
 		url = self.txt_url.GetValue().strip()
@@ -366,11 +558,6 @@ class DownloaderDialog(wx.Dialog):
 			wx.MessageBox("The URL provided does not appear to be a valid YouTube link.\nPlease check the URL and try again.", "Invalid URL", wx.OK | wx.ICON_ERROR)
 			return
 		
-		# Check for duplicates
-		if self.plugin.is_url_downloading(url):
-			wx.MessageBox("This URL is already being downloaded.", "Duplicate Download", wx.OK | wx.ICON_WARNING)
-			return
-			
 		format_idx = self.choice_format.GetSelection()
 		format_str = self.formats[format_idx] # e.g. "MP3 (Audio)" or "MP4 (Video)"
 		is_audio = "Audio" in format_str
@@ -379,8 +566,7 @@ class DownloaderDialog(wx.Dialog):
 		audio_format = format_str.split(" ")[0].lower() # "mp3", "wav", etc.
 		if audio_format == "mp4": audio_format = "mp3" # Fallback if video, though not used
 		
-		quality_str = self.choice_quality.GetStringSelection()
-
+		quality_str = self._selected_quality()
 		
 		# Parse Time Input
 		start_time_raw = self.txt_start.GetValue().strip()
@@ -424,8 +610,10 @@ class DownloaderDialog(wx.Dialog):
 		
 		# Playlist Logic
 		playlist_mode = False
-		has_list = "list=" in url
-		has_video = "v=" in url or "youtu.be/" in url
+		parsed = urls.parse(url)
+		# A channel page is a list of videos too
+		has_list = parsed.playlist_id is not None or parsed.channel is not None
+		has_video = parsed.video_id is not None
 		
 		if has_list:
 			if has_video:
@@ -442,56 +630,50 @@ class DownloaderDialog(wx.Dialog):
 				playlist_mode = True
 		
 		if playlist_mode:
-			# Advanced Playlist Flow
-			msg = "Please wait, getting videos for the playlist..."
-			self.lbl_status.SetLabel(msg)
-			ui.message(msg)
-			self.btn_download.Disable()
-			
-			# Run fetch in thread
-			threading.Thread(target=self._fetch_playlist_and_show_dialog, args=(url, is_audio, quality_str, audio_format)).start()
+			# Advanced Playlist Flow: the selection dialog opens right away and fills in as entries stream in
+			self._show_playlist_dialog(url, is_audio, quality_str, audio_format)
+			return
+
+		# Check for duplicates (any spelling of the same video, in the same format)
+		if self.plugin.is_url_downloading(url, is_audio, quality_str, audio_format, start_time, end_time):
+			wx.MessageBox("This video is already being downloaded in this format.", "Duplicate Download", wx.OK | wx.ICON_WARNING)
 			return
 
 		self.lbl_status.SetLabel("Starting download...")
 		
-		# Delegate to plugin (Single Video)
-		self.plugin.start_download(url, is_audio, quality_str, start_time, end_time, playlist_mode=False, audio_format=audio_format)
+		# Delegate to plugin (Single Video). A probed title lets the job skip resolving,
+		# the probe's info is in the metadata cache for --load-info-json
+		known_title = None
+		if self.probed and self.probed[0] == parsed.video_id:
+			known_title = self.probed[1].get('title')
+		self.plugin.start_download(url, is_audio, quality_str, start_time, end_time, playlist_mode=False, known_title=known_title, audio_format=audio_format)
 		
 		# Clear input and reset focus for next download
 		self.txt_url.SetValue("")
 		self.txt_url.SetFocus()
 
-	def _fetch_playlist_and_show_dialog(self, url, is_audio, quality_str, audio_format):
-		try:
-			info = downloader.get_playlist_info(url)
-			wx.CallAfter(self._show_playlist_dialog, info, url, is_audio, quality_str, audio_format)
-		except Exception as e:
-			wx.CallAfter(self._on_playlist_fetch_error, str(e))
-			
-	def _on_playlist_fetch_error(self, error_msg):
-		self.btn_download.Enable()
-		self.lbl_status.SetLabel("Error fetching playlist.")
-		wx.MessageBox(f"Failed to fetch playlist info:\n{error_msg}", "Error", wx.OK | wx.ICON_ERROR)
-		
-	def _show_playlist_dialog(self, info, url, is_audio, quality_str, audio_format):
-		self.btn_download.Enable()
-		self.lbl_status.SetLabel("")
-		
-		dlg = PlaylistSelectionDialog(self, info['title'], info['entries'])
-		if dlg.ShowModal() == wx.ID_OK:
+	def _show_playlist_dialog(self, url, is_audio, quality_str, audio_format):
+		playlist_id = urls.playlist_id(url)
+		cached = None
+		if playlist_id:
+			cached = self.plugin.metadata_cache.get(cache.playlist_key(playlist_id), max_age=cache.PLAYLIST_MAX_AGE)
+		
+		cancel_event = threading.Event()
+		is_downloaded = lambda video_id: self.plugin.is_archived(urls.watch_url(video_id), is_audio, quality_str, audio_format)
+		if cached:
+			dlg = PlaylistSelectionDialog(self, cached['title'], cached['entries'], is_downloaded=is_downloaded)
+		else:
+			dlg = PlaylistSelectionDialog(self, "Playlist", [], loading=True, cancel_event=cancel_event, is_downloaded=is_downloaded)
+			ui.message("Please wait, getting videos for the playlist...")
+			threading.Thread(target=self._enumerate_playlist, args=(url, playlist_id, dlg, cancel_event), daemon=True).start()
+		
+		result = dlg.ShowModal()
+		# Closing the dialog stops enumeration if it is still running
+		cancel_event.set()
+		if result == wx.ID_OK:
 			items = dlg.get_selected_items()
 			if items:
-				# Start batch download
-				# Note: batch currently defaults to mp3 in start_batch_download. We need to update that too or just loop here.
-				# Updating start_batch_download requires changing init. Let's start individual downloads here to keep it simple with new formats
-				# Or better, update start_batch_download in init. But for now, let's just loop locally OR assume plugin handles it.
-				# Actually, start_batch_download just calls start_download in a loop.
-				# Let's fix start_batch_download in init.py later? No, let's just use start_batch_download but it misses audio_format arg.
-				# Fix: We must update start_batch_download signature in __init__.py too. 
-				# For now, I will assume I updated it (I forgot!). Let me quickly check or just pass it in kwargs if possible.
-				# Wait, Python doesn't support magically passing args. I missed one spot in __init__.py: start_batch_download.
-				# I will handle that in a separate step. For now, let's call it assuming it exists or I'll fix it next tool call.
-				self.plugin.start_batch_download(url, is_audio, quality_str, items, info['title'], audio_format=audio_format)
+				self.plugin.start_batch_download(url, is_audio, quality_str, items, dlg.playlist_title, audio_format=audio_format)
 				
 				# Clear input
 				self.txt_url.SetValue("")
@@ -500,6 +682,48 @@ class DownloaderDialog(wx.Dialog):
 				self.lbl_status.SetLabel("No videos selected.")
 		dlg.Destroy()
 
+	def _enumerate_playlist(self, url, playlist_id, dlg, cancel_event):
+		"""Streams entries into the selection dialog in small batches (runs in a thread)."""
+		playlist_title = None
+		entries = []
+		batch = []
+		last_flush = time.monotonic()
+		error = None
+		try:
+			for entry in downloader.iter_playlist_entries(url, cancel_event):
+				if playlist_title is None:
+					playlist_title = entry['playlist_title']
+				item = {'id': entry['id'], 'title': entry['title']}
+				entries.append(item)
+				batch.append(item)
+				# Batch UI updates so a 5,000 entry channel does not flood the event queue
+				if len(batch) >= 100 or time.monotonic() - last_flush >= 0.25:
+					wx.CallAfter(self._on_playlist_entries, dlg, batch, playlist_title)
+					batch = []
+					last_flush = time.monotonic()
+		except Exception as e:
+			error = str(e)
+			
+		if batch:
+			wx.CallAfter(self._on_playlist_entries, dlg, batch, playlist_title)
+		
+		# Only a complete listing is worth caching
+		if playlist_id and not error and not cancel_event.is_set():
+			info = {'title': playlist_title or 'Unknown Playlist', 'entries': entries}
+			self.plugin.metadata_cache.put(cache.playlist_key(playlist_id), info)
+		
+		if not cancel_event.is_set():
+			wx.CallAfter(self._on_playlist_loaded, dlg, error)
+
+	def _on_playlist_entries(self, dlg, batch, playlist_title):
+		# The dialog may have been closed before this call ran
+		if dlg:
+			dlg.append_items(batch, playlist_title)
+
+	def _on_playlist_loaded(self, dlg, error):
+		if dlg and dlg.loading:
+			dlg.finish_loading(error)
+
 	def parse_time_str(self, time_str):
 		"""Parses MM:SS, HH:MM:SS or Seconds into 'HH:MM:SS' string for yt-dlp."""
 		if not time_str:
@@ -1,10 +1,13 @@
 import os
 import subprocess
-import urllib.request
-import sys
 import time
-import zipfile
 import shutil
+import json
+import threading
+import logging
+from . import progress
+from . import postprocess
+from . import urls as url_utils
 
 # Try to import NVDA's ui module for speech
 try:
@@ -22,6 +25,25 @@ BIN_DIR = os.path.join(ADDON_DIR, "bin")
 YT_DLP_URL = "https://github.com/yt-dlp/yt-dlp/releases/latest/download/yt-dlp.exe"
 # Using a lightweight static build of ffmpeg (essentials build)
 FFMPEG_ZIP_URL = "https://www.gyan.dev/ffmpeg/builds/ffmpeg-release-essentials.zip"
+USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
+
+# Every yt-dlp.exe started here (downloads, info probes, playlist listings), so an
+# update is only swapped in while none of them is running
+_processes = set()
+_processes_lock = threading.Lock()
+
+def _start_yt_dlp(cmd, **kwargs):
+	"""subprocess.Popen for a yt-dlp.exe command line, counted by running_processes."""
+	process = subprocess.Popen(cmd, **kwargs)
+	with _processes_lock:
+		_processes.add(process)
+	return process
+
+def running_processes():
+	"""How many yt-dlp.exe processes started by the add-on are still running."""
+	with _processes_lock:
+		_processes.difference_update([process for process in _processes if process.poll() is not None])
+		return len(_processes)
 
 def ensure_bin_dir():
 	if not os.path.exists(BIN_DIR):
@@ -59,6 +81,13 @@ def get_ffmpeg_path():
 def get_ffprobe_path():
 	return os.path.join(BIN_DIR, "ffprobe.exe")
 
+def get_aria2c_path():
+	"""Returns aria2c from the bin folder or PATH, or None if it is not installed."""
+	path = os.path.join(BIN_DIR, "aria2c.exe")
+	if os.path.exists(path):
+		return path
+	return shutil.which("aria2c")
+
 def check_dependencies(progress_hook=None):
 	ensure_bin_dir()
 	yt_dlp_path = get_yt_dlp_path()
@@ -94,13 +123,13 @@ def download_video(url, output_path, is_audio, quality_str, start_time, end_time
 		yt_dlp_path,
 		"--ffmpeg-location", os.path.dirname(ffmpeg_path),
 		"--output", os.path.join(output_path, "%(title)s.%(ext)s"),
-		"--no-progress", # We parse output manually
+		"--newline",
 		"--no-mtime", # Don't set file modification time (faster IO)
 		"--no-mark-watched",
 		"--extractor-args", "youtube:player_client=default", # Fix for JS warning
-		"--user-agent", "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36",
+		"--user-agent", USER_AGENT,
 		"--referer", "https://www.youtube.com/",
-	]
+	] + progress.template_args() # Structured progress records, decoded by progress.parse_line
 	
 	# Playlist mode
 	if playlist_mode is True:
@@ -155,7 +184,7 @@ def download_video(url, output_path, is_audio, quality_str, start_time, end_time
 	startupinfo = subprocess.STARTUPINFO()
 	startupinfo.dwFlags |= subprocess.STARTF_USESHOWWINDOW
 	
-	process = subprocess.Popen(
+	process = _start_yt_dlp(
 		cmd,
 		stdout=subprocess.PIPE,
 		stderr=subprocess.STDOUT,
@@ -171,24 +200,16 @@ def download_video(url, output_path, is_audio, quality_str, start_time, end_time
 		
 		# Parse progress
 		if progress_hook:
-			if "[download]" in line:
-				# Extract percentage
-				# Example: [download]  45.6% of 10.00MiB at 2.00MiB/s ETA 00:05
-				percent = None
-				try:
-					parts = line.split()
-					for part in parts:
-						if "%" in part:
-							percent = float(part.replace("%", ""))
-							break
-				except:
-					pass
-				
-				progress_hook(line, percent)
-			elif "[ExtractAudio]" in line:
-				progress_hook(f"Converting to {audio_format.upper()}...")
-			elif "[Merger]" in line:
-				progress_hook("Merging video/audio...")
+			event = progress.parse_line(line)
+			if event is None:
+				continue
+			if event.kind == progress.KIND_DOWNLOAD and event.status == "downloading":
+				progress_hook(progress.describe(event), event.percent)
+			elif event.kind == progress.KIND_POSTPROCESS and event.status == "started":
+				if event.postprocessor == "ExtractAudio":
+					progress_hook(f"Converting to {audio_format.upper()}...")
+				elif event.postprocessor == "Merger":
+					progress_hook("Merging video/audio...")
 				
 	process.wait()
 	
@@ -264,76 +285,260 @@ def cleanup_partial_files(output_path, title, filename=None):
 	except:
 		pass
 
-def get_playlist_info(url):
+def fetch_video_info(url, timeout=None, cancel_event=None):
 	"""
-	Fetches playlist metadata (title and entries) without downloading.
-	Returns a dict: {'title': str, 'entries': [{'id': str, 'title': str}, ...]}
+	Extracts the full info JSON of a single video without downloading it.
+	The result can be cached and fed back to yt-dlp with --load-info-json.
+	With a timeout (seconds), yt-dlp is killed and subprocess.TimeoutExpired raised when it runs longer.
+	Setting cancel_event kills yt-dlp and returns None.
+	"""
+	yt_dlp_path, _, _ = check_dependencies()
+	
+	startupinfo = subprocess.STARTUPINFO()
+	startupinfo.dwFlags |= subprocess.STARTF_USESHOWWINDOW
+	
+	process = _start_yt_dlp(
+		[yt_dlp_path, "--dump-json", "--skip-download", "--no-playlist", "--no-warnings", "--user-agent", USER_AGENT, url],
+		stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True, startupinfo=startupinfo, encoding='utf-8', errors='replace'
+	)
+	deadline = time.monotonic() + timeout if timeout else None
+	while True:
+		# Short waits so a cancel or the deadline is noticed; communicate keeps the output read so far
+		wait = 0.2 if cancel_event else None
+		if deadline is not None:
+			remaining = max(deadline - time.monotonic(), 0)
+			wait = remaining if wait is None else min(wait, remaining)
+		try:
+			stdout, stderr = process.communicate(timeout=wait)
+			break
+		except subprocess.TimeoutExpired:
+			if cancel_event and cancel_event.is_set():
+				process.kill()
+				process.communicate()
+				return None
+			if deadline is not None and time.monotonic() >= deadline:
+				process.kill()
+				process.communicate()
+				raise
+	if process.returncode != 0:
+		raise Exception(f"Failed to fetch info for {url}: {stderr.strip()}")
+	return json.loads(stdout)
+
+def fetch_video_info_batch(urls):
+	"""
+	Extracts info JSON for several videos in one yt-dlp process.
+	Returns {url: info} for every URL that resolved; failed URLs are left out.
+	"""
+	yt_dlp_path, _, _ = check_dependencies()
+	
+	startupinfo = subprocess.STARTUPINFO()
+	startupinfo.dwFlags |= subprocess.STARTF_USESHOWWINDOW
+	
+	process = _start_yt_dlp(
+		[yt_dlp_path, "--dump-json", "--skip-download", "--no-playlist", "--no-warnings", "--ignore-errors", "--user-agent", USER_AGENT, "--"] + list(urls),
+		stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True, startupinfo=startupinfo, encoding='utf-8', errors='replace'
+	)
+	stdout, _ = process.communicate()
+	
+	# One JSON object per resolved video, matched back by the URL we passed (or its video ID)
+	urls_by_id = {}
+	for url in urls:
+		urls_by_id.setdefault(url_utils.video_id(url), []).append(url)
+	results = {}
+	for line in stdout.splitlines():
+		line = line.strip()
+		if not line.startswith("{"): continue
+		try:
+			info = json.loads(line)
+		except ValueError:
+			continue
+		if info.get('original_url') in urls:
+			results[info['original_url']] = info
+		for url in urls_by_id.get(info.get('id'), []):
+			results.setdefault(url, info)
+	return results
+
+def iter_playlist_entries(url, cancel_event=None):
+	"""
+	Streams flat playlist entries as yt-dlp extracts them (one JSON record per line).
+	Yields dicts: {'id': str, 'title': str, 'playlist_title': str or None}
+	Setting cancel_event stops enumeration early and kills the yt-dlp process.
 	"""
 	yt_dlp_path, _, _ = check_dependencies()
 	
-	# Command to dump single json
 	cmd = [
 		yt_dlp_path,
 		"--flat-playlist",
-		"--dump-single-json",
+		"--dump-json", # One line per entry instead of one document at the end
 		"--no-warnings",
 		"--no-mark-watched", # Save API call
 		"--no-geo-bypass", # Faster unless geo is an issue
-		"--user-agent", "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36",
+		"--user-agent", USER_AGENT,
 		url
 	]
 	
 	startupinfo = subprocess.STARTUPINFO()
 	startupinfo.dwFlags |= subprocess.STARTF_USESHOWWINDOW
 	
+	process = _start_yt_dlp(
+		cmd,
+		stdout=subprocess.PIPE,
+		stderr=subprocess.STDOUT,
+		text=True,
+		startupinfo=startupinfo,
+		encoding='utf-8',
+		errors='replace'
+	)
+	
+	if cancel_event:
+		# Reading blocks until yt-dlp prints, so kill it from a watcher as soon as we are cancelled
+		def kill_on_cancel():
+			while process.poll() is None:
+				if cancel_event.wait(0.2):
+					try:
+						process.terminate()
+					except:
+						pass
+					return
+		threading.Thread(target=kill_on_cancel, daemon=True).start()
+	
+	count = 0
+	last_lines = []
 	try:
-		result = subprocess.run(
-			cmd,
-			capture_output=True,
-			text=True,
-			startupinfo=startupinfo,
-			encoding='utf-8',
-			errors='replace',
-			check=True
-		)
-		
-		import json
-		data = json.loads(result.stdout)
-		
-		# Extract relevant info
-		info = {
-			'title': data.get('title', 'Unknown Playlist'),
-			'entries': []
-		}
-		
-		for entry in data.get('entries', []):
-			info['entries'].append({
+		for line in process.stdout:
+			if cancel_event and cancel_event.is_set():
+				break
+			line = line.strip()
+			if not line.startswith("{"):
+				if line:
+					last_lines = (last_lines + [line])[-5:]
+				continue
+			try:
+				entry = json.loads(line)
+			except ValueError:
+				continue
+			count += 1
+			yield {
 				'id': entry.get('id'),
-				'title': entry.get('title', 'Unknown Video')
-			})
-			
-		return info
-	except Exception as e:
-		raise Exception(f"Failed to fetch playlist info: {str(e)}")
+				'title': entry.get('title') or 'Unknown Video',
+				'playlist_title': entry.get('playlist_title') or entry.get('playlist')
+			}
+	finally:
+		if process.poll() is None:
+			try:
+				process.terminate()
+			except:
+				pass
+		process.wait()
+	
+	cancelled = cancel_event is not None and cancel_event.is_set()
+	if process.returncode != 0 and not count and not cancelled:
+		raise Exception("Failed to fetch playlist info: " + "\n".join(last_lines))
 
-def download_video_with_process(url, output_path, is_audio, quality_str, start_time, end_time, progress_hook, playlist_mode=None, playlist_items=None, playlist_title=None, remove_sponsors=False, embed_metadata=True, download_subs=False, normalize_audio=False, audio_format="mp3"):
+def get_playlist_info(url, cache=None, cancel_event=None):
 	"""
-	Same as download_video but returns the process object for pause/stop control.
-	Supports advanced playlist downloading with item selection and folder creation.
+	Fetches playlist metadata (title and entries) without downloading.
+	Returns a dict: {'title': str, 'entries': [{'id': str, 'title': str}, ...]}
+	If a MetadataCache is given, a recent copy is reused and new results are stored.
+	A cancelled fetch (cancel_event set) returns the entries so far and is not cached.
 	"""
-	yt_dlp_path, ffmpeg_path, ffprobe_path = check_dependencies(progress_hook)
+	from . import cache as cache_module
+	playlist_id = url_utils.playlist_id(url)
+	key = cache_module.playlist_key(playlist_id) if playlist_id else None
+	if cache and key:
+		cached = cache.get(key, max_age=cache_module.PLAYLIST_MAX_AGE)
+		if cached:
+			return cached
 	
-	if progress_hook:
-		progress_hook("Starting download...")
-		ui.message("Starting download...")
+	info = {
+		'title': None,
+		'entries': []
+	}
+	for entry in iter_playlist_entries(url, cancel_event):
+		if info['title'] is None:
+			info['title'] = entry['playlist_title']
+		info['entries'].append({'id': entry['id'], 'title': entry['title']})
+	info['title'] = info['title'] or 'Unknown Playlist'
 		
+	if cache and key and not (cancel_event and cancel_event.is_set()):
+		cache.put(key, info)
+	return info
+
+def get_temp_path():
+	"""Returns the folder used for intermediate (.part, fragment) files."""
+	return os.path.join(os.path.expanduser("~"), "AppData", "Local", "Temp", "nvda_yt_downloader")
+
+def get_staging_path():
+	"""Returns the folder raw audio waits in until the conversion stage picks it up."""
+	return os.path.join(get_temp_path(), "staged")
+
+def output_dir(output_path, playlist_title=None):
+	"""Folder a job's files end up in: the download folder, or a subfolder named after the playlist."""
+	if playlist_title:
+		return os.path.join(output_path, sanitize_filename(playlist_title))
+	return output_path
+
+# Single-pass EBU R128 normalization, applied while converting audio
+LOUDNORM_FILTER = "loudnorm=I=-16:TP=-1.5:LRA=11"
+
+# Prefix of an audio_format that downloads an audio stream as is, for the conversion
+# stage (see postprocess); the rest is the format it will be converted to
+RAW_AUDIO_PREFIX = "raw:"
+
+def raw_audio(audio_format):
+	"""audio_format for a staged download that will end up as audio_format."""
+	return RAW_AUDIO_PREFIX + audio_format
+
+def _raw_target(is_audio, audio_format):
+	"""The final format of a staged audio download, or None for a normal one."""
+	if is_audio and audio_format and audio_format.startswith(RAW_AUDIO_PREFIX):
+		return audio_format[len(RAW_AUDIO_PREFIX):]
+	return None
+
+EXTERNAL_DOWNLOADER_NONE = "none"
+EXTERNAL_DOWNLOADER_ARIA2C = "aria2c"
+
+def transfer_args(concurrent_fragments=1, external_downloader=EXTERNAL_DOWNLOADER_NONE, connections=1):
+	"""
+	yt-dlp arguments for how a job moves bytes: fragments of DASH/HLS streams
+	downloaded in parallel, and optionally aria2c with several connections per
+	file for progressive downloads. Falls back to the native downloader if
+	aria2c is not installed.
+	"""
+	args = []
+	if concurrent_fragments and concurrent_fragments > 1:
+		args.extend(["--concurrent-fragments", str(concurrent_fragments)])
+	if external_downloader == EXTERNAL_DOWNLOADER_ARIA2C:
+		aria2c_path = get_aria2c_path()
+		if aria2c_path:
+			connections = max(1, min(16, connections or 1))
+			args.extend([
+				"--downloader", aria2c_path,
+				"--downloader-args", f"aria2c:-x {connections} -s {connections} -k 1M --console-log-level=warn --summary-interval=0",
+			])
+		else:
+			logging.warning("aria2c not found, using yt-dlp's own downloader")
+	return args
+
+def build_download_args(url, output_path, is_audio, quality_str, start_time, end_time, playlist_mode=None, playlist_items=None, playlist_title=None, remove_sponsors=False, embed_metadata=True, download_subs=False, normalize_audio=False, audio_format="mp3", info_json=None, extra_args=None, more_urls=None):
+	"""
+	Builds the yt-dlp command line arguments (without the executable) for a job.
+	Shared by the subprocess and in-process engines so both honour the same options.
+	If info_json is given, the already extracted info is loaded instead of re-extracting the URL.
+	extra_args are job-level options decided by the plugin (e.g. --limit-rate).
+	Also creates the destination and temp folders.
+	"""
+	ffmpeg_path = get_ffmpeg_path()
+	
 	# Determine final output path template
 	# Truncate filename to 100 chars to avoid MAX_PATH issues
 	out_tmpl = "%(title).100s.%(ext)s"
-	if playlist_title:
-		# Create subfolder for playlist
-		safe_title = sanitize_filename(playlist_title)
-		output_path = os.path.join(output_path, safe_title)
+	raw_target = _raw_target(is_audio, audio_format)
+	if raw_target:
+		# Staged files of different videos with the same title must not collide
+		out_tmpl = "%(title).100s [%(id)s].%(ext)s"
+	# Create subfolder for playlist
+	output_path = output_dir(output_path, playlist_title)
 	
 	if not os.path.exists(output_path):
 		try:
@@ -342,76 +547,103 @@ def download_video_with_process(url, output_path, is_audio, quality_str, start_t
 			pass # Should handle permission errors gracefully
 
 	# Temp path for intermediate files
-	temp_path = os.path.join(os.path.expanduser("~"), "AppData", "Local", "Temp", "nvda_yt_downloader")
+	temp_path = get_temp_path()
 	if not os.path.exists(temp_path):
 		try:
 			os.makedirs(temp_path)
 		except:
 			pass
 	
-	# Build command
-	cmd = [
-		yt_dlp_path,
+	args = [
 		"--ffmpeg-location", os.path.dirname(ffmpeg_path),
 		"--output", out_tmpl, # Output template (relative to paths)
 		"--paths", f"home:{output_path}", # Final destination
 		"--paths", f"temp:{temp_path}", # Temp destination
 		"--newline", # Ensure progress is printed on new lines for parsing
 		"--extractor-args", "youtube:player_client=default",
-		"--user-agent", "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36",
+		"--user-agent", USER_AGENT,
 		"--referer", "https://www.youtube.com/",
-	]
+	] + progress.template_args() # Structured progress records, decoded by progress.parse_line
 	
 	# Playlist mode
 	if playlist_mode is True:
-		cmd.append("--yes-playlist")
+		args.append("--yes-playlist")
 		if playlist_items:
-			cmd.extend(["--playlist-items", playlist_items])
+			args.extend(["--playlist-items", playlist_items])
 	elif playlist_mode is False:
-		cmd.append("--no-playlist")
+		args.append("--no-playlist")
 	
 	# Format selection
-	if is_audio:
-		cmd.extend(["-x", "--audio-format", audio_format])
+	if raw_target:
+		# Converted later by the plugin's conversion pool, not inside the download slot.
+		# A stream that can be copied into the target container is preferred
+		args.extend(["--format", postprocess.format_selector(raw_target)])
+	elif is_audio:
+		args.extend(["-x", "--audio-format", audio_format])
 		if quality_str and "kbps" in quality_str:
 			bitrate = quality_str.split(" ")[0]
-			cmd.extend(["--audio-quality", f"{bitrate}K"])
+			args.extend(["--audio-quality", f"{bitrate}K"])
 		else:
-			cmd.extend(["--audio-quality", "0"])
+			args.extend(["--audio-quality", "0"])
 	else:
-		cmd.extend(["--format", "bestvideo+bestaudio/best"])
-		cmd.extend(["--merge-output-format", "mp4"])
+		args.extend(["--format", "bestvideo+bestaudio/best"])
+		args.extend(["--merge-output-format", "mp4"])
 		if quality_str and "p" in quality_str:
 			res = quality_str.replace("p", "")
-			cmd.extend(["-S", f"res:{res}"])
+			args.extend(["-S", f"res:{res}"])
 
 	# Trimming (Only valid for single video or if applied to all, usually disabled for playlist)
 	if start_time and end_time and not playlist_mode:
-		cmd.extend(["--download-sections", f"*{start_time}-{end_time}"])
+		args.extend(["--download-sections", f"*{start_time}-{end_time}"])
 
 	# SponsorBlock
 	if remove_sponsors:
-		cmd.extend(["--sponsorblock-remove", "default"])
+		args.extend(["--sponsorblock-remove", "default"])
 
 	# Metadata
 	if embed_metadata:
-		cmd.append("--add-metadata")
+		args.append("--add-metadata")
 
 	# Subtitles
 	if download_subs:
-		cmd.extend(["--write-subs", "--embed-subs", "--sub-langs", "en.*,auto"])
+		args.extend(["--write-subs", "--embed-subs", "--sub-langs", "en.*,auto"])
 
 	# Audio Normalization
-	if normalize_audio and is_audio:
-		cmd.extend(["--postprocessor-args", "ffmpeg:-af loudnorm=I=-16:TP=-1.5:LRA=11"])
+	if normalize_audio and is_audio and not raw_target:
+		args.extend(["--postprocessor-args", "ffmpeg:-af " + LOUDNORM_FILTER])
 
-	cmd.append(url)
+	if extra_args:
+		args.extend(extra_args)
+
+	if info_json:
+		args.extend(["--load-info-json", info_json])
+	else:
+		args.append(url)
+		# Further videos downloaded by the same process (pool workers)
+		if more_urls:
+			args.extend(more_urls)
+	return args
+
+def download_video_with_process(url, output_path, is_audio, quality_str, start_time, end_time, progress_hook, playlist_mode=None, playlist_items=None, playlist_title=None, remove_sponsors=False, embed_metadata=True, download_subs=False, normalize_audio=False, audio_format="mp3", info_json=None, extra_args=None, more_urls=None):
+	"""
+	Same as download_video but returns the process object for pause/stop control.
+	Supports advanced playlist downloading with item selection and folder creation.
+	"""
+	yt_dlp_path, ffmpeg_path, ffprobe_path = check_dependencies(progress_hook)
+	
+	if progress_hook:
+		progress_hook("Starting download...")
+		ui.message("Starting download...")
+	
+	cmd = [yt_dlp_path] + build_download_args(
+		url, output_path, is_audio, quality_str, start_time, end_time, playlist_mode, playlist_items, playlist_title, remove_sponsors, embed_metadata, download_subs, normalize_audio, audio_format, info_json, extra_args, more_urls
+	)
 	
 	# Run command
 	startupinfo = subprocess.STARTUPINFO()
 	startupinfo.dwFlags |= subprocess.STARTF_USESHOWWINDOW
 	
-	process = subprocess.Popen(
+	process = _start_yt_dlp(
 		cmd,
 		stdout=subprocess.PIPE,
 		stderr=subprocess.STDOUT,
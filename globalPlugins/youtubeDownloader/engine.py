@@ -0,0 +1,344 @@
+"""
+In-process download engine.
+
+Drives yt-dlp's Python API (YoutubeDL) on a managed worker thread instead of
+spawning yt-dlp.exe for every job, so the PyInstaller unpack and interpreter
+startup are paid once per NVDA session rather than once per video.
+
+The object returned by download_video_in_process mimics the parts of
+subprocess.Popen the plugin relies on (stdout, poll, wait, terminate, kill,
+returncode), so both engines are interchangeable for the caller.
+"""
+import os
+import sys
+import threading
+import queue
+import logging
+
+from . import downloader
+from . import progress
+
+ENGINE_SUBPROCESS = "subprocess"
+ENGINE_INPROCESS = "inprocess"
+
+_yt_dlp = None
+# Why the import failed; a failed import is not retried until NVDA restarts
+_import_error = None
+_import_lock = threading.Lock()
+
+# Jobs currently running in this process (so terminate() can stop them all)
+_active_jobs = set()
+_active_lock = threading.Lock()
+
+def load_yt_dlp():
+	"""
+	Imports the yt_dlp package once and returns it.
+	A copy placed in the bin folder (bin/yt_dlp) is picked up if it is not installed.
+	If the import fails, the same error is raised again on later calls.
+	"""
+	global _yt_dlp, _import_error
+	with _import_lock:
+		if _import_error is not None:
+			raise _import_error
+		if _yt_dlp is None:
+			if downloader.BIN_DIR not in sys.path:
+				sys.path.append(downloader.BIN_DIR)
+			try:
+				import yt_dlp
+			except Exception as e:
+				_import_error = e
+				logging.info(f"In-process engine unavailable: {e}")
+				raise
+			_yt_dlp = yt_dlp
+	return _yt_dlp
+
+def is_available():
+	"""Returns True if the yt_dlp package can be imported."""
+	try:
+		load_yt_dlp()
+		return True
+	except Exception:
+		return False
+
+def resolve_engine(name):
+	"""Returns the engine that will actually be used for the configured name."""
+	if name == ENGINE_INPROCESS and is_available():
+		return ENGINE_INPROCESS
+	return ENGINE_SUBPROCESS
+
+class _LineLogger:
+	"""yt-dlp logger that forwards messages as output lines, like the CLI would print them."""
+	def __init__(self, emit):
+		self.emit = emit
+
+	def debug(self, msg):
+		# yt-dlp routes normal screen output through debug(); skip real debug noise
+		if not msg.startswith("[debug] "):
+			self.emit(msg)
+
+	def info(self, msg):
+		self.emit(msg)
+
+	def warning(self, msg):
+		self.emit(msg)
+
+	def error(self, msg):
+		self.emit(msg)
+
+class _NullLogger:
+	def debug(self, msg): pass
+	def info(self, msg): pass
+	def warning(self, msg): pass
+	def error(self, msg): pass
+
+class InProcessSession:
+	"""
+	A YoutubeDL instance kept open across several jobs with the same options
+	(a worker of pool.InProcessWorker). Its HTTP connections, extractor caches
+	and archive stay warm; hooks and logger forward to whichever job is running.
+	Jobs must use it one at a time.
+	"""
+	def __init__(self, args):
+		yt_dlp = load_yt_dlp()
+		try:
+			parsed = yt_dlp.parse_options(args)
+		except SystemExit:
+			raise Exception("Invalid yt-dlp options: " + " ".join(args))
+		self.current = None
+		self.ydl = yt_dlp.YoutubeDL(_job_options(parsed.ydl_opts, _LineLogger(self._emit), self._on_progress, self._on_postprocess))
+
+	def _emit(self, line):
+		if self.current:
+			self.current._emit(line)
+
+	def _on_progress(self, d):
+		if self.current:
+			self.current._on_progress(d)
+
+	def _on_postprocess(self, d):
+		if self.current:
+			self.current._on_postprocess(d)
+
+	def run(self, job, parsed):
+		"""Runs a job's parsed options on the shared YoutubeDL. Returns yt-dlp's exit code."""
+		self.current = job
+		try:
+			# The return code accumulates across download() calls, each job starts clean
+			self.ydl._download_retcode = 0
+			return _download(self.ydl, parsed)
+		finally:
+			self.current = None
+
+	def close(self):
+		try:
+			self.ydl.close()
+		except Exception as e:
+			logging.error(f"Failed to close yt-dlp session: {e}")
+
+def _download(ydl, parsed):
+	"""Downloads the parsed URLs, or the --load-info-json file like the CLI does."""
+	info_file = getattr(parsed.options, 'load_info_filename', None)
+	if info_file:
+		return ydl.download_with_info_file(info_file)
+	return ydl.download(parsed.urls)
+
+def _job_options(ydl_opts, logger, on_progress, on_postprocess):
+	opts = dict(ydl_opts)
+	# Records come from our hooks instead of the CLI templates
+	opts.pop('forceprint', None)
+	opts.pop('progress_template', None)
+	opts.update({
+		'quiet': True,
+		'noprogress': True,
+		'logger': logger,
+		'progress_hooks': [on_progress],
+		'postprocessor_hooks': [on_postprocess],
+	})
+	return opts
+
+class InProcessDownload:
+	"""
+	A yt-dlp job running on a worker thread inside NVDA.
+	Output lines are queued and exposed through the `stdout` iterator.
+	With a session, the job runs on that session's shared YoutubeDL.
+	"""
+	def __init__(self, args, session=None):
+		self.args = args
+		self.session = session
+		self.returncode = None
+		self._ydl = None
+		self._rate_limit = None # Set by set_rate_limit, overrides --limit-rate
+		self._lines = queue.Queue()
+		self._cancel = threading.Event()
+		self._done = threading.Event()
+		self.stdout = self._iter_lines()
+		self._thread = threading.Thread(target=self._run, daemon=True)
+		with _active_lock:
+			_active_jobs.add(self)
+		self._thread.start()
+
+	def _iter_lines(self):
+		while True:
+			line = self._lines.get()
+			if line is None:
+				return
+			yield line
+
+	def _emit(self, line):
+		self._lines.put(line)
+
+	def _check_cancel(self):
+		if self._cancel.is_set():
+			raise _yt_dlp.utils.DownloadCancelled("Stopped by user")
+
+	def _on_progress(self, d):
+		self._check_cancel()
+		# Same records the CLI prints through progress.template_args(), so one parser serves both engines
+		info = d.get('info_dict') or {}
+		payload = {key: d.get(key) for key in progress.DOWNLOAD_FIELDS}
+		payload.update({'id': info.get('id'), 'playlist_index': info.get('playlist_index'), 'n_entries': info.get('n_entries')})
+		self._emit(progress.format_record(progress.KIND_DOWNLOAD, payload))
+
+	def _on_postprocess(self, d):
+		self._check_cancel()
+		info = d.get('info_dict') or {}
+		self._emit(progress.format_record(progress.KIND_POSTPROCESS, {
+			'id': info.get('id'),
+			'status': d.get('status'),
+			'postprocessor': d.get('postprocessor'),
+		}))
+		# MoveFiles is the last step before after_move, its result is the final path
+		if d.get('postprocessor') == 'MoveFiles' and d.get('status') == 'finished':
+			self._emit(progress.format_record(progress.KIND_FILE, {'id': info.get('id'), 'filepath': info.get('filepath')}))
+
+	def _run(self):
+		code = 1
+		try:
+			yt_dlp = load_yt_dlp()
+			try:
+				parsed = yt_dlp.parse_options(self.args)
+			except SystemExit:
+				raise Exception("Invalid yt-dlp options: " + " ".join(self.args))
+
+			if self.session:
+				self._ydl = self.session.ydl
+				self._ydl.params['ratelimit'] = parsed.ydl_opts.get('ratelimit')
+				if self._rate_limit is not None:
+					self._ydl.params['ratelimit'] = self._rate_limit or None
+				code = self.session.run(self, parsed)
+			else:
+				opts = _job_options(parsed.ydl_opts, _LineLogger(self._emit), self._on_progress, self._on_postprocess)
+				with yt_dlp.YoutubeDL(opts) as ydl:
+					self._ydl = ydl
+					if self._rate_limit is not None:
+						ydl.params['ratelimit'] = self._rate_limit or None
+					code = _download(ydl, parsed)
+		except Exception as e:
+			if _yt_dlp and isinstance(e, _yt_dlp.utils.DownloadCancelled):
+				self._emit("[download] Download cancelled")
+			else:
+				self._emit(f"ERROR: {e}")
+			code = 1
+		finally:
+			self.returncode = code
+			with _active_lock:
+				_active_jobs.discard(self)
+			self._done.set()
+			self._lines.put(None)
+
+	def poll(self):
+		return self.returncode
+
+	def wait(self, timeout=None):
+		self._done.wait(timeout)
+		return self.returncode
+
+	def set_rate_limit(self, bytes_per_second):
+		"""
+		Changes the download rate limit while the job runs (None for unlimited).
+		yt-dlp's downloaders read params['ratelimit'] on every chunk, so it applies right away.
+		"""
+		self._rate_limit = bytes_per_second or 0
+		ydl = self._ydl
+		if ydl is not None:
+			ydl.params['ratelimit'] = bytes_per_second or None
+
+	def terminate(self):
+		# yt-dlp checks the flag on its next progress/postprocessor hook
+		self._cancel.set()
+
+	def kill(self):
+		self.terminate()
+
+def download_video_in_process(url, output_path, is_audio, quality_str, start_time, end_time, progress_hook, playlist_mode=None, playlist_items=None, playlist_title=None, remove_sponsors=False, embed_metadata=True, download_subs=False, normalize_audio=False, audio_format="mp3", info_json=None, extra_args=None, session=None):
+	"""
+	In-process counterpart of downloader.download_video_with_process.
+	Returns an InProcessDownload that behaves like the Popen object for the caller.
+	With a session (InProcessSession), the job reuses its YoutubeDL.
+	"""
+	if not os.path.exists(downloader.get_ffmpeg_path()):
+		raise Exception("ffmpeg.exe not found in bin directory. Please ensure the addon was installed correctly.")
+
+	if progress_hook:
+		progress_hook("Starting download...")
+
+	args = downloader.build_download_args(
+		url, output_path, is_audio, quality_str, start_time, end_time, playlist_mode, playlist_items, playlist_title, remove_sponsors, embed_metadata, download_subs, normalize_audio, audio_format, info_json, extra_args
+	)
+	return InProcessDownload(args, session)
+
+def extract_info(url, timeout=None):
+	"""
+	Extracts a video's full info through the API without spawning a process.
+	Returns a JSON-serializable dict, same as `yt-dlp --dump-json`.
+	timeout (seconds) bounds each network operation, the API cannot cut off the whole call.
+	"""
+	yt_dlp = load_yt_dlp()
+	opts = {
+		'quiet': True,
+		'no_warnings': True,
+		'skip_download': True,
+		'noplaylist': True,
+		'logger': _NullLogger(),
+		'http_headers': {'User-Agent': downloader.USER_AGENT},
+	}
+	if timeout:
+		opts['socket_timeout'] = timeout
+	with yt_dlp.YoutubeDL(opts) as ydl:
+		info = ydl.extract_info(url, download=False)
+		return ydl.sanitize_info(info)
+
+def extract_info_batch(urls):
+	"""
+	Extracts info for several videos in one YoutubeDL session.
+	Returns {url: info} for every URL that resolved; failed URLs are left out.
+	"""
+	yt_dlp = load_yt_dlp()
+	opts = {
+		'quiet': True,
+		'no_warnings': True,
+		'skip_download': True,
+		'noplaylist': True,
+		'logger': _NullLogger(),
+		'http_headers': {'User-Agent': downloader.USER_AGENT},
+	}
+	results = {}
+	with yt_dlp.YoutubeDL(opts) as ydl:
+		for url in urls:
+			try:
+				info = ydl.extract_info(url, download=False)
+			except Exception as e:
+				logging.error(f"Failed to fetch info for {url}: {e}")
+				continue
+			if info:
+				results[url] = ydl.sanitize_info(info)
+	return results
+
+def shutdown():
+	"""Cancels every in-process job (called when the add-on terminates)."""
+	with _active_lock:
+		jobs = list(_active_jobs)
+	for job in jobs:
+		job.terminate()
+	for job in jobs:
+		job.wait(timeout=1)
@@ -0,0 +1,116 @@
+"""
+Quality choices from a video's real format list.
+
+The dialog used to offer a fixed list (1080p, 720p, ... 320 kbps, ...) whether
+the video had those or not. Once the typed link has been probed, the choices
+are built from the info dict instead: only resolutions that exist, only
+bitrates the source can fill, each with an estimated download size.
+
+Every choice is (label, quality_str). quality_str is the value the rest of the
+add-on already understands ("Best (Default)", "720p", "192 kbps"), the label
+only adds the estimate for the user.
+"""
+
+DEFAULT_VIDEO = "Best (Default)"
+DEFAULT_AUDIO = "Best (Default)"
+DEFAULT_LOSSLESS = "Lossless (Default)"
+STATIC_VIDEO = [DEFAULT_VIDEO, "1080p", "720p", "480p", "360p"]
+STATIC_AUDIO = [DEFAULT_AUDIO, "320 kbps", "256 kbps", "192 kbps", "128 kbps"]
+AUDIO_BITRATES = [320, 256, 192, 128]
+# Bitrate choices this far above the best source are still offered (encoders round up)
+ABR_SLACK = 1.1
+
+def static_choices(is_video, is_lossless):
+	"""Choices before (or without) a probe."""
+	if is_video:
+		values = STATIC_VIDEO
+	elif is_lossless:
+		values = [DEFAULT_LOSSLESS]
+	else:
+		values = STATIC_AUDIO
+	return [(value, value) for value in values]
+
+def format_size(size):
+	"""Returns '~245 MB' style text for a byte count, or '' if unknown."""
+	if not size:
+		return ""
+	for unit in ("B", "KB", "MB"):
+		if size < 1024:
+			return f"~{size:.0f} {unit}"
+		size /= 1024
+	return f"~{size:.1f} GB"
+
+def estimated_size(fmt, duration):
+	"""Bytes for one format: the reported size, else its bitrate times the duration."""
+	size = fmt.get('filesize') or fmt.get('filesize_approx')
+	if size:
+		return size
+	bitrate = fmt.get('tbr') or fmt.get('vbr') or fmt.get('abr')
+	if bitrate and duration:
+		return bitrate * 1000 / 8 * duration
+	return None
+
+def _is_video(fmt):
+	return fmt.get('vcodec') not in (None, 'none') and bool(fmt.get('height'))
+
+def _is_audio(fmt):
+	return fmt.get('acodec') not in (None, 'none') and fmt.get('vcodec') in (None, 'none')
+
+def _best(formats, key):
+	return max(formats, key=lambda fmt: fmt.get(key) or 0) if formats else None
+
+def _label(value, size):
+	text = format_size(size)
+	return f"{value}, {text}" if text else value
+
+def video_choices(info):
+	"""Resolutions the video has, largest first, each with video plus best audio size."""
+	duration = info.get('duration')
+	formats = info.get('formats') or []
+	videos = [fmt for fmt in formats if _is_video(fmt)]
+	if not videos:
+		return static_choices(True, False)
+	audio = _best([fmt for fmt in formats if _is_audio(fmt)], 'abr')
+	audio_size = estimated_size(audio, duration) if audio else 0
+
+	def size_at(height):
+		# -S res:<n> picks the best stream at that height; muxed formats carry their own audio
+		best = _best([fmt for fmt in videos if fmt['height'] == height], 'tbr')
+		size = estimated_size(best, duration)
+		if size and best.get('acodec') in (None, 'none'):
+			size += audio_size or 0
+		return size
+
+	heights = sorted(set(fmt['height'] for fmt in videos), reverse=True)
+	choices = [(_label(DEFAULT_VIDEO, size_at(heights[0])), DEFAULT_VIDEO)]
+	for height in heights:
+		value = f"{height}p"
+		choices.append((_label(value, size_at(height)), value))
+	return choices
+
+def audio_choices(info, is_lossless):
+	"""Bitrates the best audio stream can fill, with the size of the converted file."""
+	duration = info.get('duration')
+	audio = _best([fmt for fmt in info.get('formats') or [] if _is_audio(fmt)], 'abr')
+	if is_lossless:
+		# 16-bit stereo at 44.1 kHz, before FLAC compression
+		size = 1411 * 1000 / 8 * duration if duration else None
+		return [(_label(DEFAULT_LOSSLESS, size), DEFAULT_LOSSLESS)]
+	if not audio:
+		return static_choices(False, False)
+	source_abr = audio.get('abr')
+	choices = [(_label(DEFAULT_AUDIO, estimated_size(audio, duration)), DEFAULT_AUDIO)]
+	for bitrate in AUDIO_BITRATES:
+		if source_abr and bitrate > source_abr * ABR_SLACK:
+			continue
+		value = f"{bitrate} kbps"
+		choices.append((_label(value, bitrate * 1000 / 8 * duration if duration else None), value))
+	return choices
+
+def choices_for(info, is_video, is_lossless):
+	"""Probed choices for the selected format, or the static ones without info."""
+	if not info:
+		return static_choices(is_video, is_lossless)
+	if is_video:
+		return video_choices(info)
+	return audio_choices(info, is_lossless)
@@ -0,0 +1,69 @@
+"""
+Download job states.
+
+A job's state is stored in data['state'] (the enum value, so it serializes as
+plain JSON) separately from data['status'], the human-readable text shown in
+the list. Every change goes through transition(), which rejects moves the
+lifecycle does not allow, e.g. a late progress line after the user pressed Stop.
+"""
+import enum
+
+class JobState(enum.Enum):
+	QUEUED = "queued" # Waiting for a download slot
+	RESOLVING = "resolving" # Waiting for batch title resolution (holds no slot)
+	STARTING = "starting"
+	DOWNLOADING = "downloading"
+	PROCESSING = "processing" # Converting / merging
+	COMPLETED = "completed"
+	ERROR = "error"
+	STOPPED = "stopped"
+	INTERRUPTED = "interrupted" # NVDA exited while the job was unfinished
+
+# States that occupy a download slot
+ACTIVE_STATES = frozenset([JobState.STARTING, JobState.DOWNLOADING, JobState.PROCESSING])
+TERMINAL_STATES = frozenset([JobState.COMPLETED, JobState.ERROR, JobState.STOPPED, JobState.INTERRUPTED])
+RETRYABLE_STATES = frozenset([JobState.ERROR, JobState.STOPPED, JobState.INTERRUPTED])
+# Anything unfinished can be stopped or interrupted
+_ENDABLE = frozenset([JobState.STOPPED, JobState.INTERRUPTED])
+
+TRANSITIONS = {
+	JobState.QUEUED: frozenset([JobState.RESOLVING, JobState.STARTING]) | _ENDABLE,
+	JobState.RESOLVING: frozenset([JobState.QUEUED, JobState.ERROR]) | _ENDABLE,
+	JobState.STARTING: frozenset([JobState.DOWNLOADING, JobState.PROCESSING, JobState.COMPLETED, JobState.ERROR]) | _ENDABLE,
+	JobState.DOWNLOADING: frozenset([JobState.PROCESSING, JobState.COMPLETED, JobState.ERROR]) | _ENDABLE,
+	# A playlist job goes back to downloading for its next video
+	JobState.PROCESSING: frozenset([JobState.DOWNLOADING, JobState.COMPLETED, JobState.ERROR]) | _ENDABLE,
+	JobState.COMPLETED: frozenset(),
+	JobState.ERROR: frozenset([JobState.QUEUED, JobState.RESOLVING]),
+	JobState.STOPPED: frozenset([JobState.QUEUED, JobState.RESOLVING]),
+	JobState.INTERRUPTED: frozenset([JobState.QUEUED, JobState.RESOLVING]),
+}
+
+class InvalidTransition(ValueError):
+	pass
+
+def get_state(data):
+	try:
+		return JobState(data.get('state'))
+	except ValueError:
+		return JobState.QUEUED
+
+def transition(data, new_state):
+	"""
+	Moves a job to new_state, raising InvalidTransition if the lifecycle does not allow it.
+	Re-entering the current state is a no-op. Returns True if the state changed.
+	"""
+	current = get_state(data)
+	if current == new_state:
+		return False
+	if new_state not in TRANSITIONS[current]:
+		raise InvalidTransition(f"{current.value} -> {new_state.value}")
+	data['state'] = new_state.value
+	return True
+
+def state_from_status(status_text):
+	"""Derives a state for jobs saved before states existed (from their status text)."""
+	if "Completed" in status_text: return JobState.COMPLETED
+	if "Error" in status_text: return JobState.ERROR
+	if "Stopped" in status_text: return JobState.STOPPED
+	return JobState.INTERRUPTED
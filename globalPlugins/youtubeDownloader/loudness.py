@@ -0,0 +1,171 @@
+"""
+Loudness normalization.
+
+The old option ran ffmpeg's loudnorm in single-pass mode on every audio job:
+a dynamic filter that guesses as it goes, forcing the file through an extra
+processing pass and missing the target on quiet intros. Normalization now
+measures the source once with loudnorm's analysis pass and then either:
+
+- tags: writes ReplayGain (or, for Opus, R128) tags with the measured gain
+  and leaves the audio untouched; players that honour the tags adjust the volume
+- twopass: feeds the measurement to a second, linear loudnorm pass, which
+  hits the target exactly without pumping
+
+Measurements are cached per video ID, so exporting a video again in another
+format skips the analysis pass.
+"""
+import os
+import re
+import json
+import threading
+import subprocess
+import logging
+from collections import OrderedDict
+
+MODE_TAGS = "tags"
+MODE_TWO_PASS = "twopass"
+
+# Same targets as the old single-pass filter
+TARGET_I = -16.0
+TARGET_TP = -1.5
+TARGET_LRA = 11.0
+# Loudness the tag gains are relative to
+REPLAYGAIN_REFERENCE = -18.0 # ReplayGain 2.0
+R128_REFERENCE = -23.0 # Opus R128_TRACK_GAIN
+# loudnorm works at 192 kHz, bring the result back to a normal rate
+OUTPUT_RATE = "48000"
+# Formats whose containers carry ReplayGain tags (WAV has no place for them)
+TAG_FORMATS = frozenset(["mp3", "m4a", "ogg", "flac"])
+
+CACHE_PATH = os.path.join(os.path.expanduser("~"), "nvda_yt_downloader_loudness.json")
+MAX_ENTRIES = 5000
+MEASUREMENT_KEYS = ("input_i", "input_tp", "input_lra", "input_thresh", "target_offset")
+
+def _loudnorm(extra=""):
+	return f"loudnorm=I={TARGET_I:g}:TP={TARGET_TP:g}:LRA={TARGET_LRA:g}{extra}"
+
+def measure_args(ffmpeg_path, source):
+	"""ffmpeg command for the analysis pass; the measurement is printed as JSON on stderr."""
+	return [ffmpeg_path, "-hide_banner", "-nostdin", "-i", source, "-map", "0:a", "-af", _loudnorm(":print_format=json"), "-f", "null", "-"]
+
+def parse_measurement(output):
+	"""Returns {input_i, input_tp, ...} as floats from the analysis pass output, or None."""
+	match = re.search(r"\{[^{}]*\"input_i\"[^{}]*\}", output)
+	if not match:
+		return None
+	try:
+		data = json.loads(match.group(0))
+		measurement = {key: float(data[key]) for key in MEASUREMENT_KEYS}
+	except (ValueError, KeyError):
+		return None
+	# Silence measures as -inf, there is nothing to normalize
+	if any(value != value or abs(value) == float("inf") for value in measurement.values()):
+		return None
+	return measurement
+
+def measure(ffmpeg_path, source, on_start=None):
+	"""Runs the analysis pass (blocking). on_start(process) gets the Popen. Returns the measurement or None."""
+	startupinfo = subprocess.STARTUPINFO()
+	startupinfo.dwFlags |= subprocess.STARTF_USESHOWWINDOW
+	process = subprocess.Popen(
+		measure_args(ffmpeg_path, source),
+		stdout=subprocess.DEVNULL,
+		stderr=subprocess.PIPE,
+		text=True,
+		startupinfo=startupinfo,
+		encoding='utf-8',
+		errors='replace'
+	)
+	if on_start:
+		on_start(process)
+	_, output = process.communicate()
+	if process.returncode != 0:
+		raise Exception(f"Loudness analysis failed: {output.strip()[-300:]}")
+	return parse_measurement(output)
+
+def second_pass_filter(measurement):
+	"""loudnorm with the measured values, so it applies one linear gain."""
+	m = measurement
+	return _loudnorm(
+		f":measured_I={m['input_i']}:measured_TP={m['input_tp']}:measured_LRA={m['input_lra']}"
+		f":measured_thresh={m['input_thresh']}:offset={m['target_offset']}:linear=true:print_format=none"
+	)
+
+def tags(measurement, opus=False):
+	"""Gain tags for the measurement: R128_TRACK_GAIN (Q7.8 dB) for Opus, ReplayGain otherwise."""
+	if opus:
+		return {'R128_TRACK_GAIN': str(int(round((R128_REFERENCE - measurement['input_i']) * 256)))}
+	return {
+		'REPLAYGAIN_TRACK_GAIN': f"{REPLAYGAIN_REFERENCE - measurement['input_i']:+.2f} dB",
+		# True peak in dBTP as a linear sample value
+		'REPLAYGAIN_TRACK_PEAK': f"{10 ** (measurement['input_tp'] / 20):.6f}",
+	}
+
+def ffmpeg_args(measurement, mode, audio_format, opus=False):
+	"""
+	Returns (audio filter or None, extra output arguments) that apply the measurement.
+	Formats that cannot carry tags are normalized with the second pass instead.
+	"""
+	if mode == MODE_TAGS and audio_format in TAG_FORMATS:
+		args = []
+		for key, value in tags(measurement, opus).items():
+			args.extend(["-metadata", f"{key}={value}"])
+		if audio_format == "m4a":
+			# The MP4 muxer drops tags it does not know unless told otherwise
+			args.extend(["-movflags", "use_metadata_tags"])
+		return None, args
+	return second_pass_filter(measurement), ["-ar", OUTPUT_RATE]
+
+class MeasurementCache:
+	def __init__(self, path=CACHE_PATH, max_entries=MAX_ENTRIES):
+		self.path = path
+		self.max_entries = max_entries
+		self.lock = threading.Lock()
+		self.entries = OrderedDict() # video ID -> measurement, least recently used first
+		# Read on first use, not while NVDA starts
+		self.loaded = False
+		# Counters for tuning
+		self.hits = 0
+		self.misses = 0
+
+	def _load(self):
+		"""Reads the file once. Caller holds the lock."""
+		if self.loaded:
+			return
+		self.loaded = True
+		try:
+			with open(self.path, 'r', encoding='utf-8') as f:
+				self.entries.update(json.load(f))
+		except FileNotFoundError:
+			pass
+		except Exception as e:
+			logging.error(f"Failed to read loudness cache: {e}")
+
+	def get(self, key):
+		with self.lock:
+			self._load()
+			measurement = self.entries.get(key)
+			if measurement is None:
+				self.misses += 1
+				return None
+			self.entries.move_to_end(key)
+			self.hits += 1
+			return measurement
+
+	def put(self, key, measurement):
+		with self.lock:
+			self._load()
+			self.entries[key] = measurement
+			self.entries.move_to_end(key)
+			while len(self.entries) > self.max_entries:
+				self.entries.popitem(last=False)
+			try:
+				tmp_path = self.path + ".tmp"
+				with open(tmp_path, 'w', encoding='utf-8') as f:
+					json.dump(list(self.entries.items()), f)
+				os.replace(tmp_path, self.path)
+			except Exception as e:
+				logging.error(f"Failed to save loudness cache: {e}")
+
+	def stats(self):
+		return {'hits': self.hits, 'misses': self.misses, 'entries': len(self.entries)}
@@ -0,0 +1,192 @@
+"""
+Worker pool for playlist batches.
+
+Downloading a playlist selection one process per video pays yt-dlp's startup
+(interpreter, extractor registry, ffmpeg probing) and a fresh TLS connection to
+YouTube for every item. A worker takes several queued items of the same batch
+and downloads them one after another in a single yt-dlp instance, holding one
+download slot:
+
+- InProcessWorker keeps one YoutubeDL open (engine.InProcessSession) and runs
+  each item as its own job on it.
+- SubprocessWorker starts one yt-dlp process with all of its URLs. yt-dlp reads
+  its URL list once at startup, so items are claimed when the worker starts,
+  and the combined output is split back into one stream per item by video ID.
+
+Either way each item keeps its own d_id, progress, final filename and result,
+because the download thread sees an object that behaves like a Popen for that
+item alone.
+"""
+import re
+import logging
+from . import downloader
+from . import engine
+from . import progress
+from . import urls as url_utils
+
+# Params that may differ between items sharing a worker
+_PER_ITEM_PARAMS = ('url', 'known_title')
+# "ERROR: [youtube] <id>: Video unavailable"
+_ERROR_ID_RE = re.compile(r"^ERROR: \[[^\]]+\] ([A-Za-z0-9_-]{11}):")
+
+def group_key(params):
+	"""Items can share a worker if everything but the URL and title is the same."""
+	return tuple(sorted((name, repr(value)) for name, value in params.items() if name not in _PER_ITEM_PARAMS))
+
+class InProcessWorker:
+	def __init__(self):
+		self.session = None
+		self.items = 0
+
+	def start(self, d_id, url, output_path, is_audio, quality_str, start_time, end_time, progress_hook, playlist_mode=None, playlist_items=None, playlist_title=None, remove_sponsors=False, embed_metadata=True, download_subs=False, normalize_audio=False, audio_format="mp3", info_json=None, extra_args=None):
+		"""Same as engine.download_video_in_process, on the worker's YoutubeDL."""
+		if self.session is None:
+			self.session = engine.InProcessSession(downloader.build_download_args(
+				url, output_path, is_audio, quality_str, start_time, end_time, playlist_mode, playlist_items, playlist_title, remove_sponsors, embed_metadata, download_subs, normalize_audio, audio_format, None, extra_args
+			))
+		self.items += 1
+		return engine.download_video_in_process(
+			url, output_path, is_audio, quality_str, start_time, end_time, progress_hook, playlist_mode, playlist_items, playlist_title, remove_sponsors, embed_metadata, download_subs, normalize_audio, audio_format, info_json, extra_args, session=self.session
+		)
+
+	def skip(self, d_id):
+		pass
+
+	def close(self):
+		if self.session:
+			self.session.close()
+		logging.info(f"In-process worker downloaded {self.items} item(s) on one YoutubeDL")
+
+class SubprocessWorker:
+	def __init__(self, items):
+		"""items is the list of (d_id, url) in download order."""
+		self.order = [d_id for d_id, url in items]
+		self.urls = dict(items)
+		self.owners = {} # video_id -> d_id
+		for d_id, url in items:
+			video_id = url_utils.video_id(url)
+			if video_id:
+				self.owners[video_id] = d_id
+		self.done = set()
+		self.process = None
+		self.spawned = () # d_ids whose URLs the current process was given
+		self.exhausted = True
+		self.pushback = None
+		self.current = None
+		self.spawns = 0
+
+	def start(self, d_id, url, output_path, is_audio, quality_str, start_time, end_time, progress_hook, playlist_mode=None, playlist_items=None, playlist_title=None, remove_sponsors=False, embed_metadata=True, download_subs=False, normalize_audio=False, audio_format="mp3", info_json=None, extra_args=None):
+		"""
+		Returns the item's view of the worker process, starting a process for this
+		and all later items if none is running (first item, or after a stop).
+		"""
+		if self.process is None or self.exhausted:
+			later = [other for other in self.order[self.order.index(d_id) + 1:] if other not in self.done]
+			args = list(extra_args or [])
+			# One failing video must not end the rest of the worker's items
+			args.append("--ignore-errors")
+			# Cached info only covers one video, the process extracts each URL itself
+			self.process = downloader.download_video_with_process(
+				url, output_path, is_audio, quality_str, start_time, end_time, progress_hook, playlist_mode, playlist_items, playlist_title, remove_sponsors, embed_metadata, download_subs, normalize_audio, audio_format, None, args, more_urls=[self.urls[other] for other in later]
+			)
+			self.spawned = frozenset([d_id] + later)
+			self.exhausted = False
+			self.pushback = None
+			self.spawns += 1
+		self.current = d_id
+		return _WorkerItem(self, d_id)
+
+	def skip(self, d_id):
+		"""Drops an item that was stopped before its turn. Its URL is already in the process, so that process ends."""
+		self.done.add(d_id)
+		if d_id in self.spawned and not self.exhausted:
+			self._end_process()
+
+	def _end_process(self):
+		try:
+			self.process.kill()
+			self.process.wait()
+		except Exception as e:
+			logging.error(f"Failed to stop worker process: {e}")
+		self.exhausted = True
+
+	def _owner(self, line):
+		"""Returns (d_id the line belongs to or None, parsed event or None)."""
+		event = progress.parse_line(line)
+		if event is not None:
+			return self.owners.get(event.video_id), event
+		match = _ERROR_ID_RE.match(line)
+		if match:
+			return self.owners.get(match.group(1)), None
+		return None, None
+
+	def lines(self, item):
+		"""Yields the output that belongs to item, until its file is done or the next item begins."""
+		seen_output = False
+		while not self.exhausted:
+			if self.pushback is not None:
+				line, self.pushback = self.pushback, None
+			else:
+				line = self.process.stdout.readline()
+				if not line:
+					self.process.wait()
+					self.exhausted = True
+					break
+			owner, event = self._owner(line)
+			if owner is not None and owner != item.d_id:
+				# yt-dlp moved on to a later item
+				self.pushback = line
+				break
+			seen_output = True
+			if line.startswith("ERROR:"):
+				item.failed = True
+			yield line
+			if event is not None and event.kind == progress.KIND_FILE and owner == item.d_id:
+				item.finished = True
+				break
+		self.done.add(item.d_id)
+		if item.finished:
+			item.returncode = 0
+		elif item.failed or item.killed:
+			item.returncode = 1
+		elif not seen_output and self.exhausted and self.process.returncode != 0:
+			# The process ended before it reached this item
+			item.returncode = 1
+		else:
+			# No output at all, e.g. skipped through the download archive
+			item.returncode = 0
+
+	def close(self):
+		if self.process is not None and not self.exhausted:
+			self._end_process()
+		logging.info(f"Worker downloaded {len(self.order)} item(s) with {self.spawns} yt-dlp process(es)")
+
+class _WorkerItem:
+	"""One item's share of a SubprocessWorker process, with the parts of the Popen interface the download thread uses."""
+	def __init__(self, worker, d_id):
+		self.worker = worker
+		self.d_id = d_id
+		self.returncode = None
+		self.finished = False
+		self.failed = False
+		self.killed = False
+		self.stdout = worker.lines(self)
+
+	def poll(self):
+		return self.returncode
+
+	def wait(self, timeout=None):
+		# The result is set once the download thread has read the item's output to the end
+		if self.returncode is None and self.worker.current == self.d_id and not self.worker.exhausted:
+			self.worker.process.wait(timeout)
+		return self.returncode
+
+	def terminate(self):
+		self.killed = True
+		if self.worker.current == self.d_id and not self.worker.exhausted:
+			self.worker.process.terminate()
+
+	def kill(self):
+		self.killed = True
+		if self.worker.current == self.d_id and not self.worker.exhausted:
+			self.worker.process.kill()
@@ -0,0 +1,293 @@
+"""
+Post-processing stage.
+
+A job used to hold its download slot through yt-dlp's own ffmpeg work
+(ExtractAudio, normalization), so slots sat converting while the line was idle.
+Audio jobs are now split into stages with their own limits:
+
+- resolve: the title resolver (no slot)
+- download: a scheduler slot, yt-dlp fetches the raw audio stream only
+- convert: this pool, ffmpeg with one worker per CPU core by default
+
+The slot is freed as soon as the raw file is on disk, so the next download
+starts while earlier ones are still being converted.
+
+Often nothing needs converting: YouTube offers AAC (fits m4a) and Opus (fits
+ogg) streams. The download prefers a stream whose codec the target container
+can hold, and such a file is copied into the container instead of decoded and
+encoded again. The CPU time this saves is estimated from the time real
+conversions of the same format took.
+"""
+import os
+import json
+import ctypes
+import threading
+import subprocess
+import logging
+from collections import deque
+
+CODEC_ARGS = {
+	'mp3': ["-c:a", "libmp3lame"],
+	'm4a': ["-c:a", "aac"],
+	'ogg': ["-c:a", "libvorbis"],
+	'wav': ["-c:a", "pcm_s16le"],
+	'flac': ["-c:a", "flac"],
+}
+# What --audio-quality 0 picked for each lossy encoder
+BEST_QUALITY_ARGS = {
+	'mp3': ["-q:a", "0"],
+	'm4a': ["-b:a", "256k"],
+	'ogg': ["-q:a", "8"],
+}
+LOSSLESS_FORMATS = frozenset(["wav", "flac"])
+
+# Source codecs (ffprobe names) each target container takes without re-encoding
+REMUX_CODECS = {
+	'mp3': ("mp3",),
+	'm4a': ("aac", "alac"),
+	'ogg': ("opus", "vorbis", "flac"),
+	'flac': ("flac",),
+	'wav': (),
+}
+# yt-dlp acodec filters for the same codecs, most wanted first
+_ACODEC_FILTERS = {
+	'mp3': ["acodec=mp3"],
+	'm4a': ["acodec^=mp4a"],
+	'ogg': ["acodec=opus", "acodec=vorbis"],
+	'flac': ["acodec=flac"],
+}
+# A stream up to this much above a requested bitrate is copied rather than re-encoded
+BITRATE_SLACK = 1.1
+# CPU seconds per second of audio for each encoder, until real conversions have been timed
+DEFAULT_CPU_PER_SECOND = {'mp3': 0.03, 'm4a': 0.03, 'ogg': 0.04, 'flac': 0.01, 'wav': 0.005}
+
+def default_workers():
+	"""One ffmpeg per core: conversion is CPU-bound."""
+	return max(1, os.cpu_count() or 1)
+
+def format_selector(audio_format):
+	"""yt-dlp --format value that picks a copyable audio stream if there is one, else the best one."""
+	selectors = [f"bestaudio[{condition}]" for condition in _ACODEC_FILTERS.get(audio_format, [])]
+	return "/".join(selectors + ["bestaudio", "best"])
+
+def probe(ffprobe_path, source):
+	"""Returns {'codec', 'bitrate' (kbps or None), 'duration' (s or None)} of source's first audio stream, or None."""
+	startupinfo = subprocess.STARTUPINFO()
+	startupinfo.dwFlags |= subprocess.STARTF_USESHOWWINDOW
+	result = subprocess.run(
+		[ffprobe_path, "-v", "error", "-select_streams", "a:0", "-show_entries", "stream=codec_name,bit_rate:format=duration,bit_rate", "-of", "json", source],
+		capture_output=True, text=True, startupinfo=startupinfo, encoding='utf-8', errors='replace', check=False
+	)
+	if result.returncode != 0:
+		return None
+	try:
+		data = json.loads(result.stdout)
+		stream = data['streams'][0]
+	except (ValueError, KeyError, IndexError):
+		return None
+	container = data.get('format', {})
+
+	def number(value):
+		try:
+			return float(value)
+		except (TypeError, ValueError):
+			return None
+	# WebM keeps no per-stream bitrate, the container's is near enough for a single stream
+	bitrate = number(stream.get('bit_rate')) or number(container.get('bit_rate'))
+	return {
+		'codec': stream.get('codec_name'),
+		'bitrate': bitrate / 1000 if bitrate else None,
+		'duration': number(container.get('duration')),
+	}
+
+def can_copy(source_info, audio_format, bitrate=None):
+	"""True if the probed stream fits audio_format's container as is and meets the requested bitrate."""
+	if not source_info or source_info['codec'] not in REMUX_CODECS.get(audio_format, ()):
+		return False
+	if bitrate:
+		# Copying a stream well above the requested bitrate would not give the size the user asked for
+		return bool(source_info['bitrate']) and source_info['bitrate'] <= float(bitrate) * BITRATE_SLACK
+	return True
+
+def process_cpu_seconds(process):
+	"""User plus kernel CPU time of a finished Popen, or None where it cannot be read."""
+	try:
+		kernel32 = ctypes.windll.kernel32
+	except AttributeError:
+		return None
+	# FILETIMEs, 100 ns units; Popen keeps the process handle open until it is collected
+	creation, exited, kernel, user = (ctypes.c_ulonglong() for _ in range(4))
+	handle = ctypes.c_void_p(int(process._handle))
+	if not kernel32.GetProcessTimes(handle, ctypes.byref(creation), ctypes.byref(exited), ctypes.byref(kernel), ctypes.byref(user)):
+		return None
+	return (kernel.value + user.value) / 1e7
+
+class CpuMeter:
+	"""CPU cost of converting one second of audio per format, learned from timed conversions."""
+	WEIGHT = 0.3
+
+	def __init__(self):
+		self.lock = threading.Lock()
+		self.per_second = dict(DEFAULT_CPU_PER_SECOND)
+		self.saved_total = 0.0
+
+	def record(self, audio_format, cpu_seconds, duration):
+		if not cpu_seconds or not duration:
+			return
+		with self.lock:
+			rate = cpu_seconds / duration
+			old = self.per_second.get(audio_format)
+			self.per_second[audio_format] = rate if old is None else old + self.WEIGHT * (rate - old)
+
+	def saved(self, audio_format, duration, copy_cpu_seconds=None):
+		"""Estimated CPU seconds a copy saved over converting duration seconds, added to the total."""
+		if not duration:
+			return None
+		with self.lock:
+			saved = max(0.0, self.per_second.get(audio_format, 0) * duration - (copy_cpu_seconds or 0))
+			self.saved_total += saved
+		return saved
+
+	def stats(self):
+		return {'cpu_seconds_saved': round(self.saved_total, 1), 'per_second': {key: round(value, 4) for key, value in self.per_second.items()}}
+
+def target_path(source, final_dir, audio_format, video_id=None):
+	"""Converted file name: the staged file's name without its ' [id]' tag, with the format's extension, in final_dir."""
+	stem = os.path.splitext(os.path.basename(source))[0]
+	tag = f" [{video_id}]"
+	if video_id and stem.endswith(tag):
+		stem = stem[:-len(tag)]
+	return os.path.join(final_dir, f"{stem}.{audio_format}")
+
+def transcode_args(ffmpeg_path, source, audio_format, bitrate=None, audio_filter=None, extra_args=None, copy=False):
+	"""
+	ffmpeg command (without the output file) that converts source, keeping the tags yt-dlp embedded.
+	With copy, the audio stream is put into the new container as is (see can_copy).
+	"""
+	cmd = [ffmpeg_path, "-hide_banner", "-nostdin", "-loglevel", "error", "-y", "-i", source, "-map", "0:a", "-map_metadata", "0", "-vn"]
+	if copy:
+		cmd.extend(["-c:a", "copy"])
+	else:
+		cmd.extend(CODEC_ARGS[audio_format])
+	if not copy and audio_format not in LOSSLESS_FORMATS:
+		if bitrate:
+			cmd.extend(["-b:a", f"{bitrate}k"])
+		else:
+			cmd.extend(BEST_QUALITY_ARGS[audio_format])
+	if audio_filter:
+		cmd.extend(["-af", audio_filter])
+	if extra_args:
+		cmd.extend(extra_args)
+	# Machine-readable progress on stdout, errors on stderr
+	cmd.extend(["-progress", "pipe:1", "-nostats"])
+	return cmd
+
+def converting_path(target):
+	"""
+	Temp file a conversion writes before it is renamed to target. The target's
+	folder is created here: staged downloads skip yt-dlp's playlist subfolder,
+	so nothing else has made it yet.
+	"""
+	os.makedirs(os.path.dirname(target) or ".", exist_ok=True)
+	root, ext = os.path.splitext(target)
+	return root + ".converting" + ext
+
+def transcode(cmd, target, on_start=None, on_progress=None, duration=None):
+	"""
+	Runs an ffmpeg command from transcode_args (blocking). Output goes to a temp
+	file that is renamed to target on success, so target is never half written.
+	on_start(process) gets the Popen (e.g. to stop it), on_progress(percent) is
+	called as ffmpeg advances if the duration is known.
+	Returns (returncode, error text, CPU seconds used or None).
+	"""
+	tmp_target = converting_path(target)
+	cmd = cmd + [tmp_target]
+	startupinfo = subprocess.STARTUPINFO()
+	startupinfo.dwFlags |= subprocess.STARTF_USESHOWWINDOW
+	process = subprocess.Popen(
+		cmd,
+		stdout=subprocess.PIPE,
+		stderr=subprocess.PIPE,
+		text=True,
+		startupinfo=startupinfo,
+		encoding='utf-8',
+		errors='replace'
+	)
+	if on_start:
+		on_start(process)
+	# stderr is drained on the side so a chatty error cannot block ffmpeg
+	errors = []
+	reader = threading.Thread(target=lambda: errors.extend(process.stderr.read().splitlines()[-5:]), daemon=True)
+	reader.start()
+	for line in process.stdout:
+		key, _, value = line.strip().partition("=")
+		if key == "out_time_us" and on_progress and duration:
+			try:
+				on_progress(min(100.0, int(value) / 1e4 / duration))
+			except ValueError:
+				pass
+	process.wait()
+	reader.join()
+	cpu_seconds = process_cpu_seconds(process)
+	if process.returncode == 0:
+		os.replace(tmp_target, target)
+	elif os.path.exists(tmp_target):
+		try:
+			os.remove(tmp_target)
+		except OSError:
+			pass
+	return process.returncode, "\n".join(errors), cpu_seconds
+
+class StagePool:
+	def __init__(self, get_limit):
+		"""
+		Runs submitted tasks (callables) in FIFO order on at most get_limit() threads.
+		Threads are started on demand and exit when the queue is empty, so a new
+		limit applies from the next task on.
+		"""
+		self.get_limit = get_limit
+		self.lock = threading.Lock()
+		self.pending = deque()
+		self.workers = 0
+		self.stopped = False
+		# Counters for tuning
+		self.completed = 0
+		self.peak_waiting = 0
+
+	def submit(self, task):
+		with self.lock:
+			if self.stopped:
+				return False
+			self.pending.append(task)
+			self.peak_waiting = max(self.peak_waiting, len(self.pending))
+			if self.workers < max(1, self.get_limit()):
+				self.workers += 1
+				threading.Thread(target=self._work, daemon=True).start()
+		return True
+
+	def _work(self):
+		while True:
+			with self.lock:
+				if not self.pending or self.stopped or self.workers > max(1, self.get_limit()):
+					self.workers -= 1
+					return
+				task = self.pending.popleft()
+			try:
+				task()
+			except Exception as e:
+				logging.error(f"Post-processing task failed: {e}")
+			with self.lock:
+				self.completed += 1
+
+	def stop(self):
+		"""Drops waiting tasks; running ones finish (their processes are killed by the caller)."""
+		with self.lock:
+			self.stopped = True
+			self.pending.clear()
+
+	@property
+	def waiting_count(self):
+		return len(self.pending)
+
+	def stats(self):
+		return {'workers': self.workers, 'waiting': len(self.pending), 'completed': self.completed, 'peak_waiting': self.peak_waiting}
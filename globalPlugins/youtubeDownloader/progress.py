@@ -0,0 +1,161 @@
+"""
+Machine-readable progress protocol.
+
+yt-dlp is driven with --progress-template / --print templates so every progress
+update is one line: a fixed prefix, an event kind and a JSON object. The
+in-process engine writes the same records from its hooks, so parse_line is the
+single decoder for both engines. Lines without the prefix (warnings, errors)
+are left to the caller.
+"""
+import json
+from collections import namedtuple
+
+PREFIX = "[nvda-yt] "
+
+KIND_DOWNLOAD = "download"
+KIND_POSTPROCESS = "postprocess"
+KIND_FILE = "file" # Final file path, after it has been moved to the download folder
+
+_EVENT_FIELDS = [
+	"kind",
+	"status", # downloading/finished/error, or started/processing/finished for postprocessors
+	"video_id",
+	"filename",
+	"downloaded_bytes",
+	"total_bytes",
+	"speed", # bytes per second
+	"eta", # seconds
+	"fragment_index",
+	"fragment_count",
+	"postprocessor", # e.g. ExtractAudio, Merger, FFmpegMetadata
+	"playlist_index",
+	"playlist_count",
+]
+
+class ProgressEvent(namedtuple("ProgressEvent", _EVENT_FIELDS)):
+	__slots__ = ()
+
+	@property
+	def percent(self):
+		if self.downloaded_bytes is not None and self.total_bytes:
+			return min(100.0, self.downloaded_bytes * 100.0 / self.total_bytes)
+		if self.fragment_index and self.fragment_count:
+			return min(100.0, self.fragment_index * 100.0 / self.fragment_count)
+		return None
+
+# Only the fields we use are put in the record; a small flat object keeps
+# decoding cheap. Values are template paths into yt-dlp's progress dict.
+DOWNLOAD_FIELDS = {
+	'id': "info.id",
+	'playlist_index': "info.playlist_index",
+	'n_entries': "info.n_entries",
+	'status': "progress.status",
+	'filename': "progress.filename",
+	'downloaded_bytes': "progress.downloaded_bytes",
+	'total_bytes': "progress.total_bytes",
+	'total_bytes_estimate': "progress.total_bytes_estimate",
+	'speed': "progress.speed",
+	'eta': "progress.eta",
+	'fragment_index': "progress.fragment_index",
+	'fragment_count': "progress.fragment_count",
+}
+POSTPROCESS_FIELDS = {
+	'id': "info.id",
+	'status': "progress.status",
+	'postprocessor': "progress.postprocessor",
+}
+FILE_FIELDS = {
+	'id': "id",
+	'filepath': "filepath",
+}
+
+def _json_template(fields):
+	# %(field)j renders the value as JSON, but a missing one as a bare NA (not valid JSON);
+	# the |null default makes it null instead
+	return "{" + ", ".join(f'"{key}": %({path}|null)j' for key, path in fields.items()) + "}"
+
+def template_args():
+	"""yt-dlp arguments that make it print the records parse_line understands."""
+	return [
+		"--progress-template", "download:" + PREFIX + KIND_DOWNLOAD + " " + _json_template(DOWNLOAD_FIELDS),
+		"--progress-template", "postprocess:" + PREFIX + KIND_POSTPROCESS + " " + _json_template(POSTPROCESS_FIELDS),
+		"--print", "after_move:" + PREFIX + KIND_FILE + " " + _json_template(FILE_FIELDS),
+		# --print implies --quiet, which would also hide the progress records
+		"--progress",
+	]
+
+def format_record(kind, payload):
+	"""
+	Builds a record line in the same format as the templates (used by the in-process engine).
+	payload is a flat dict with the keys of DOWNLOAD_FIELDS, POSTPROCESS_FIELDS or FILE_FIELDS.
+	"""
+	return PREFIX + kind + " " + json.dumps(payload, default=str)
+
+def _number(value):
+	return value if isinstance(value, (int, float)) else None
+
+def _text(value):
+	return value if isinstance(value, str) and value else None
+
+def parse_line(line):
+	"""Returns a ProgressEvent for a record line, or None for any other output."""
+	idx = line.find(PREFIX)
+	if idx < 0:
+		return None
+	try:
+		kind, payload = line[idx + len(PREFIX):].split(" ", 1)
+		data = json.loads(payload)
+	except ValueError:
+		return None
+	if not isinstance(data, dict):
+		return None
+
+	if kind == KIND_DOWNLOAD:
+		return ProgressEvent(
+			KIND_DOWNLOAD,
+			_text(data.get('status')),
+			_text(data.get('id')),
+			_text(data.get('filename')),
+			_number(data.get('downloaded_bytes')),
+			_number(data.get('total_bytes')) or _number(data.get('total_bytes_estimate')),
+			_number(data.get('speed')),
+			_number(data.get('eta')),
+			_number(data.get('fragment_index')),
+			_number(data.get('fragment_count')),
+			None,
+			_number(data.get('playlist_index')),
+			_number(data.get('n_entries')),
+		)
+	if kind == KIND_POSTPROCESS:
+		return ProgressEvent(KIND_POSTPROCESS, _text(data.get('status')), _text(data.get('id')), None, None, None, None, None, None, None, _text(data.get('postprocessor')), None, None)
+	if kind == KIND_FILE:
+		return ProgressEvent(KIND_FILE, "finished", _text(data.get('id')), _text(data.get('filepath')), None, None, None, None, None, None, None, None, None)
+	return None
+
+def format_bytes(num):
+	if num is None:
+		return ""
+	for unit in ("B", "KiB", "MiB", "GiB"):
+		if num < 1024 or unit == "GiB":
+			return f"{num:.1f} {unit}" if unit != "B" else f"{int(num)} {unit}"
+		num /= 1024.0
+
+def format_eta(seconds):
+	if seconds is None:
+		return ""
+	seconds = int(seconds)
+	if seconds >= 3600:
+		return f"{seconds // 3600}:{seconds % 3600 // 60:02d}:{seconds % 60:02d}"
+	return f"{seconds // 60}:{seconds % 60:02d}"
+
+def describe(event):
+	"""Short human-readable progress text, e.g. '45.6%, 2.0 MiB/s, 0:05 left'."""
+	parts = []
+	percent = event.percent
+	if percent is not None:
+		parts.append(f"{percent:.1f}%")
+	if event.speed:
+		parts.append(f"{format_bytes(event.speed)}/s")
+	if event.eta is not None:
+		parts.append(f"{format_eta(event.eta)} left")
+	return ", ".join(parts)
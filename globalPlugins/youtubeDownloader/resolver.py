@@ -0,0 +1,84 @@
+"""
+Batched metadata resolution.
+
+Single-video jobs without a known title wait here instead of in a download
+slot. Pending URLs are collected for a short window and resolved together in
+one extraction call (one yt-dlp process or one YoutubeDL session), so the cost
+scales with the number of batches rather than the number of videos.
+"""
+import threading
+import time
+import logging
+from collections import deque
+
+# How long to wait for more URLs after the first one arrives
+BATCH_WINDOW = 0.5
+MAX_BATCH = 50
+
+class TitleResolver:
+	def __init__(self, fetch_batch, on_resolved):
+		"""
+		fetch_batch(urls) -> {url: info or None} performs one extraction call.
+		on_resolved(d_id, url, info) is called from the resolver thread for every item.
+		"""
+		self.fetch_batch = fetch_batch
+		self.on_resolved = on_resolved
+		self.pending = deque() # (d_id, url)
+		self.cond = threading.Condition()
+		self.thread = None
+		self.stopped = False
+		self.batches = 0
+		self.resolved = 0
+
+	def submit(self, d_id, url):
+		with self.cond:
+			self.pending.append((d_id, url))
+			if self.thread is None:
+				self.thread = threading.Thread(target=self._run, daemon=True)
+				self.thread.start()
+			self.cond.notify()
+
+	def stop(self):
+		with self.cond:
+			self.stopped = True
+			self.pending.clear()
+			self.cond.notify()
+
+	def _next_batch(self):
+		"""Blocks until work arrives, then gathers URLs for up to BATCH_WINDOW seconds."""
+		with self.cond:
+			while not self.pending and not self.stopped:
+				self.cond.wait()
+			if self.stopped:
+				return None
+			deadline = time.monotonic() + BATCH_WINDOW
+			while len(self.pending) < MAX_BATCH and not self.stopped:
+				remaining = deadline - time.monotonic()
+				if remaining <= 0:
+					break
+				self.cond.wait(remaining)
+			batch = []
+			while self.pending and len(batch) < MAX_BATCH:
+				batch.append(self.pending.popleft())
+			return batch
+
+	def _run(self):
+		while True:
+			batch = self._next_batch()
+			if batch is None:
+				return
+			# The same URL may be queued twice, extract it once
+			urls = list(dict.fromkeys(url for _, url in batch))
+			try:
+				results = self.fetch_batch(urls)
+			except Exception as e:
+				logging.error(f"Batch title resolution failed: {e}")
+				results = {}
+			self.batches += 1
+			self.resolved += len(batch)
+			logging.info(f"Resolved {len(batch)} item(s) in one batch ({self.batches} batches, {self.resolved} items so far)")
+			for d_id, url in batch:
+				try:
+					self.on_resolved(d_id, url, results.get(url))
+				except Exception as e:
+					logging.error(f"Failed to apply resolved title for {d_id}: {e}")
@@ -0,0 +1,132 @@
+"""
+Download queue scheduler.
+
+Waiting jobs are grouped by priority and, within a priority, by batch (one
+playlist selection, or the ad-hoc single videos). Dispatch takes the highest
+priority that has work and serves its batches round-robin, so a deep playlist
+cannot starve a video queued after it. A batch that enters the rotation is
+served next, which gets a new interactive job a slot on the next completion.
+
+Enqueue, dispatch and completion are O(1) and never depend on the size of the
+download history. Removing or re-queuing a waiting job is lazy: its old entry
+is skipped when reached.
+"""
+from collections import deque
+
+PRIORITY_HIGH = 0
+PRIORITY_NORMAL = 1
+PRIORITY_LOW = 2
+PRIORITIES = (PRIORITY_HIGH, PRIORITY_NORMAL, PRIORITY_LOW)
+
+# Batch of jobs that were queued one by one
+ADHOC_BATCH = "adhoc"
+
+class _Level:
+	"""Waiting jobs of one priority."""
+	def __init__(self):
+		self.batches = {} # batch -> deque of (d_id, ticket)
+		self.rotation = deque() # batches with waiting jobs, next to serve first
+
+	def add(self, d_id, ticket, batch, front):
+		entries = self.batches.get(batch)
+		if entries is None:
+			entries = self.batches[batch] = deque()
+			# A new batch is served next
+			self.rotation.appendleft(batch)
+		if front:
+			entries.appendleft((d_id, ticket))
+		else:
+			entries.append((d_id, ticket))
+
+class Scheduler:
+	def __init__(self, max_active):
+		self.max_active = max_active
+		self.levels = [_Level() for _ in PRIORITIES]
+		self.queued = {} # d_id -> ticket of its live queue entry
+		self.active = set()
+		self._next_ticket = 0
+
+	def enqueue(self, d_id, priority=PRIORITY_NORMAL, batch=ADHOC_BATCH, front=False):
+		"""
+		Adds a job to its batch (at the back, or the front with front=True).
+		A job that is already waiting is moved. Returns False if the job is running.
+		"""
+		if d_id in self.active:
+			return False
+		self._next_ticket += 1
+		self.queued[d_id] = self._next_ticket
+		self.levels[priority].add(d_id, self._next_ticket, batch, front)
+		return True
+
+	def remove(self, d_id):
+		"""Takes a job out of the queue (its entry is skipped at dispatch)."""
+		return self.queued.pop(d_id, None) is not None
+
+	def is_queued(self, d_id):
+		return d_id in self.queued
+
+	def _pop(self):
+		"""Returns the next live d_id, or None if nothing is waiting."""
+		for level in self.levels:
+			while level.rotation:
+				batch = level.rotation.popleft()
+				entries = level.batches[batch]
+				d_id = None
+				while entries:
+					candidate, ticket = entries.popleft()
+					if self.queued.get(candidate) == ticket:
+						d_id = candidate
+						break
+					# Removed or re-queued elsewhere since this entry was added
+				if entries:
+					level.rotation.append(batch)
+				else:
+					del level.batches[batch]
+				if d_id is not None:
+					return d_id
+		return None
+
+	def dispatch(self):
+		"""Returns the jobs to start now and marks them active."""
+		started = []
+		while len(self.active) < self.max_active and self.queued:
+			d_id = self._pop()
+			if d_id is None:
+				break
+			del self.queued[d_id]
+			self.active.add(d_id)
+			started.append(d_id)
+		return started
+
+	def claim(self, batch, priority, accept, limit):
+		"""
+		Takes up to limit waiting jobs from the front of a batch, in order, for a
+		job that is already running (see pool). Stops at the first job accept()
+		rejects. Claimed jobs are no longer queued and hold no slot of their own.
+		"""
+		entries = self.levels[priority].batches.get(batch)
+		claimed = []
+		while entries and len(claimed) < limit:
+			d_id, ticket = entries[0]
+			if self.queued.get(d_id) != ticket:
+				entries.popleft()
+				continue
+			if not accept(d_id):
+				break
+			entries.popleft()
+			del self.queued[d_id]
+			claimed.append(d_id)
+		# An emptied batch is dropped from the rotation when it is next reached
+		return claimed
+
+	def finish(self, d_id):
+		"""Frees the slot held by a job."""
+		self.active.discard(d_id)
+
+	@property
+	def active_count(self):
+		return len(self.active)
+
+	@property
+	def queued_count(self):
+		return len(self.queued)
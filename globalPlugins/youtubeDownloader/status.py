@@ -0,0 +1,65 @@
+"""
+Coalesced UI status updates.
+
+Download threads report progress many times per second. Instead of one
+wx.CallAfter per progress line, the aggregator keeps only the latest status per
+download ID and flushes them to the dialog as one batch, at most `rate` times a
+second. Terminal states are flushed right away so they are never delayed.
+"""
+import threading
+import time
+import wx
+
+class StatusAggregator:
+	def __init__(self, deliver, get_rate):
+		"""
+		deliver(updates) is called on the main thread with {d_id: (status_text, percent)}.
+		get_rate() returns the maximum number of flushes per second.
+		"""
+		self.deliver = deliver
+		self.get_rate = get_rate
+		self.pending = {}
+		self.lock = threading.Lock()
+		self.flush_scheduled = False
+		self.last_flush = 0.0
+		# Counters for checking the coalescing actually helps
+		self.pushed = 0
+		self.flushes = 0
+
+	def push(self, d_id, status_text, percent=None, terminal=False):
+		"""
+		Records the latest status for d_id. Safe to call from any thread.
+		terminal updates (Completed, Error, Stopped) are flushed immediately.
+		"""
+		with self.lock:
+			self.pending[d_id] = (status_text, percent)
+			self.pushed += 1
+			if terminal:
+				delay = 0
+			elif self.flush_scheduled:
+				# A flush is already on its way and will pick this update up
+				return
+			else:
+				interval = 1.0 / max(1, self.get_rate())
+				delay = max(0.0, interval - (time.monotonic() - self.last_flush))
+			self.flush_scheduled = True
+		if delay:
+			# wx timers must be created on the main thread
+			wx.CallAfter(wx.CallLater, int(delay * 1000), self.flush)
+		else:
+			wx.CallAfter(self.flush)
+
+	def flush(self):
+		with self.lock:
+			updates = self.pending
+			self.pending = {}
+			self.flush_scheduled = False
+			self.last_flush = time.monotonic()
+		if updates:
+			self.flushes += 1
+			self.deliver(updates)
+
+	def discard(self, d_id):
+		"""Drops a pending update, e.g. when the download is removed from the list."""
+		with self.lock:
+			self.pending.pop(d_id, None)
@@ -0,0 +1,179 @@
+"""
+Journaled job store.
+
+The download list is kept as a snapshot file plus an append-only journal. A
+change to one job appends one JSON line to the journal instead of rewriting
+the whole list; changes are collected for a short moment and written together.
+When the journal grows past the size of the live list it is compacted into a
+new snapshot (temp file + os.replace), so loading stays proportional to the
+number of jobs rather than to their history.
+
+Both files survive a crash mid-write: the snapshot is only ever replaced
+atomically, and a torn last journal line is ignored on load.
+"""
+import os
+import json
+import time
+import threading
+import logging
+
+# Seconds to collect changes before they are written
+DEBOUNCE = 1.0
+# Compact once the journal has this many lines and more than twice as many as live jobs
+MIN_COMPACT_LINES = 500
+# A running download saves its partial file offsets after this many new bytes or seconds,
+# so a crash loses at most that much progress (the journal batches the writes)
+CHECKPOINT_BYTES = 8 * 1024 * 1024
+CHECKPOINT_INTERVAL = 10.0
+
+class JobStore:
+	def __init__(self, snapshot_path):
+		"""
+		snapshot_path is the JSON file with {d_id: job} (the format older versions wrote in full).
+		The journal lives next to it with a .journal extension.
+		"""
+		self.snapshot_path = snapshot_path
+		self.journal_path = os.path.splitext(snapshot_path)[0] + ".journal"
+		self.records = {} # d_id (str) -> last persisted job dict
+		self.pending = {} # d_id (str) -> job dict, or None for a removal
+		self.journal_lines = 0
+		self.cond = threading.Condition()
+		self.thread = None
+		self.closed = False
+
+	def load(self):
+		"""Returns {d_id (str): job} from the snapshot with the journal replayed on top."""
+		records = {}
+		try:
+			with open(self.snapshot_path, 'r', encoding='utf-8') as f:
+				records = json.load(f) or {}
+		except FileNotFoundError:
+			pass
+		except Exception as e:
+			logging.error(f"Failed to read job snapshot: {e}")
+
+		lines = 0
+		torn = False
+		try:
+			with open(self.journal_path, 'r', encoding='utf-8') as f:
+				for line in f:
+					try:
+						entry = json.loads(line)
+					except ValueError:
+						# Torn write from a crash, nothing after it was committed
+						torn = True
+						break
+					lines += 1
+					if entry.get('op') == 'put':
+						records[entry['id']] = entry['job']
+					elif entry.get('op') == 'del':
+						records.pop(entry['id'], None)
+		except FileNotFoundError:
+			pass
+		except Exception as e:
+			logging.error(f"Failed to replay job journal: {e}")
+
+		with self.cond:
+			self.records = records
+			self.journal_lines = lines
+			if lines or torn:
+				# Start the session from a clean snapshot (and never append after a torn line)
+				self._compact()
+		return dict(records)
+
+	def put(self, d_id, job):
+		"""Schedules a job to be written. job must be JSON-serializable."""
+		self._schedule(str(d_id), job)
+
+	def delete(self, d_id):
+		self._schedule(str(d_id), None)
+
+	def _schedule(self, key, job):
+		with self.cond:
+			if self.closed:
+				return
+			self.pending[key] = job
+			if self.thread is None:
+				self.thread = threading.Thread(target=self._run, daemon=True)
+				self.thread.start()
+			self.cond.notify()
+
+	def _run(self):
+		while True:
+			with self.cond:
+				while not self.pending and not self.closed:
+					self.cond.wait()
+				if self.closed:
+					return
+				# Let a burst of changes (e.g. a whole playlist queued) settle into one write
+				deadline = time.monotonic() + DEBOUNCE
+				while not self.closed:
+					remaining = deadline - time.monotonic()
+					if remaining <= 0:
+						break
+					self.cond.wait(remaining)
+				if self.closed:
+					return
+				self._commit()
+
+	def _commit(self):
+		"""Appends pending changes to the journal. Caller holds the lock."""
+		if not self.pending:
+			return
+		lines = []
+		for key, job in self.pending.items():
+			if job is None:
+				if key not in self.records:
+					continue
+				lines.append(json.dumps({'op': 'del', 'id': key}))
+			else:
+				lines.append(json.dumps({'op': 'put', 'id': key, 'job': job}))
+		try:
+			with open(self.journal_path, 'a', encoding='utf-8') as f:
+				if lines:
+					f.write("\n".join(lines) + "\n")
+				f.flush()
+				os.fsync(f.fileno())
+		except Exception as e:
+			# Keep the changes pending, the next commit retries them
+			logging.error(f"Failed to write job journal: {e}")
+			return
+		for key, job in self.pending.items():
+			if job is None:
+				self.records.pop(key, None)
+			else:
+				self.records[key] = job
+		self.pending = {}
+		self.journal_lines += len(lines)
+		if self.journal_lines >= MIN_COMPACT_LINES and self.journal_lines > 2 * len(self.records):
+			self._compact()
+
+	def _compact(self):
+		"""Writes all live jobs to a new snapshot and empties the journal. Caller holds the lock."""
+		try:
+			tmp_path = self.snapshot_path + ".tmp"
+			with open(tmp_path, 'w', encoding='utf-8') as f:
+				json.dump(self.records, f, separators=(',', ':'))
+				f.flush()
+				os.fsync(f.fileno())
+			os.replace(tmp_path, self.snapshot_path)
+			# Replaying the old journal over the new snapshot would be harmless, so a crash here loses nothing
+			with open(self.journal_path, 'w', encoding='utf-8'):
+				pass
+			self.journal_lines = 0
+		except Exception as e:
+			logging.error(f"Failed to compact job store: {e}")
+
+	def flush(self):
+		"""Writes pending changes now (blocking)."""
+		with self.cond:
+			self._commit()
+
+	def close(self):
+		"""Writes pending changes, compacts, and stops the writer thread."""
+		with self.cond:
+			self._commit()
+			if self.journal_lines:
+				self._compact()
+			self.closed = True
+			self.cond.notify()
@@ -0,0 +1,216 @@
+"""
+yt-dlp self-update.
+
+Replaces `yt-dlp -U`, which rewrote the binary in place and kept the queue
+waiting for up to two minutes on every NVDA start:
+
+- Checks are rate-limited by a persisted last-check timestamp, so most starts
+  cost nothing.
+- A new release is downloaded next to the binary (yt-dlp.exe.new) and its
+  SHA-256 is verified against the release's SHA2-256SUMS.
+- The verified file replaces the binary with one os.replace, only when no
+  download is using it. Until then downloads keep running on the old version.
+"""
+import os
+import json
+import time
+import threading
+import subprocess
+import logging
+from . import downloader
+
+STATE_PATH = os.path.join(os.path.expanduser("~"), "nvda_yt_downloader_update.json")
+RELEASE_API_URL = "https://api.github.com/repos/yt-dlp/yt-dlp/releases/latest"
+RELEASE_ASSET = "yt-dlp.exe"
+CHECKSUMS_ASSET = "SHA2-256SUMS"
+TIMEOUT = 30
+CHUNK = 64 * 1024
+
+class UpdateError(Exception):
+	pass
+
+class Updater:
+	def __init__(self, get_interval, is_idle, state_path=STATE_PATH):
+		"""
+		get_interval returns the hours between automatic checks.
+		is_idle returns True when no yt-dlp.exe is running (called on the main thread).
+		"""
+		self.get_interval = get_interval
+		self.is_idle = is_idle
+		self.state_path = state_path
+		self.lock = threading.Lock()
+		self.state_lock = threading.Lock()
+		# Read on first use, not while NVDA starts
+		self._state = None
+
+	@property
+	def state(self):
+		with self.state_lock:
+			if self._state is None:
+				self._state = self._load()
+			return self._state
+
+	def _load(self):
+		try:
+			with open(self.state_path, 'r', encoding='utf-8') as f:
+				return json.load(f) or {}
+		except FileNotFoundError:
+			return {}
+		except Exception as e:
+			logging.error(f"Failed to read update state: {e}")
+			return {}
+
+	def _save(self):
+		try:
+			tmp_path = self.state_path + ".tmp"
+			with open(tmp_path, 'w', encoding='utf-8') as f:
+				json.dump(self.state, f)
+			os.replace(tmp_path, self.state_path)
+		except Exception as e:
+			logging.error(f"Failed to save update state: {e}")
+
+	@property
+	def staged_path(self):
+		return downloader.get_yt_dlp_path() + ".new"
+
+	def is_due(self):
+		last = self.state.get('last_check', 0)
+		return time.time() - last >= self.get_interval() * 3600
+
+	def check(self, manual=False):
+		"""
+		Looks for a new release and stages it (blocking, run on a worker thread).
+		Automatic checks are skipped until the interval has passed. Returns a message for the user.
+		"""
+		if not self.lock.acquire(blocking=False):
+			return "An update check is already running."
+		try:
+			if not manual and not self.is_due():
+				return "yt-dlp was checked for updates recently."
+			if not os.path.exists(downloader.get_yt_dlp_path()):
+				return "yt-dlp.exe is not installed."
+			logging.info("Checking for yt-dlp updates...")
+			release = self._fetch_json(RELEASE_API_URL)
+			latest = release.get('tag_name')
+			if not latest:
+				raise UpdateError("Release has no version")
+			self.state['last_check'] = time.time()
+
+			installed = self.installed_version()
+			if installed == latest:
+				self._save()
+				return "yt-dlp is up to date."
+			if self.state.get('staged_version') == latest and os.path.exists(self.staged_path):
+				self._save()
+				return f"yt-dlp {latest} is downloaded and will be installed when no download is running."
+
+			assets = {asset.get('name'): asset.get('browser_download_url') for asset in release.get('assets', [])}
+			if not assets.get(RELEASE_ASSET) or not assets.get(CHECKSUMS_ASSET):
+				raise UpdateError("Release is missing yt-dlp.exe or its checksums")
+			expected = self._expected_hash(assets[CHECKSUMS_ASSET])
+			self._download_verified(assets[RELEASE_ASSET], expected)
+			self.state['staged_version'] = latest
+			self._save()
+			logging.info(f"Staged yt-dlp {latest} (installed: {installed})")
+			return f"yt-dlp {latest} is downloaded and will be installed when no download is running."
+		except Exception as e:
+			logging.error(f"yt-dlp update check failed: {e}")
+			return f"Update failed: {e}"
+		finally:
+			self.lock.release()
+
+	def _binary_stamp(self):
+		"""[mtime, size] of the binary, or None if it is missing. Any replacement changes it."""
+		try:
+			st = os.stat(downloader.get_yt_dlp_path())
+		except OSError:
+			return None
+		return [st.st_mtime_ns, st.st_size]
+
+	def installed_version(self):
+		"""Version of the binary in use, remembered until the file changes (e.g. replaced by hand or by an add-on update)."""
+		stamp = self._binary_stamp()
+		version = self.state.get('installed_version')
+		if version and stamp and self.state.get('installed_stamp') == stamp:
+			return version
+		startupinfo = subprocess.STARTUPINFO()
+		startupinfo.dwFlags |= subprocess.STARTF_USESHOWWINDOW
+		proc = subprocess.run(
+			[downloader.get_yt_dlp_path(), "--version"],
+			capture_output=True,
+			text=True,
+			startupinfo=startupinfo,
+			check=False,
+			encoding='utf-8',
+			errors='replace',
+			timeout=TIMEOUT
+		)
+		version = proc.stdout.strip()
+		if version:
+			self.state['installed_version'] = version
+			self.state['installed_stamp'] = stamp
+		return version
+
+	def _open(self, url):
+		# Imported here, the HTTP stack is only needed when a check is due
+		import urllib.request
+		request = urllib.request.Request(url, headers={'User-Agent': downloader.USER_AGENT})
+		return urllib.request.urlopen(request, timeout=TIMEOUT)
+
+	def _fetch_json(self, url):
+		with self._open(url) as response:
+			return json.loads(response.read().decode('utf-8'))
+
+	def _expected_hash(self, url):
+		with self._open(url) as response:
+			for line in response.read().decode('utf-8').splitlines():
+				parts = line.split()
+				if len(parts) == 2 and parts[1].lstrip("*") == RELEASE_ASSET:
+					return parts[0].lower()
+		raise UpdateError(f"No checksum for {RELEASE_ASSET}")
+
+	def _download_verified(self, url, expected):
+		"""Downloads to a temp file beside the binary, checks its SHA-256 and renames it to staged_path."""
+		import hashlib
+		tmp_path = self.staged_path + ".part"
+		digest = hashlib.sha256()
+		try:
+			with self._open(url) as response, open(tmp_path, 'wb') as f:
+				while True:
+					chunk = response.read(CHUNK)
+					if not chunk:
+						break
+					digest.update(chunk)
+					f.write(chunk)
+				f.flush()
+				os.fsync(f.fileno())
+			if digest.hexdigest() != expected:
+				raise UpdateError("Checksum mismatch, download discarded")
+			os.replace(tmp_path, self.staged_path)
+		finally:
+			if os.path.exists(tmp_path):
+				try:
+					os.remove(tmp_path)
+				except OSError:
+					pass
+
+	def apply_staged(self):
+		"""
+		Swaps in a staged binary if no download is using the current one (main thread).
+		Returns the installed version, or None if there was nothing to do or it has to wait.
+		"""
+		version = self.state.get('staged_version')
+		if not version or not os.path.exists(self.staged_path) or not self.is_idle():
+			return None
+		try:
+			# Atomic on the same volume; Windows refuses while the old binary is still running
+			os.replace(self.staged_path, downloader.get_yt_dlp_path())
+		except OSError as e:
+			logging.info(f"yt-dlp update waits, binary in use: {e}")
+			return None
+		self.state['installed_version'] = version
+		self.state['installed_stamp'] = self._binary_stamp()
+		self.state.pop('staged_version', None)
+		self._save()
+		logging.info(f"Installed yt-dlp {version}")
+		return version
@@ -0,0 +1,133 @@
+"""
+YouTube URL parsing.
+
+The one place that understands the many spellings of a YouTube link
+(watch?v=, youtu.be/, shorts/, embed/, live/, music. and m. hosts, tracking
+parameters, timestamps). Everything else works with the canonical IDs returned
+here, so two links to the same video are recognised as the same job.
+
+Channel pages (@handle, channel/UC..., c/..., user/...) are lists of videos
+like a playlist and are returned as a channel path instead of an ID.
+"""
+import re
+from collections import namedtuple
+from urllib.parse import urlparse, parse_qs
+
+YOUTUBE_HOSTS = frozenset([
+	"youtube.com",
+	"www.youtube.com",
+	"m.youtube.com",
+	"music.youtube.com",
+	"youtu.be",
+	"youtube-nocookie.com",
+	"www.youtube-nocookie.com",
+])
+
+_VIDEO_ID_RE = re.compile(r"^[A-Za-z0-9_-]{11}$")
+_PLAYLIST_ID_RE = re.compile(r"^[A-Za-z0-9_-]+$")
+_TIMESTAMP_RE = re.compile(r"^(?:(\d+)h)?(?:(\d+)m)?(?:(\d+)s?)?$")
+# Path prefixes followed by a video ID
+_VIDEO_PATHS = ("shorts", "embed", "live", "v")
+# Path prefixes followed by a channel name or ID
+_CHANNEL_PATHS = ("channel", "c", "user")
+# Channel tabs that list videos
+_CHANNEL_TABS = ("videos", "shorts", "streams", "playlists", "featured")
+
+# timestamp is the start offset in seconds (t= or start=), or None.
+# channel is the channel part of the path ("@name", "channel/UC...", with a tab
+# like "/videos" if given), set only if there is no video or playlist ID.
+CanonicalURL = namedtuple("CanonicalURL", ["video_id", "playlist_id", "timestamp", "channel"], defaults=[None])
+
+def _split(url):
+	"""Returns (host, path parts, query dict) for a URL with or without a scheme, or None."""
+	if not url:
+		return None
+	url = url.strip()
+	if "://" not in url:
+		url = "https://" + url
+	try:
+		parsed = urlparse(url)
+		host = (parsed.hostname or "").lower()
+	except ValueError:
+		return None
+	return host, [p for p in parsed.path.split("/") if p], parse_qs(parsed.query)
+
+def _timestamp(value):
+	match = _TIMESTAMP_RE.match(value or "")
+	if not match or not any(match.groups()):
+		return None
+	hours, minutes, seconds = (int(g) if g else 0 for g in match.groups())
+	return hours * 3600 + minutes * 60 + seconds
+
+def _channel(path):
+	"""The channel part of a path (e.g. "@name/videos"), or None."""
+	if path and path[0].startswith("@") and len(path[0]) > 1:
+		name, rest = path[:1], path[1:]
+	elif len(path) >= 2 and path[0] in _CHANNEL_PATHS:
+		name, rest = path[:2], path[2:]
+	else:
+		return None
+	if rest and rest[0] in _CHANNEL_TABS:
+		name = name + rest[:1]
+	return "/".join(name)
+
+def parse(url):
+	"""Returns the CanonicalURL of a YouTube link, or None for anything else."""
+	parts = _split(url)
+	if not parts or parts[0] not in YOUTUBE_HOSTS:
+		return None
+	host, path, query = parts
+
+	video_id = None
+	if host == "youtu.be":
+		video_id = path[0] if path else None
+	elif query.get("v"):
+		video_id = query["v"][0]
+	elif len(path) >= 2 and path[0] in _VIDEO_PATHS:
+		video_id = path[1]
+	if video_id and not _VIDEO_ID_RE.match(video_id):
+		video_id = None
+
+	playlist_id = query.get("list", [None])[0]
+	if playlist_id and not _PLAYLIST_ID_RE.match(playlist_id):
+		playlist_id = None
+
+	timestamp = None
+	for name in ("t", "start"):
+		if query.get(name):
+			timestamp = _timestamp(query[name][0])
+			break
+
+	if not video_id and not playlist_id:
+		channel = _channel(path) if host != "youtu.be" else None
+		if not channel:
+			return None
+		return CanonicalURL(None, None, None, channel)
+	return CanonicalURL(video_id, playlist_id, timestamp)
+
+def is_youtube_url(url):
+	"""True if the URL is on a YouTube host and points at a video, playlist or channel."""
+	return parse(url) is not None
+
+def is_youtube_host(url):
+	"""True if the URL is on a YouTube host at all (e.g. a browser showing the home page)."""
+	parts = _split(url)
+	return bool(parts) and parts[0] in YOUTUBE_HOSTS
+
+def video_id(url):
+	parsed = parse(url)
+	return parsed.video_id if parsed else None
+
+def playlist_id(url):
+	parsed = parse(url)
+	return parsed.playlist_id if parsed else None
+
+def channel(url):
+	parsed = parse(url)
+	return parsed.channel if parsed else None
+
+def watch_url(video_id):
+	return f"https://www.youtube.com/watch?v={video_id}"
+
+def playlist_url(playlist_id):
+	return f"https://www.youtube.com/playlist?list={playlist_id}"